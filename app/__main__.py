@@ -1,5 +1,6 @@
-import uvicorn
-from app.server import app
+import sys
+
+from app.cli import main
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="0.0.0.0", port=5000)
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,219 @@
+"""Admission control: ограничение конкурентности по маршрутам и сброс нагрузки.
+
+У каждого шаблона маршрута свой `ConcurrencyLimiter`: не больше `limit`
+запросов выполняются одновременно, остальные ждут в очереди ограниченной
+длины не дольше `queue_timeout`. Переполнение очереди или истёкший срок
+ожидания — `Overloaded`, ответ 503 с Retry-After сразу, а не после
+pool_timeout в очереди пула соединений.
+
+Со `serve_stale` отклонённый запрос всё же выполняется, но в режиме сброса
+нагрузки (`is_shedding()`): кэш офферволлов отдаёт просроченные записи, а
+репозиторий БД (SheddingOfferWallRepository) поднимает `Overloaded` до
+выборки. Обработчики, которым БД не нужна (снапшот, свежий кэш), отвечают
+как обычно. Потоковая выгрузка проверяет `check_not_shedding()` до
+отправки статуса: внутри потока отказ превратился бы в оборванный ответ 200.
+
+Маршрут исключается из учёта через opt обработчика: `opt={"admission": False}`.
+"""
+
+import asyncio
+import contextvars
+import json
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterator, Literal, Mapping, Optional
+
+from litestar.types import ASGIApp, Receive, Scope, Send
+
+RejectReason = Literal["queue_full", "timeout"]
+
+OVERLOADED_DETAIL = "Service overloaded, retry later."
+
+
+class Overloaded(RuntimeError):
+    """Запрос не допущен: очередь маршрута заполнена, истёк срок ожидания или идёт сброс нагрузки."""
+
+    def __init__(self, reason: str, retry_after: int) -> None:
+        super().__init__(f"request rejected by admission control: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class AdmissionStats:
+    admitted: int = 0
+    queued: int = 0
+    rejected_queue_full: int = 0
+    rejected_timeout: int = 0
+    shed: int = 0
+
+
+class ConcurrencyLimiter:
+    """Семафор с ограниченной FIFO-очередью и сроком ожидания.
+
+    Освободившийся слот передаётся первому ожидающему напрямую: новые запросы
+    не обгоняют очередь. Рассчитан на один event loop.
+    """
+
+    def __init__(self, limit: int, max_queue: int, queue_timeout: float) -> None:
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiters: Deque[asyncio.Future] = deque()
+        self.stats = AdmissionStats()
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self.waiters)
+
+    async def acquire(self) -> Optional[RejectReason]:
+        """Занять слот; причина отказа или None, если слот получен."""
+        if self.active < self.limit and not self.waiters:
+            self.active += 1
+            self.stats.admitted += 1
+            return None
+        if len(self.waiters) >= self.max_queue:
+            self.stats.rejected_queue_full += 1
+            return "queue_full"
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        self.stats.queued += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._forget(waiter)
+            self.stats.rejected_timeout += 1
+            return "timeout"
+        except BaseException:
+            # Отмена (клиент ушёл): слот, уже переданный этому ожидающему, возвращаем
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._forget(waiter)
+            raise
+        self.stats.admitted += 1
+        return None
+
+    def _forget(self, waiter: asyncio.Future) -> None:
+        try:
+            self.waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def release(self) -> None:
+        while self.waiters:
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class AdmissionController:
+    """Лимитеры по шаблонам маршрутов; лимит — общий или из `route_limits`."""
+
+    def __init__(
+        self,
+        limit: int,
+        max_queue: int,
+        queue_timeout: float,
+        retry_after: int,
+        route_limits: Optional[Mapping[str, int]] = None,
+    ) -> None:
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.route_limits = dict(route_limits or {})
+        self.limiters: Dict[str, ConcurrencyLimiter] = {}
+
+    def limiter(self, route: str) -> ConcurrencyLimiter:
+        limiter = self.limiters.get(route)
+        if limiter is None:
+            limit = self.route_limits.get(route, self.limit)
+            limiter = self.limiters[route] = ConcurrencyLimiter(
+                limit, self.max_queue, self.queue_timeout
+            )
+        return limiter
+
+
+_shedding: contextvars.ContextVar[Optional[Overloaded]] = contextvars.ContextVar(
+    "admission_shedding", default=None
+)
+
+
+@contextmanager
+def shedding(rejection: Overloaded) -> Iterator[None]:
+    """Выполнить тело в режиме сброса нагрузки (без слота, без доступа к БД)."""
+    token = _shedding.set(rejection)
+    try:
+        yield
+    finally:
+        _shedding.reset(token)
+
+
+def is_shedding() -> bool:
+    """Текущий запрос выполняется без слота: БД недоступна, кэш может отдавать устаревшее."""
+    return _shedding.get() is not None
+
+
+def check_not_shedding() -> None:
+    """Вызывается перед выборкой из БД: в режиме сброса нагрузки поднимает Overloaded."""
+    rejection = _shedding.get()
+    if rejection is not None:
+        raise rejection
+
+
+def overloaded_body() -> bytes:
+    return json.dumps({"detail": OVERLOADED_DETAIL}).encode()
+
+
+async def _send_overloaded(send: Send, retry_after: int) -> None:
+    body = overloaded_body()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(retry_after).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def admission_middleware_factory(controller: AdmissionController, serve_stale: bool) -> Any:
+    """Фабрика middleware, допускающего запросы через лимитер их маршрута."""
+
+    def factory(app: ASGIApp) -> ASGIApp:
+        async def middleware(scope: Scope, receive: Receive, send: Send) -> None:
+            handler = scope.get("route_handler")
+            if scope["type"] != "http" or (
+                handler is not None and handler.opt.get("admission") is False
+            ):
+                await app(scope, receive, send)
+                return
+            limiter = controller.limiter(scope.get("path_template") or scope["path"])
+            reason = await limiter.acquire()
+            if reason is None:
+                try:
+                    await app(scope, receive, send)
+                finally:
+                    limiter.release()
+                return
+            if not serve_stale:
+                await _send_overloaded(send, controller.retry_after)
+                return
+            limiter.stats.shed += 1
+            with shedding(Overloaded(reason, controller.retry_after)):
+                await app(scope, receive, send)
+
+        return middleware
+
+    return factory
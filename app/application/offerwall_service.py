@@ -1,30 +1,73 @@
 from typing import Optional, Sequence
-from litestar.exceptions import NotFoundException
+from litestar.exceptions import NotFoundException, ValidationException
 
-from app.domain.entities import OfferWall
+from app.config import settings
+from app.application.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.application.projection import InvalidProjection, parse_projection
+from app.domain.entities import OfferWall, OfferWallPage
 from app.domain.ports.offerwall_repository import OfferWallRepository
-from app.models import OfferChoices  # источник имён (инфраструктурная константа)
+from app.models import offer_names  # источник имён (инфраструктурная константа)
+from app.tracing import span
 
 class OfferWallService:
     def __init__(self, repo: OfferWallRepository) -> None:
         self.repo = repo
 
     async def list_offerwalls(self, name: Optional[str], url: Optional[str], page: int, page_size: int) -> Sequence[OfferWall]:
-        return await self.repo.list(name=name, url=url, page=page, page_size=page_size)
+        with span("service.list_offerwalls"):
+            return await self.repo.list(name=name, url=url, page=page, page_size=page_size)
+
+    async def list_offerwalls_page(
+        self,
+        name: Optional[str],
+        url: Optional[str],
+        page: int,
+        page_size: int,
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+        include: Optional[str] = None,
+    ) -> OfferWallPage:
+        """Страница офферволлов; курсор (если задан) имеет приоритет над номером страницы.
+
+        `fields`/`include` ограничивают поля и списки назначений (см. parse_projection).
+        """
+        try:
+            after = decode_cursor(cursor) if cursor else None
+            projection = parse_projection(fields, include)
+        except (InvalidCursor, InvalidProjection) as exc:
+            raise ValidationException(str(exc)) from exc
+        with span("service.list_offerwalls_page", page_size=page_size, cursor=cursor is not None):
+            items = list(
+                await self.repo.list(
+                    name=name, url=url, page=page, page_size=page_size, after=after, projection=projection
+                )
+            )
+        # Неполная страница — последняя
+        next_cursor = encode_cursor(items[-1].token) if items and len(items) == page_size else None
+        return OfferWallPage(items=items, next_cursor=next_cursor, projection=projection)
 
     async def get_offerwall(self, token: str) -> OfferWall:
-        offerwall = await self.repo.get_by_token(token=token)
+        with span("service.get_offerwall"):
+            offerwall = await self.repo.get_by_token(token=token)
         if not offerwall:
             raise NotFoundException("Not found.")
         return offerwall
 
     async def get_offerwall_by_url(self, url: str) -> OfferWall:
-        offerwall = await self.repo.get_by_url(url=url)
+        with span("service.get_offerwall_by_url"):
+            offerwall = await self.repo.get_by_url(url=url)
         if not offerwall:
             raise NotFoundException("Not found.")
         return offerwall
 
+    async def get_offerwalls_by_tokens(self, tokens: Sequence[str]) -> list[tuple[str, Optional[OfferWall]]]:
+        if not tokens:
+            raise ValidationException("At least one token is required.")
+        if len(tokens) > settings.batch_max_tokens:
+            raise ValidationException(f"At most {settings.batch_max_tokens} tokens are allowed.")
+        with span("service.get_offerwalls_by_tokens", tokens=len(tokens)):
+            offerwalls = await self.repo.get_many_by_tokens(tokens)
+        return list(zip(tokens, offerwalls))
+
     def get_offer_names(self) -> list[str]:
-        # Используем первый элемент кортежа (как в оригинальном DRF: offer_name[0])
-        choices = getattr(OfferChoices, "choices", [])
-        return [offer_name[0] for offer_name in choices]
\ No newline at end of file
+        return list(offer_names.names)
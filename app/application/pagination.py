@@ -0,0 +1,25 @@
+import base64
+import json
+from typing import Optional
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(after: str) -> str:
+    """Непрозрачный курсор: base64url(JSON) с ключом последнего элемента страницы."""
+    raw = json.dumps({"after": after}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> str:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        after: Optional[str] = payload.get("after") if isinstance(payload, dict) else None
+    except (ValueError, UnicodeError) as exc:
+        raise InvalidCursor("Invalid cursor.") from exc
+    if not isinstance(after, str):
+        raise InvalidCursor("Invalid cursor.")
+    return after
@@ -0,0 +1,35 @@
+from typing import Optional
+
+from app.domain.entities import WALL_FIELDS, WALL_RELATIONS, OfferWallProjection
+
+
+class InvalidProjection(ValueError):
+    pass
+
+
+def _names(value: str, allowed: tuple, parameter: str) -> set:
+    names = {name.strip() for name in value.split(",") if name.strip()}
+    unknown = names - set(allowed)
+    if unknown:
+        raise InvalidProjection(
+            f"Unknown {parameter}: {', '.join(sorted(unknown))}. Allowed: {', '.join(allowed)}."
+        )
+    return names
+
+
+def parse_projection(
+    fields: Optional[str], include: Optional[str]
+) -> Optional[OfferWallProjection]:
+    """Проекция из параметров `fields` и `include` (списки через запятую).
+
+    None — полный офферволл. `include=` (пустое значение) отключает оба списка назначений.
+    """
+    if fields is None and include is None:
+        return None
+    selected = WALL_FIELDS if fields is None else _names(fields, WALL_FIELDS, "fields") | {"token"}
+    included = WALL_RELATIONS if include is None else _names(include, WALL_RELATIONS, "include")
+    projection = OfferWallProjection(
+        fields=tuple(name for name in WALL_FIELDS if name in selected),
+        include=tuple(name for name in WALL_RELATIONS if name in included),
+    )
+    return None if projection == OfferWallProjection() else projection
@@ -0,0 +1,151 @@
+"""Командная строка: `python -m app [serve]`, `python -m app migrate` и `python -m app import`.
+
+Примеры:
+    python -m app
+    python -m app migrate
+    python -m app migrate 0001
+    python -m app import offers offers.jsonl
+    python -m app import offerwalls walls.csv --chunk-size 10000
+    python -m app import offer_assignments - --format jsonl < assignments.jsonl
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import json
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+FORMATS = ("jsonl", "csv")
+
+
+@contextmanager
+def open_input(path: str) -> Iterator[TextIO]:
+    if path == "-":
+        yield io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+        return
+    with open(path, encoding="utf-8", newline="") as handle:
+        yield handle
+
+
+def read_jsonl(stream: TextIO) -> Iterator[Dict[str, Any]]:
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if not isinstance(record, dict):
+            raise ValueError(f"line {number}: expected a JSON object")
+        yield record
+
+
+def read_csv(stream: TextIO) -> Iterator[Dict[str, Any]]:
+    yield from csv.DictReader(stream)
+
+
+def detect_format(path: str, explicit: Optional[str]) -> str:
+    if explicit:
+        return explicit
+    suffix = Path(path).suffix.lower().lstrip(".")
+    if suffix in ("jsonl", "ndjson"):
+        return "jsonl"
+    if suffix == "csv":
+        return "csv"
+    raise SystemExit(f"cannot infer the format of {path!r}; pass --format")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from app.infrastructure.sqlalchemy.bulk_import import TARGETS
+
+    parser = argparse.ArgumentParser(prog="python -m app", description="L10nLight service")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("serve", help="run the HTTP server (default)")
+
+    migrate = commands.add_parser("migrate", help="upgrade the database schema")
+    migrate.add_argument("revision", nargs="?", default="head", help="target revision (default: head)")
+
+    importer = commands.add_parser("import", help="bulk-load a table from JSONL or CSV")
+    importer.add_argument("table", choices=sorted(TARGETS))
+    importer.add_argument("path", help="input file, or - for stdin")
+    importer.add_argument("--format", choices=FORMATS)
+    importer.add_argument("--chunk-size", type=int, default=5_000, help="rows per transaction")
+    importer.add_argument(
+        "--on-conflict",
+        choices=("update", "ignore", "error"),
+        default="update",
+        help="existing keys: update them, skip the row, or fail (assignments: update replaces a wall's list)",
+    )
+    importer.add_argument(
+        "--no-copy", action="store_true", help="use INSERT even where COPY is available"
+    )
+    return parser
+
+
+async def run_migrate(args: argparse.Namespace) -> int:
+    from app.db import current_revision, engine, migrate_db
+
+    try:
+        await migrate_db(args.revision)
+        print(f"database schema at revision {await current_revision()}", file=sys.stderr)
+    finally:
+        await engine.dispose()
+    return 0
+
+
+async def run_import(args: argparse.Namespace) -> int:
+    from app.db import check_schema, engine
+    from app.infrastructure.sqlalchemy.bulk_import import TARGETS, ImportRecordError, import_records
+
+    fmt = detect_format(args.path, args.format)
+    reader = read_jsonl if fmt == "jsonl" else read_csv
+
+    def progress(stats: Any) -> None:
+        print(
+            f"\r{args.table}: {stats.rows} rows, {stats.rows_per_second:,.0f} rows/s",
+            end="",
+            file=sys.stderr,
+        )
+
+    await check_schema()
+    try:
+        with open_input(args.path) as stream:
+            stats = await import_records(
+                engine,
+                TARGETS[args.table],
+                reader(stream),
+                chunk_size=args.chunk_size,
+                on_conflict=args.on_conflict,
+                use_copy=not args.no_copy,
+                progress=progress,
+            )
+    except (ImportRecordError, ValueError) as exc:
+        print(f"\nimport failed: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        await engine.dispose()
+    print(file=sys.stderr)
+    print(
+        f"{args.table}: imported {stats.rows} rows in {stats.chunks} chunks, "
+        f"{stats.seconds:.2f} s ({stats.rows_per_second:,.0f} rows/s)"
+    )
+    return 0
+
+
+def serve() -> int:
+    import uvicorn
+
+    from app.server import app
+
+    uvicorn.run(app, host="0.0.0.0", port=5000)
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "migrate":
+        return asyncio.run(run_migrate(args))
+    if args.command == "import":
+        return asyncio.run(run_import(args))
+    return serve()
@@ -0,0 +1,153 @@
+"""Сжатие тел ответов по Accept-Encoding: gzip, а также br и zstd, если установлены
+пакеты brotli и zstandard.
+
+Закэшированные тела офферволлов сжимаются один раз на версию (варианты хранятся
+в EncodedResponse рядом с исходным телом). Остальные ответы сжимает
+`compression_middleware_factory` — на каждый запрос и на быстрых уровнях; потоковые ответы
+(экспорт NDJSON) проходят без изменений.
+"""
+
+import gzip
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+from litestar.datastructures import MutableScopeHeaders
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+
+Compressor = Callable[[bytes], bytes]
+
+# Сжатие на каждый запрос (middleware): быстрые уровни
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+# Варианты в кэше тел сжимаются один раз на версию: уровни ближе к максимальным
+STORED_GZIP_LEVEL = 9
+STORED_BROTLI_QUALITY = 9
+STORED_ZSTD_LEVEL = 12
+
+
+def _available_codecs(
+    gzip_level: int, brotli_quality: int, zstd_level: int
+) -> Dict[str, Compressor]:
+    codecs: Dict[str, Compressor] = {}
+    try:
+        import brotli
+    except ImportError:
+        pass
+    else:
+        codecs["br"] = lambda body: brotli.compress(body, quality=brotli_quality)
+    try:
+        import zstandard
+    except ImportError:
+        pass
+    else:
+        zstd = zstandard.ZstdCompressor(level=zstd_level)
+        codecs["zstd"] = zstd.compress
+    codecs["gzip"] = lambda body: gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    return codecs
+
+
+# В порядке предпочтения сервера при равных q
+CODECS: Dict[str, Compressor] = _available_codecs(GZIP_LEVEL, BROTLI_QUALITY, ZSTD_LEVEL)
+STORED_CODECS: Dict[str, Compressor] = _available_codecs(
+    STORED_GZIP_LEVEL, STORED_BROTLI_QUALITY, STORED_ZSTD_LEVEL
+)
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """Кодировки из Accept-Encoding с их q (некорректный q считается нулевым)."""
+    weights: Dict[str, float] = {}
+    for item in header.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+    return weights
+
+
+def negotiate(header: Optional[str], available: Iterable[str] = CODECS) -> Optional[str]:
+    """Кодировка для ответа или None (без сжатия)."""
+    if not header:
+        return None
+    weights = parse_accept_encoding(header)
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for name in available:
+        q = weights.get(name, wildcard)
+        if q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def compress(body: bytes, encoding: str, stored: bool = False) -> bytes:
+    """Сжать тело; `stored` — для вариантов, которые кэшируются (максимальные уровни)."""
+    return (STORED_CODECS if stored else CODECS)[encoding](body)
+
+
+def compression_middleware_factory(min_size: int, encodings: Sequence[str] = tuple(CODECS)) -> Any:
+    """Фабрика middleware, сжимающего целые тела ответов не меньше `min_size` байт.
+
+    Ответы, у которых Content-Encoding уже выставлен (предсжатые варианты из
+    кэша), и потоковые ответы не трогает.
+    """
+
+    def factory(app: ASGIApp) -> ASGIApp:
+        async def middleware(scope: Scope, receive: Receive, send: Send) -> None:
+            if scope["type"] != "http":
+                await app(scope, receive, send)
+                return
+            accept = None
+            for key, value in scope["headers"]:
+                if key == b"accept-encoding":
+                    accept = value.decode("latin-1")
+                    break
+            encoding = negotiate(accept, encodings)
+            start: Optional[Message] = None
+            passthrough = False
+
+            async def send_wrapper(message: Message) -> None:
+                nonlocal start, passthrough
+                if message["type"] == "http.response.start":
+                    start = message
+                    return
+                if message["type"] != "http.response.body" or start is None:
+                    await send(message)
+                    return
+                if passthrough:
+                    await send(message)
+                    return
+                headers = MutableScopeHeaders(start)
+                body = message.get("body", b"")
+                if (
+                    message.get("more_body", False)
+                    or "content-encoding" in headers
+                    or len(body) < min_size
+                    or start["status"] in (204, 304)
+                ):
+                    passthrough = True
+                    await send(start)
+                    await send(message)
+                    return
+                if "accept-encoding" not in headers.get("vary", "").lower():
+                    headers.extend_header_value("vary", "Accept-Encoding")
+                if encoding is not None:
+                    body = compress(body, encoding)
+                    headers["Content-Encoding"] = encoding
+                    headers["Content-Length"] = str(len(body))
+                    message = {**message, "body": body}
+                await send(start)
+                await send(message)
+
+            await app(scope, receive, send_wrapper)
+
+        return middleware
+
+    return factory
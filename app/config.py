@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List, Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import field_validator
 import json
@@ -11,7 +11,64 @@ class Settings(BaseSettings):
     granian_workers: int = 2
     db_url: str
     echo_sql: bool = False
+    # Применять миграции при запуске вместо проверки версии схемы (один процесс, разработка)
+    db_auto_migrate: bool = False
+    db_pool_size: int = 10
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_pool_warmup: int = 0
+    # Кэш подготовленных выражений asyncpg (0 — выключен, нужно для pgbouncer)
+    db_statement_cache_size: int = 100
     log_level: str = "INFO"  # Default to INFO level logging
+    cache_enabled: bool = True
+    cache_ttl_seconds: float = 30.0
+    cache_negative_ttl_seconds: float = 5.0
+    cache_max_entries: int = 10_000
+    coalesce_enabled: bool = True
+    repository_fetch_mode: Literal["orm", "core"] = "core"
+    max_page_size: int = 100
+    batch_max_tokens: int = 100
+    export_chunk_size: int = 500
+    # Кодирование тел с офферволлами: msgspec.Struct или pydantic-схемы (формат одинаковый)
+    response_encoder: Literal["pydantic", "msgspec"] = "msgspec"
+    offerwall_cache_control: str = "public, max-age=30"
+    # Список названий меняется только с релизом; после max-age клиент сверяет ETag
+    offer_names_cache_control: str = "public, max-age=86400"
+    # Сжатие ответов по Accept-Encoding; тела короче порога отдаются как есть
+    compression_enabled: bool = True
+    compression_min_size: int = 1024
+    snapshot_enabled: bool = False
+    snapshot_refresh_interval_seconds: float = 5.0
+    snapshot_max_age_seconds: float = 300.0
+    shared_snapshot_enabled: bool = False
+    shared_snapshot_path: str = "/tmp/l10nlight/offerwalls.snapshot"
+    # Как часто индекс триграмм (поиск на SQLite) сверяется со счётчиком изменений
+    search_index_refresh_interval_seconds: float = 1.0
+    metrics_enabled: bool = True
+    # Бюджет SQL-выражений на HTTP-запрос и порог повторов одной формы (N+1)
+    query_budget_mode: Literal["off", "log", "raise"] = "log"
+    query_budget_max_statements: int = 20
+    query_budget_repeat_threshold: int = 5
+    metrics_path: str = "/metrics"
+    # Admission control: одновременных запросов на маршрут, длина очереди и срок ожидания в ней
+    admission_enabled: bool = True
+    admission_max_concurrency: int = 20
+    admission_route_limits: Dict[str, int] = {}
+    admission_max_queue: int = 50
+    admission_queue_timeout_seconds: float = 0.5
+    admission_retry_after_seconds: int = 1
+    # Отклонённые запросы получают устаревшие записи кэша офферволлов вместо 503
+    admission_serve_stale: bool = True
+    admission_stale_ttl_seconds: float = 300.0
+    # Спаны запросов (controller → сервис → репозиторий → SQL → сериализация) и их экспортёр
+    tracing_enabled: bool = False
+    tracing_exporter: Literal["memory", "file"] = "file"
+    tracing_file_path: str = "/tmp/l10nlight/traces.jsonl"
+    tracing_sample_rate: float = 1.0
+    # Журнал SQL-выражений дольше порога (мс); 0 — выключен
+    slow_query_threshold_ms: float = 200.0
 
     model_config = SettingsConfigDict(
         env_file=".env", env_prefix="APP_", case_sensitive=False
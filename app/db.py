@@ -1,18 +1,197 @@
+import asyncio
+import time
 from collections.abc import AsyncGenerator
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
-from app.config import settings
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app.config import Settings, settings
 
 class Base(DeclarativeBase):
     pass
 
-engine = create_async_engine(settings.db_url, echo=settings.echo_sql, future=True)
+@dataclass
+class PoolWaitStats:
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+pool_wait_stats = PoolWaitStats()
+
+class InstrumentedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool):
+    """Очередь соединений, измеряющая время ожидания выдачи соединения."""
+
+    def _do_get(self) -> Any:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_wait_stats.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            pool_wait_stats.checkouts += 1
+            pool_wait_stats.wait_seconds_total += waited
+            pool_wait_stats.wait_seconds_max = max(pool_wait_stats.wait_seconds_max, waited)
+
+def engine_options(config: Settings) -> dict[str, Any]:
+    options: dict[str, Any] = {"echo": config.echo_sql, "future": True}
+    url = make_url(config.db_url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory SQLite живёт в одном соединении (StaticPool): настройки пула неприменимы
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncAdaptedQueuePool,
+        pool_size=config.db_pool_size,
+        max_overflow=config.db_max_overflow,
+        pool_timeout=config.db_pool_timeout,
+        pool_recycle=config.db_pool_recycle,
+        pool_pre_ping=config.db_pool_pre_ping,
+    )
+    if url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {"prepared_statement_cache_size": config.db_statement_cache_size}
+    return options
+
+engine = create_async_engine(settings.db_url, **engine_options(settings))
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
 
-async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
-    async with SessionLocal() as session:
+def pool_status() -> dict[str, float]:
+    """Текущее состояние пула соединений и накопленная статистика ожидания."""
+    pool = engine.sync_engine.pool
+    status: dict[str, float] = {
+        "checkouts": pool_wait_stats.checkouts,
+        "timeouts": pool_wait_stats.timeouts,
+        "wait_seconds_total": pool_wait_stats.wait_seconds_total,
+        "wait_seconds_max": pool_wait_stats.wait_seconds_max,
+    }
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+        )
+    return status
+
+class LazySession:
+    """Заместитель AsyncSession, создающий сессию при первом обращении.
+
+    Обработчики без SQL и попадания в кэш не создают сессию и не закрывают её.
+    `bind` доступен без создания сессии: репозитории читают по нему диалект.
+    """
+
+    def __init__(self, factory: async_sessionmaker[AsyncSession]) -> None:
+        self._factory = factory
+        self._session: AsyncSession | None = None
+
+    @property
+    def created(self) -> bool:
+        return self._session is not None
+
+    @property
+    def bind(self) -> Any:
+        if self._session is not None:
+            return self._session.bind
+        return self._factory.kw["bind"]
+
+    def get(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._factory()
+        return self._session
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+async def get_db_session() -> AsyncGenerator[LazySession, None]:
+    session = LazySession(SessionLocal)
+    try:
         yield session
+    finally:
+        await session.close()
+
+class SchemaVersionError(RuntimeError):
+    """Схема базы не на последней ревизии миграций."""
+
+MIGRATIONS_PATH = Path(__file__).resolve().parent.parent / "migrations"
+
+def alembic_config() -> Any:
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_PATH))
+    return config
+
+def head_revision() -> str:
+    from alembic.script import ScriptDirectory
+
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+async def current_revision(bind: AsyncEngine | None = None) -> str | None:
+    from alembic.runtime.migration import MigrationContext
+
+    async with (bind or engine).connect() as conn:
+        return await conn.run_sync(
+            lambda sync_conn: MigrationContext.configure(sync_conn).get_current_revision()
+        )
+
+async def migrate_db(revision: str = "head", bind: AsyncEngine | None = None) -> None:
+    """Применить миграции до `revision` (`python -m app migrate`)."""
+    from alembic import command
+
+    config = alembic_config()
+
+    def upgrade(sync_conn: Any) -> None:
+        config.attributes["connection"] = sync_conn
+        command.upgrade(config, revision)
+
+    async with (bind or engine).begin() as conn:
+        await conn.run_sync(upgrade)
+
+async def check_schema(bind: AsyncEngine | None = None) -> None:
+    """Проверка при запуске: схема на последней ревизии, без DDL.
+
+    Каждый воркер только читает alembic_version; миграции применяются отдельным
+    шагом развёртывания (или здесь, если включён APP_DB_AUTO_MIGRATE).
+    """
+    current, head = await current_revision(bind), head_revision()
+    if current == head:
+        return
+    if settings.db_auto_migrate:
+        await migrate_db(bind=bind)
+        return
+    raise SchemaVersionError(
+        f"database schema is at revision {current or '<none>'}, expected {head}; "
+        "run `python -m app migrate`"
+    )
+
+async def check_schema_on_startup() -> None:
+    """Хук on_startup: Litestar передаёт приложение хукам с параметрами, поэтому без `bind`."""
+    await check_schema()
+
+async def warm_up_pool() -> None:
+    """Открыть db_pool_warmup соединений до приёма трафика."""
+    count = min(settings.db_pool_warmup, settings.db_pool_size)
+    if count <= 0:
+        return
+
+    async def open_connection() -> AsyncConnection:
+        conn = await engine.connect()
+        await conn.exec_driver_sql("SELECT 1")
+        return conn
 
-async def init_db() -> None:
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    connections = await asyncio.gather(*(open_connection() for _ in range(count)), return_exceptions=True)
+    for conn in connections:
+        if isinstance(conn, AsyncConnection):
+            await conn.close()
+    errors = [conn for conn in connections if isinstance(conn, BaseException)]
+    if errors:
+        raise errors[0]
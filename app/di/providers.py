@@ -1,10 +1,118 @@
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Sequence, cast
+
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.config import settings
+from app.db import LazySession, SessionLocal, engine
+from app.infrastructure.admission.offerwall_repository import SheddingOfferWallRepository
+from app.infrastructure.cache.offerwall_repository import CachedOfferWallRepository, OfferWallCache
+from app.infrastructure.cache.response_cache import ResponseBodyCache
+from app.infrastructure.search.offerwall_search import sqlite_trigram_search
+from app.infrastructure.coalescing.offerwall_repository import CoalescingOfferWallRepository
+from app.infrastructure.coalescing.singleflight import SingleFlight
+from app.infrastructure.snapshot.offerwall_repository import SnapshotOfferWallRepository, SnapshotStore
+from app.infrastructure.snapshot.shared_snapshot import SharedSnapshotOfferWallRepository, SharedSnapshotStore
 from app.infrastructure.sqlalchemy.offerwall_repository import SqlAlchemyOfferWallRepository
+from app.serialization import encoder_for
 from app.application.offerwall_service import OfferWallService
+from app.domain.entities import OfferWall
 from app.domain.ports.offerwall_repository import OfferWallRepository
 
-def provide_offerwall_repository(db_session: AsyncSession) -> OfferWallRepository:
-    return SqlAlchemyOfferWallRepository(db_session)
+# Процессный кэш: общий для всех запросов одного воркера
+offerwall_cache = OfferWallCache(
+    max_entries=settings.cache_max_entries,
+    ttl=settings.cache_ttl_seconds,
+    negative_ttl=settings.cache_negative_ttl_seconds,
+    stale_ttl=settings.admission_stale_ttl_seconds if settings.admission_serve_stale else 0.0,
+)
+# Закодированные JSON-тела офферволлов (по версии объекта из кэша)
+response_body_cache = ResponseBodyCache(max_entries=settings.cache_max_entries)
+# Кодировщик тел ответов (APP_RESPONSE_ENCODER)
+response_encoder = encoder_for(settings.response_encoder)
+# Выборки из БД, выполняющиеся сейчас (общие для конкурентных запросов)
+offerwall_flight = SingleFlight()
+# Снапшот всех офферволлов в памяти (APP_SNAPSHOT_ENABLED)
+offerwall_snapshot = SnapshotStore(
+    SessionLocal,
+    refresh_interval=settings.snapshot_refresh_interval_seconds,
+    max_age=settings.snapshot_max_age_seconds,
+)
+# Снапшот в memory-mapped файле, общий для воркеров (APP_SHARED_SNAPSHOT_ENABLED)
+shared_offerwall_snapshot = SharedSnapshotStore(
+    SessionLocal,
+    path=Path(settings.shared_snapshot_path),
+    refresh_interval=settings.snapshot_refresh_interval_seconds,
+    max_age=settings.snapshot_max_age_seconds,
+)
+
+async def start_offerwall_snapshot() -> None:
+    if settings.shared_snapshot_enabled:
+        await shared_offerwall_snapshot.start()
+    elif settings.snapshot_enabled:
+        await offerwall_snapshot.start()
+
+async def stop_offerwall_snapshot() -> None:
+    await shared_offerwall_snapshot.stop()
+    await offerwall_snapshot.stop()
+
+async def start_offerwall_search() -> None:
+    # На PostgreSQL подстроку ищет pg_trgm, индекс в памяти не нужен
+    if engine.dialect.name == "sqlite":
+        await sqlite_trigram_search.start(SessionLocal, settings.search_index_refresh_interval_seconds)
+
+async def stop_offerwall_search() -> None:
+    await sqlite_trigram_search.stop()
+
+def _database_repository(session: LazySession) -> OfferWallRepository:
+    # LazySession для репозитория неотличим от AsyncSession: сессия появится при первом запросе
+    repo: OfferWallRepository = SqlAlchemyOfferWallRepository(
+        cast(AsyncSession, session), fetch_mode=settings.repository_fetch_mode
+    )
+    if settings.admission_enabled and settings.admission_serve_stale:
+        # Запрос, не получивший слот admission control, к БД не допускается
+        repo = SheddingOfferWallRepository(repo)
+    return repo
+
+@asynccontextmanager
+async def _flight_repository() -> AsyncIterator[OfferWallRepository]:
+    """Репозиторий объединённой выборки.
+
+    Сессия принадлежит выборке, а не запросу, который её начал: его отмена
+    закрывает DI-сессию, а выборка продолжается для присоединившихся.
+    """
+    session = LazySession(SessionLocal)
+    try:
+        yield _database_repository(session)
+    finally:
+        await session.close()
+
+def provide_offerwall_repository(db_session: LazySession) -> OfferWallRepository:
+    if settings.snapshot_enabled and not settings.shared_snapshot_enabled:
+        return SnapshotOfferWallRepository(offerwall_snapshot)
+    repo: OfferWallRepository
+    if settings.shared_snapshot_enabled:
+        # Декодирование из файла дешёвое, но не бесплатное: горячие записи держим в кэше
+        repo = SharedSnapshotOfferWallRepository(shared_offerwall_snapshot)
+    else:
+        repo = _database_repository(db_session)
+        if settings.coalesce_enabled:
+            repo = CoalescingOfferWallRepository(repo, offerwall_flight, _flight_repository)
+    if settings.cache_enabled:
+        repo = CachedOfferWallRepository(repo, offerwall_cache)
+    return repo
+
+async def stream_offerwalls(chunk_size: int) -> AsyncIterator[Sequence[OfferWall]]:
+    """Все офферволлы порциями для потоковой выгрузки.
+
+    Сессия своя: DI-сессия запроса закрывается до отправки тела потокового ответа.
+    """
+    session = LazySession(SessionLocal)
+    try:
+        async for chunk in provide_offerwall_repository(session).stream_all(chunk_size):
+            yield chunk
+    finally:
+        await session.close()
 
 def provide_offerwall_service(repo: OfferWallRepository) -> OfferWallService:
     return OfferWallService(repo)
\ No newline at end of file
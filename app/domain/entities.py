@@ -1,7 +1,10 @@
 from dataclasses import dataclass
-from typing import Optional, List
+from typing import Dict, Optional, Sequence, Tuple
 
-@dataclass
+# Сущности неизменяемые и со __slots__: один экземпляр Offer безопасно разделяют
+# назначения разных офферволлов, кэши и снапшоты.
+
+@dataclass(frozen=True, slots=True)
 class Offer:
     uuid: str
     id: int
@@ -12,25 +15,109 @@ class Offer:
     term_to: Optional[int] = None
     percent_rate: Optional[int] = None
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class OfferWallOffer:
     offer: Offer
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class OfferWallPopupOffer:
     offer: Offer
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class OfferWall:
     token: str
-    name: str
-    url: str
+    # None только у офферволлов, загруженных с проекцией без этого поля (list с fields=)
+    name: Optional[str]
+    url: Optional[str]
     description: Optional[str] = None
-    offer_assignments: List[OfferWallOffer] = None
-    popup_assignments: List[OfferWallPopupOffer] = None
+    offer_assignments: Tuple[OfferWallOffer, ...] = ()
+    popup_assignments: Tuple[OfferWallPopupOffer, ...] = ()
 
     def __post_init__(self):
-        if self.offer_assignments is None:
-            self.offer_assignments = []
-        if self.popup_assignments is None:
-            self.popup_assignments = []
\ No newline at end of file
+        # Списки (и None) от вызывающего кода приводятся к кортежам
+        if not isinstance(self.offer_assignments, tuple):
+            object.__setattr__(self, "offer_assignments", tuple(self.offer_assignments or ()))
+        if not isinstance(self.popup_assignments, tuple):
+            object.__setattr__(self, "popup_assignments", tuple(self.popup_assignments or ()))
+
+# Скалярные поля и списки назначений офферволла в порядке вывода
+WALL_FIELDS = ("token", "name", "url", "description")
+WALL_RELATIONS = ("offer_assignments", "popup_assignments")
+
+@dataclass(frozen=True, slots=True)
+class OfferWallProjection:
+    """Какие поля офферволла нужны вызывающему.
+
+    token входит всегда (на нём держится курсор). Поля вне проекции репозиторий
+    вправе не загружать: в сущности на их месте None или пустой кортеж.
+    """
+    fields: Tuple[str, ...] = WALL_FIELDS
+    include: Tuple[str, ...] = WALL_RELATIONS
+
+    @property
+    def keys(self) -> Tuple[str, ...]:
+        return self.fields + self.include
+
+@dataclass(frozen=True, slots=True)
+class OfferWallPage:
+    items: Sequence[OfferWall]
+    next_cursor: Optional[str] = None
+    # None — офферволлы целиком
+    projection: Optional[OfferWallProjection] = None
+
+
+class OfferInternTable:
+    """Один экземпляр Offer (и его обёрток назначений) на uuid в пределах процесса.
+
+    Запись заменяется, если значения полей изменились; при переполнении таблица
+    очищается целиком — офферов в справочнике на порядки меньше `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = 100_000) -> None:
+        self.max_entries = max_entries
+        self._entries: Dict[str, Tuple[Offer, OfferWallOffer, OfferWallPopupOffer]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _entry(self, source) -> Tuple[Offer, OfferWallOffer, OfferWallPopupOffer]:
+        """`source` — любой объект с полями Offer (строка выборки, ORM-модель, Offer)."""
+        entry = self._entries.get(source.uuid)
+        if entry is not None:
+            offer = entry[0]
+            if (
+                offer.id == source.id
+                and offer.url == source.url
+                and offer.is_active == source.is_active
+                and offer.name == source.name
+                and offer.sum_to == source.sum_to
+                and offer.term_to == source.term_to
+                and offer.percent_rate == source.percent_rate
+            ):
+                return entry
+        if len(self._entries) >= self.max_entries:
+            self._entries.clear()
+        offer = source if type(source) is Offer else Offer(
+            uuid=source.uuid,
+            id=source.id,
+            url=source.url,
+            is_active=source.is_active,
+            name=source.name,
+            sum_to=source.sum_to,
+            term_to=source.term_to,
+            percent_rate=source.percent_rate,
+        )
+        entry = self._entries[offer.uuid] = (offer, OfferWallOffer(offer=offer), OfferWallPopupOffer(offer=offer))
+        return entry
+
+    def offer(self, source) -> Offer:
+        return self._entry(source)[0]
+
+    def offer_assignment(self, source) -> OfferWallOffer:
+        return self._entry(source)[1]
+
+    def popup_assignment(self, source) -> OfferWallPopupOffer:
+        return self._entry(source)[2]
@@ -0,0 +1,40 @@
+import hashlib
+from types import MappingProxyType
+from typing import Iterable, Mapping, Tuple
+
+
+class UnknownOfferName(ValueError):
+    pass
+
+
+class OfferNameRegistry:
+    """Неизменяемый справочник допустимых названий предложений.
+
+    Строится один раз: кортеж в исходном порядке, индекс name -> позиция для
+    проверки за O(1) и версия — хэш содержимого (меняется только вместе со списком).
+    """
+
+    __slots__ = ("names", "index", "version")
+
+    def __init__(self, names: Iterable[str]) -> None:
+        self.names: Tuple[str, ...] = tuple(dict.fromkeys(names))
+        self.index: Mapping[str, int] = MappingProxyType(
+            {name: i for i, name in enumerate(self.names)}
+        )
+        self.version = hashlib.blake2b("\n".join(self.names).encode(), digest_size=8).hexdigest()
+
+    @classmethod
+    def from_choices(cls, choices: Iterable[Tuple[str, str]]) -> "OfferNameRegistry":
+        """Из пар (значение, подпись) в стиле Django choices; название — значение."""
+        return cls(value for value, _ in choices)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.index
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def validate(self, name: str) -> str:
+        if name not in self.index:
+            raise UnknownOfferName(f"Unknown offer name: {name!r}")
+        return name
@@ -1,13 +1,34 @@
-from typing import Optional, Sequence, Protocol, runtime_checkable
-from app.domain.entities import OfferWall
+from typing import AsyncIterator, Optional, Sequence, Protocol, runtime_checkable
+from app.domain.entities import OfferWall, OfferWallProjection
 
 @runtime_checkable
 class OfferWallRepository(Protocol):
-    async def list(self, name: Optional[str], url: Optional[str], page: int, page_size: int) -> Sequence[OfferWall]:
+    async def list(
+        self,
+        name: Optional[str],
+        url: Optional[str],
+        page: int,
+        page_size: int,
+        after: Optional[str] = None,
+        projection: Optional[OfferWallProjection] = None,
+    ) -> Sequence[OfferWall]:
+        """Офферволлы в порядке token; при `after` — начиная со следующего за ним (page игнорируется).
+
+        С `projection` поля вне её можно не загружать (None — нужны все).
+        """
         ...
 
     async def get_by_token(self, token: str) -> Optional[OfferWall]:
         ...
 
     async def get_by_url(self, url: str) -> Optional[OfferWall]:
-        ...
\ No newline at end of file
+        """Офферволл, чей URL совпадает с `url` после normalize_url (app.domain.urls)."""
+        ...
+
+    async def get_many_by_tokens(self, tokens: Sequence[str]) -> Sequence[Optional[OfferWall]]:
+        """Офферволлы в порядке `tokens`; None на месте ненайденных."""
+        ...
+
+    def stream_all(self, chunk_size: int) -> AsyncIterator[Sequence[OfferWall]]:
+        """Все офферволлы в порядке token порциями до `chunk_size` (для экспорта)."""
+        ...
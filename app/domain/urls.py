@@ -0,0 +1,64 @@
+"""Каноническая форма URL офферволла и её хэш для поиска по URL.
+
+Варианты записи одного адреса сводятся к одному ключу:
+
+- схема и хост — в нижнем регистре, порт по умолчанию (80/443) отбрасывается;
+- завершающий "/" пути и фрагмент (#...) отбрасываются;
+- параметры запроса сортируются по имени (порядок повторов одного имени сохраняется);
+- %-последовательности — в верхнем регистре, незарезервированные символы раскодируются.
+
+Значение без схемы (`wall-1.example/path`) читается как хост с путём.
+Хэш хранится в offerwalls.url_hash под уникальным индексом: правила
+нормализации менять только вместе с миграцией, пересчитывающей столбец.
+"""
+
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+URL_HASH_LENGTH = 32
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+_PERCENT_ESCAPE = re.compile(r"%[0-9A-Fa-f]{2}")
+_UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+
+
+def _normalize_escape(match: "re.Match[str]") -> str:
+    char = chr(int(match.group(0)[1:], 16))
+    return char if char in _UNRESERVED else match.group(0).upper()
+
+
+def normalize_url(url: str) -> str:
+    """Канонический ключ URL; идемпотентна: normalize_url(normalize_url(u)) == normalize_url(u)."""
+    parts = urlsplit(url.strip())
+    if not parts.scheme and not parts.netloc:
+        parts = urlsplit(f"//{url.strip()}")
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").rstrip(".")
+    if ":" in netloc:
+        netloc = f"[{netloc}]"  # IPv6
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is not None and port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+    if parts.username is not None:
+        userinfo = (
+            parts.username if parts.password is None else f"{parts.username}:{parts.password}"
+        )
+        netloc = f"{userinfo}@{netloc}"
+    path = _PERCENT_ESCAPE.sub(_normalize_escape, parts.path).rstrip("/")
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    query = urlencode(sorted(params, key=lambda item: item[0]))
+    key = urlunsplit((scheme, netloc, path, query, ""))
+    return key[2:] if not scheme else key
+
+
+def hash_normalized_url(normalized: str) -> str:
+    """Хэш фиксированной длины (URL_HASH_LENGTH hex-символов) уже нормализованного URL."""
+    return hashlib.blake2b(normalized.encode(), digest_size=URL_HASH_LENGTH // 2).hexdigest()
+
+
+def url_hash(url: str) -> str:
+    return hash_normalized_url(normalize_url(url))
@@ -4,7 +4,10 @@ from litestar.status_codes import HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND, HTTP
 from litestar.exceptions import NotFoundException
 from litestar.response import Response
 from pydantic import ValidationError
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
+
+from app.admission import OVERLOADED_DETAIL, Overloaded
+from app.config import settings
 
 def not_found_handler(_request: Any, exc: NotFoundException) -> Response[dict[str, Any]]:
     return Response(content={"detail": "Not found."}, status_code=404)
@@ -12,5 +15,20 @@ def not_found_handler(_request: Any, exc: NotFoundException) -> Response[dict[st
 def pydantic_validation_error_handler(_request: Any, exc: ValidationError) -> Response[dict[str, Any]]:
     return Response(content={"detail": str(exc)}, status_code=400)
 
+def overloaded_handler(_request: Any, exc: Overloaded) -> Response[dict[str, Any]]:
+    return Response(
+        content={"detail": OVERLOADED_DETAIL},
+        status_code=503,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+def pool_timeout_handler(_request: Any, exc: PoolTimeoutError) -> Response[dict[str, Any]]:
+    # Пул исчерпан — перегрузка, а не ошибка БД: клиент может повторить позже
+    return Response(
+        content={"detail": OVERLOADED_DETAIL},
+        status_code=503,
+        headers={"Retry-After": str(settings.admission_retry_after_seconds)},
+    )
+
 def sqlalchemy_error_handler(_request: Any, exc: SQLAlchemyError) -> Response[dict[str, Any]]:
     return Response(content={"detail": "Database error", "error": str(exc)}, status_code=500)
@@ -0,0 +1,47 @@
+from typing import AsyncIterator, Optional, Sequence
+
+from app.admission import check_not_shedding
+from app.domain.entities import OfferWall, OfferWallProjection
+from app.domain.ports.offerwall_repository import OfferWallRepository
+
+
+class SheddingOfferWallRepository(OfferWallRepository):
+    """Не пускает к БД запросы, выполняющиеся в режиме сброса нагрузки.
+
+    Оборачивает репозиторий, который ходит в БД; кэш и объединение выборок
+    стоят снаружи, поэтому отклонённый admission control запрос ещё может
+    получить ответ из кэша или присоединиться к идущей выборке.
+    """
+
+    def __init__(self, inner: OfferWallRepository) -> None:
+        self.inner = inner
+
+    async def list(
+        self,
+        name: Optional[str],
+        url: Optional[str],
+        page: int,
+        page_size: int,
+        after: Optional[str] = None,
+        projection: Optional[OfferWallProjection] = None,
+    ) -> Sequence[OfferWall]:
+        check_not_shedding()
+        return await self.inner.list(
+            name=name, url=url, page=page, page_size=page_size, after=after, projection=projection
+        )
+
+    async def get_by_token(self, token: str) -> Optional[OfferWall]:
+        check_not_shedding()
+        return await self.inner.get_by_token(token=token)
+
+    async def get_by_url(self, url: str) -> Optional[OfferWall]:
+        check_not_shedding()
+        return await self.inner.get_by_url(url=url)
+
+    async def get_many_by_tokens(self, tokens: Sequence[str]) -> Sequence[Optional[OfferWall]]:
+        check_not_shedding()
+        return await self.inner.get_many_by_tokens(tokens)
+
+    def stream_all(self, chunk_size: int) -> AsyncIterator[Sequence[OfferWall]]:
+        check_not_shedding()
+        return self.inner.stream_all(chunk_size)
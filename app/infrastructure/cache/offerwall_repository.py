@@ -0,0 +1,124 @@
+from typing import Any, AsyncIterator, Optional, Sequence
+
+from app.admission import is_shedding
+from app.domain.entities import OfferWall, OfferWallProjection
+from app.domain.ports.offerwall_repository import OfferWallRepository
+from app.domain.urls import normalize_url
+from app.infrastructure.cache.ttl_cache import MISSING, TTLCache
+
+# Маркер закэшированного отсутствия (negative caching для 404)
+NOT_FOUND: Any = object()
+
+TOKEN = "token"
+URL = "url"
+
+
+class OfferWallCache:
+    """Процессный кэш офферволлов по токену и по URL.
+
+    Положительные записи живут `ttl` секунд, отрицательные — `negative_ttl`;
+    при сбросе нагрузки записи отдаются ещё `stale_ttl` секунд после истечения.
+    """
+
+    def __init__(
+        self, max_entries: int, ttl: float, negative_ttl: float, stale_ttl: float = 0.0
+    ) -> None:
+        self.negative_ttl = negative_ttl
+        self.entries: TTLCache[tuple[str, str], Any] = TTLCache(
+            max_entries=max_entries, ttl=ttl, stale_ttl=stale_ttl
+        )
+
+    @property
+    def stats(self):
+        return self.entries.stats
+
+    def lookup(self, kind: str, key: str) -> Any:
+        """Вернуть OfferWall, NOT_FOUND или MISSING.
+
+        Во время сброса нагрузки (БД недоступна запросу) годится и устаревшая запись.
+        """
+        value = self.entries.get((kind, key))
+        if value is MISSING and is_shedding():
+            return self.entries.get_stale((kind, key))
+        return value
+
+    def store(self, kind: str, key: str, offerwall: Optional[OfferWall]) -> None:
+        if offerwall is None:
+            if self.negative_ttl > 0:
+                self.entries.set((kind, key), NOT_FOUND, ttl=self.negative_ttl)
+            return
+        self.entries.set((kind, key), offerwall)
+
+    def invalidate(self, token: Optional[str] = None, url: Optional[str] = None) -> None:
+        """Сбросить записи офферволла по токену и/или URL.
+
+        Записи по URL, указывающие на офферволл с данным токеном, тоже удаляются.
+        """
+        if token is not None:
+            self.entries.pop((TOKEN, token))
+            for (kind, key), value in self.entries.items():
+                if kind == URL and value is not NOT_FOUND and value.token == token:
+                    self.entries.pop((kind, key))
+        if url is not None:
+            self.entries.pop((URL, normalize_url(url)))
+
+    def clear(self) -> None:
+        self.entries.clear()
+
+
+class CachedOfferWallRepository(OfferWallRepository):
+    """Read-through кэш поверх любого OfferWallRepository."""
+
+    def __init__(self, inner: OfferWallRepository, cache: OfferWallCache) -> None:
+        self.inner = inner
+        self.cache = cache
+
+    async def list(
+        self,
+        name: Optional[str],
+        url: Optional[str],
+        page: int,
+        page_size: int,
+        after: Optional[str] = None,
+        projection: Optional[OfferWallProjection] = None,
+    ) -> Sequence[OfferWall]:
+        return await self.inner.list(
+            name=name, url=url, page=page, page_size=page_size, after=after, projection=projection
+        )
+
+    async def get_by_token(self, token: str) -> Optional[OfferWall]:
+        cached = self.cache.lookup(TOKEN, token)
+        if cached is not MISSING:
+            return None if cached is NOT_FOUND else cached
+        offerwall = await self.inner.get_by_token(token=token)
+        self.cache.store(TOKEN, token, offerwall)
+        return offerwall
+
+    async def get_by_url(self, url: str) -> Optional[OfferWall]:
+        # Варианты записи одного адреса делят одну запись кэша
+        key = normalize_url(url)
+        cached = self.cache.lookup(URL, key)
+        if cached is not MISSING:
+            return None if cached is NOT_FOUND else cached
+        offerwall = await self.inner.get_by_url(url=key)
+        self.cache.store(URL, key, offerwall)
+        return offerwall
+
+    async def get_many_by_tokens(self, tokens: Sequence[str]) -> Sequence[Optional[OfferWall]]:
+        found: dict[str, Optional[OfferWall]] = {}
+        misses: list[str] = []
+        for token in dict.fromkeys(tokens):
+            cached = self.cache.lookup(TOKEN, token)
+            if cached is MISSING:
+                misses.append(token)
+            else:
+                found[token] = None if cached is NOT_FOUND else cached
+        if misses:
+            fetched = await self.inner.get_many_by_tokens(misses)
+            for token, offerwall in zip(misses, fetched):
+                self.cache.store(TOKEN, token, offerwall)
+                found[token] = offerwall
+        return [found[token] for token in tokens]
+
+    def stream_all(self, chunk_size: int) -> AsyncIterator[Sequence[OfferWall]]:
+        return self.inner.stream_all(chunk_size)
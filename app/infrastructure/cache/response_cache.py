@@ -0,0 +1,59 @@
+import hashlib
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict
+
+from app.compression import compress
+from app.infrastructure.cache.ttl_cache import MISSING, TTLCache
+
+
+@dataclass
+class EncodedResponse:
+    body: bytes
+    etag: str
+    # Сжатые варианты тела по Content-Encoding: сжимаются при первом запросе
+    variants: Dict[str, bytes] = field(default_factory=dict)
+
+    def variant(self, encoding: str) -> bytes:
+        body = self.variants.get(encoding)
+        if body is None:
+            body = self.variants[encoding] = compress(self.body, encoding, stored=True)
+        return body
+
+    def variant_etag(self, encoding: str) -> str:
+        """ETag сжатого варианта: другое представление — другой сильный ETag."""
+        return f'{self.etag[:-1]}-{encoding}"'
+
+
+def make_etag(body: bytes) -> str:
+    """Сильный ETag, вычисленный из содержимого тела."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+class ResponseBodyCache:
+    """Закодированные JSON-тела по версиям доменных объектов.
+
+    Версией считается сам объект: кэш офферволлов отдаёт один и тот же экземпляр,
+    пока запись жива, поэтому тело кодируется один раз на версию. Запись хранит
+    ссылку на объект, так что переиспользование id() после сборки мусора невозможно.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.entries: TTLCache[int, tuple[Any, EncodedResponse]] = TTLCache(
+            max_entries=max_entries, ttl=float("inf")
+        )
+
+    @property
+    def stats(self):
+        return self.entries.stats
+
+    def get_or_encode(self, obj: Any, encode: Callable[[Any], bytes]) -> EncodedResponse:
+        entry = self.entries.get(id(obj))
+        if entry is not MISSING and entry[0] is obj:
+            return entry[1]
+        body = encode(obj)
+        encoded = EncodedResponse(body=body, etag=make_etag(body))
+        self.entries.set(id(obj), (obj, encoded))
+        return encoded
+
+    def clear(self) -> None:
+        self.entries.clear()
@@ -0,0 +1,92 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Generic, Hashable, Iterator, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+# Маркер отсутствия значения (None — допустимое закэшированное значение)
+MISSING: Any = object()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    stale_hits: int = 0
+
+
+class TTLCache(Generic[K, V]):
+    """Ограниченный по размеру LRU-кэш с временем жизни записей.
+
+    Просроченная запись ещё `stale_ttl` секунд доступна через `get_stale`
+    (отдача устаревших данных при сбросе нагрузки); `get` её уже не видит.
+
+    Не потокобезопасен: рассчитан на использование внутри одного event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float,
+        clock: Callable[[], float] = time.monotonic,
+        stale_ttl: float = 0.0,
+    ) -> None:
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self.stale_ttl = stale_ttl
+        self.stats = CacheStats()
+        self._data: "OrderedDict[K, Tuple[float, V]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K, default: Any = MISSING) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            return default
+        expires_at, value = entry
+        now = self.clock()
+        if expires_at <= now:
+            if expires_at + self.stale_ttl <= now:
+                del self._data[key]
+            self.stats.expirations += 1
+            self.stats.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.stats.hits += 1
+        return value
+
+    def get_stale(self, key: K, default: Any = MISSING) -> Any:
+        """Значение, в том числе просроченное не более чем на `stale_ttl` секунд."""
+        entry = self._data.get(key)
+        if entry is None or entry[0] + self.stale_ttl <= self.clock():
+            return default
+        self.stats.stale_hits += 1
+        return entry[1]
+
+    def set(self, key: K, value: V, ttl: Optional[float] = None) -> None:
+        expires_at = self.clock() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.stats.evictions += 1
+
+    def pop(self, key: K, default: Any = MISSING) -> Any:
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def items(self) -> Iterator[Tuple[K, V]]:
+        """Снимок живых и просроченных записей (без учёта в статистике)."""
+        return iter([(key, value) for key, (_, value) in self._data.items()])
+
+    def clear(self) -> None:
+        self._data.clear()
@@ -0,0 +1,79 @@
+from typing import (
+    AsyncContextManager,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Hashable,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+from app.admission import is_shedding
+from app.domain.entities import OfferWall, OfferWallProjection
+from app.domain.ports.offerwall_repository import OfferWallRepository
+from app.domain.urls import normalize_url
+from app.infrastructure.coalescing.singleflight import SingleFlight
+from app.tracing import span
+
+T = TypeVar("T")
+
+
+class CoalescingOfferWallRepository(OfferWallRepository):
+    """Объединяет конкурентные запросы одного офферволла в одну выборку из БД.
+
+    `flight` общий для процесса, `inner` — репозиторий текущего запроса.
+    Общая выборка идёт в репозитории из `open_repository` со своей сессией:
+    отмена запроса, начавшего выборку, закрывает его сессию, а выборка
+    продолжается для остальных ожидающих.
+    """
+
+    def __init__(
+        self,
+        inner: OfferWallRepository,
+        flight: SingleFlight,
+        open_repository: Callable[[], AsyncContextManager[OfferWallRepository]],
+    ) -> None:
+        self.inner = inner
+        self.flight = flight
+        self.open_repository = open_repository
+
+    async def list(
+        self,
+        name: Optional[str],
+        url: Optional[str],
+        page: int,
+        page_size: int,
+        after: Optional[str] = None,
+        projection: Optional[OfferWallProjection] = None,
+    ) -> Sequence[OfferWall]:
+        return await self.inner.list(
+            name=name, url=url, page=page, page_size=page_size, after=after, projection=projection
+        )
+
+    async def _do(self, key: Hashable, fetch: Callable[[OfferWallRepository], Awaitable[T]]) -> T:
+        if is_shedding() and key not in self.flight:
+            # Запрос без слота admission control выборку не начинает (её отказ
+            # получили бы и присоединившиеся), но к идущей присоединиться может
+            return await fetch(self.inner)
+
+        async def fn() -> T:
+            async with self.open_repository() as repo:
+                return await fetch(repo)
+
+        # joined=True — время спана ушло на ожидание чужой выборки
+        with span("repository.coalesce", joined=key in self.flight):
+            return await self.flight.do(key, fn)
+
+    async def get_by_token(self, token: str) -> Optional[OfferWall]:
+        return await self._do(("token", token), lambda repo: repo.get_by_token(token=token))
+
+    async def get_by_url(self, url: str) -> Optional[OfferWall]:
+        key = normalize_url(url)
+        return await self._do(("url", key), lambda repo: repo.get_by_url(url=key))
+
+    async def get_many_by_tokens(self, tokens: Sequence[str]) -> Sequence[Optional[OfferWall]]:
+        return await self.inner.get_many_by_tokens(tokens)
+
+    def stream_all(self, chunk_size: int) -> AsyncIterator[Sequence[OfferWall]]:
+        return self.inner.stream_all(chunk_size)
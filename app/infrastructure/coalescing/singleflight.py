@@ -0,0 +1,70 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass
+class SingleFlightStats:
+    # Сколько реальных вызовов было выполнено
+    executed: int = 0
+    # Сколько вызовов присоединились к уже выполняющемуся
+    deduplicated: int = 0
+    # Сколько выполняющихся вызовов было отменено (не осталось ожидающих)
+    cancelled: int = 0
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Объединение конкурентных вызовов с одинаковым ключом в один.
+
+    Первый вызов запускает `fn` отдельной задачей, остальные ждут её результата.
+    Исключение `fn` получают все ожидающие. Отмена одного ожидающего не влияет
+    на остальных; задача отменяется, только когда ожидающих не осталось.
+    """
+
+    def __init__(self) -> None:
+        self.stats = SingleFlightStats()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Выполняется ли сейчас вызов с этим ключом."""
+        return key in self._calls
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.stats.executed += 1
+        else:
+            self.stats.deduplicated += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                # Новые вызовы не должны присоединиться к отменяемой задаче
+                self._forget(key, call)
+                call.task.cancel()
+                self.stats.cancelled += 1
+            raise
+        finally:
+            call.waiters -= 1
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
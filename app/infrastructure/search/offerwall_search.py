@@ -0,0 +1,134 @@
+import asyncio
+import json
+import logging
+from typing import Iterable, Optional, Protocol, Sequence
+
+from sqlalchemy import ColumnElement, Row, Select, and_, false, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.infrastructure.search.trigram_index import TrigramIndex
+from app.models import OfferWall
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELDS = ("name", "url")
+
+# Больше кандидатов — проба первичного ключа на каждого уже не выгоднее полного просмотра
+MAX_INDEX_CANDIDATES = 5_000
+
+# Счётчик изменений offerwalls; таблицу и триггеры создаёт миграция 0001_initial_schema
+_SQLITE_VERSION_TABLE = "offerwalls_search_version"
+
+class OfferWallSearch(Protocol):
+    async def clause(self, session: AsyncSession, field: str, term: str) -> ColumnElement[bool]:
+        ...
+
+
+class IlikeSearch:
+    """`ILIKE '%term%'` как есть: на PostgreSQL его обслуживает GIN-индекс pg_trgm."""
+
+    async def clause(self, session: AsyncSession, field: str, term: str) -> ColumnElement[bool]:
+        return getattr(OfferWall, field).ilike(f"%{term}%")
+
+
+def _build_index(rows: Sequence[Row]) -> TrigramIndex:
+    index = TrigramIndex(SEARCH_FIELDS)
+    for row in rows:
+        index.add(row.token, row._mapping)
+    return index
+
+
+def _candidate_tokens(tokens: Iterable[str]) -> Select:
+    """Кандидаты одним параметром (JSON-массив) вместо тысяч плейсхолдеров IN."""
+    values = func.json_each(json.dumps(sorted(tokens))).table_valued("value")
+    return select(values.c.value)
+
+
+class TrigramIndexSearch:
+    """Процессный индекс триграмм поверх таблицы offerwalls (SQLite).
+
+    Индекс обновляет фоновая задача (`start`): каждые `refresh_interval` секунд
+    она читает счётчик изменений, который увеличивают триггеры миграции схемы,
+    и при расхождении строит новый индекс в потоке и подменяет его одним
+    присваиванием. Запросы счётчик не читают и индекс не строят; пока индекса
+    нет (до `start`, после `stop`), поиск идёт через ILIKE.
+
+    Новые и переименованные офферволлы попадают в индекс с задержкой до
+    `refresh_interval`. ILIKE остаётся в запросе рядом со списком кандидатов,
+    поэтому устаревший индекс не добавляет в выдачу лишних строк.
+    """
+
+    def __init__(self) -> None:
+        self.index: Optional[TrigramIndex] = None
+        self.version: Optional[int] = None
+        self.rebuilds = 0
+        self.session_factory: Optional[async_sessionmaker[AsyncSession]] = None
+        self.refresh_interval = 1.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def clause(self, session: AsyncSession, field: str, term: str) -> ColumnElement[bool]:
+        ilike = await IlikeSearch().clause(session, field, term)
+        index = self.index
+        if index is None:
+            return ilike
+        tokens = index.search(field, term)
+        if tokens is None or len(tokens) > MAX_INDEX_CANDIDATES:
+            return ilike
+        if not tokens:
+            return false()
+        return and_(OfferWall.token.in_(_candidate_tokens(tokens)), ilike)
+
+    async def refresh(self) -> bool:
+        """Перестроить индекс, если счётчик изменений сдвинулся; True — индекс заменён."""
+        if self.session_factory is None:
+            raise RuntimeError("Offerwall search index is not started")
+        async with self.session_factory() as session:
+            version_stmt = text(f"SELECT version FROM {_SQLITE_VERSION_TABLE} WHERE id = 1")
+            # Счётчик читается до выборки: изменения во время загрузки вызовут повторную
+            version = (await session.execute(version_stmt)).scalar_one()
+            if self.index is not None and version == self.version:
+                return False
+            rows = (await session.execute(select(OfferWall.token, OfferWall.name, OfferWall.url))).all()
+        # Построение — O(таблица) на чистом Python: вне event loop
+        self.index = await asyncio.to_thread(_build_index, rows)
+        self.version = version
+        self.rebuilds += 1
+        return True
+
+    async def start(
+        self, session_factory: async_sessionmaker[AsyncSession], refresh_interval: float
+    ) -> None:
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        await self.refresh()
+        self._task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        # Без фонового обновления индекс может отставать сколько угодно
+        self.index, self.version = None, None
+
+    async def _refresh_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception:
+                # Продолжаем обслуживать предыдущий индекс
+                logger.exception("Offerwall search index refresh failed")
+
+
+# Один индекс на процесс
+sqlite_trigram_search = TrigramIndexSearch()
+
+
+def search_for_dialect(dialect_name: str) -> OfferWallSearch:
+    if dialect_name == "sqlite":
+        return sqlite_trigram_search
+    return IlikeSearch()
@@ -0,0 +1,70 @@
+import re
+from typing import Callable, Dict, Iterable, Mapping, Optional, Set
+
+# SQLite lower() меняет регистр только у ASCII — повторяем это для совпадения с ILIKE
+_ASCII_LOWER = {code: code + 32 for code in range(ord("A"), ord("Z") + 1)}
+
+
+def ascii_lower(value: str) -> str:
+    return value.translate(_ASCII_LOWER)
+
+
+def has_like_wildcards(term: str) -> bool:
+    """`%` и `_` в терме — шаблоны LIKE; такие запросы индекс не обслуживает."""
+    return "%" in term or "_" in term
+
+
+def ilike_contains(term: str) -> Callable[[str], bool]:
+    """Предикат, эквивалентный `lower(value) LIKE lower('%term%')` (с шаблонами % и _)."""
+    needle = ascii_lower(term)
+    if not has_like_wildcards(needle):
+        return lambda value: needle in ascii_lower(value)
+    pattern = "".join(".*" if ch == "%" else "." if ch == "_" else re.escape(ch) for ch in needle)
+    regex = re.compile(pattern, re.DOTALL)
+    return lambda value: regex.search(ascii_lower(value)) is not None
+
+
+def trigrams(value: str) -> Set[str]:
+    return {value[i : i + 3] for i in range(len(value) - 2)}
+
+
+class TrigramIndex:
+    """Инвертированный индекс триграмм: поле -> триграмма -> множество ключей.
+
+    Регистр приводится по правилам `ascii_lower`, поэтому результат `search`
+    совпадает с `lower(column) LIKE lower('%term%')`.
+    """
+
+    def __init__(self, fields: Iterable[str]) -> None:
+        self.fields = tuple(fields)
+        self.values: Dict[str, Dict[str, str]] = {field: {} for field in self.fields}
+        self.postings: Dict[str, Dict[str, Set[str]]] = {field: {} for field in self.fields}
+
+    def __len__(self) -> int:
+        return len(self.values[self.fields[0]]) if self.fields else 0
+
+    def add(self, key: str, row: Mapping[str, str]) -> None:
+        for field in self.fields:
+            value = ascii_lower(row[field])
+            self.values[field][key] = value
+            postings = self.postings[field]
+            for gram in trigrams(value):
+                postings.setdefault(gram, set()).add(key)
+
+    def search(self, field: str, term: str) -> Optional[Set[str]]:
+        """Ключи, у которых `field` содержит `term`; None — терм не индексируется."""
+        if len(term) < 3 or has_like_wildcards(term):
+            return None
+        needle = ascii_lower(term)
+        postings = self.postings[field]
+        lists = sorted((postings.get(gram, set()) for gram in trigrams(needle)), key=len)
+        if not lists[0]:
+            return set()
+        candidates = set(lists[0])
+        for other in lists[1:]:
+            candidates &= other
+            if not candidates:
+                return candidates
+        values = self.values[field]
+        # Триграммы дают кандидатов, подстрока проверяется явно
+        return {key for key in candidates if needle in values[key]}
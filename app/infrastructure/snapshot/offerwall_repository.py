@@ -0,0 +1,210 @@
+import asyncio
+import bisect
+import itertools
+import logging
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import MultipleResultsFound
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.domain.entities import OfferWall, OfferWallProjection
+from app.domain.ports.offerwall_repository import OfferWallRepository
+from app.domain.urls import normalize_url
+from app.infrastructure.search.offerwall_search import SEARCH_FIELDS
+from app.infrastructure.search.trigram_index import TrigramIndex, ilike_contains
+from app.infrastructure.sqlalchemy.offerwall_repository import SqlAlchemyOfferWallRepository
+from app.models import Offer, OfferAssignment, OfferWall as OfferWallModel, PopupAssignment
+
+logger = logging.getLogger(__name__)
+
+
+async def probe_version(session: AsyncSession) -> Tuple[Any, ...]:
+    """Дешёвая сигнатура данных: число строк таблиц и максимальные id назначений.
+
+    Правки на месте (без вставки/удаления) она не замечает — их подхватывает
+    принудительная перезагрузка по `max_age`.
+    """
+    stmt = select(
+        select(func.count()).select_from(OfferWallModel).scalar_subquery(),
+        select(func.count()).select_from(Offer).scalar_subquery(),
+        select(func.count()).select_from(OfferAssignment).scalar_subquery(),
+        select(func.max(OfferAssignment.id)).scalar_subquery(),
+        select(func.count()).select_from(PopupAssignment).scalar_subquery(),
+        select(func.max(PopupAssignment.id)).scalar_subquery(),
+    )
+    return tuple((await session.execute(stmt)).one())
+
+
+def complete_wall_fields(wall: OfferWall) -> Tuple[str, str]:
+    """name и url офферволла для снапшота: он строится только из полных офферволлов (load_all)."""
+    if wall.name is None or wall.url is None:
+        raise ValueError(f"Offerwall {wall.token} is loaded without name/url; snapshots need complete walls")
+    return wall.name, wall.url
+
+
+class OfferWallSnapshot:
+    """Неизменяемый срез всех офферволлов с индексами по token, URL и триграммам."""
+
+    def __init__(self, walls: Iterable[OfferWall], version: Tuple[Any, ...] = ()) -> None:
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.by_token: Dict[str, OfferWall] = {wall.token: wall for wall in walls}
+        self.tokens: List[str] = sorted(self.by_token)
+        self.by_url: Dict[str, List[OfferWall]] = {}
+        self.search = TrigramIndex(SEARCH_FIELDS)
+        for token in self.tokens:
+            wall = self.by_token[token]
+            name, url = complete_wall_fields(wall)
+            self.by_url.setdefault(normalize_url(url), []).append(wall)
+            self.search.add(token, {"name": name, "url": url})
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def list(
+        self, name: Optional[str], url: Optional[str], page: int, page_size: int, after: Optional[str] = None
+    ) -> List[OfferWall]:
+        candidates: Optional[set] = None
+        predicates: List[Tuple[str, Callable[[str], bool]]] = []
+        for field, term in (("name", name), ("url", url)):
+            if not term:
+                continue
+            found = self.search.search(field, term)
+            if found is None:
+                predicates.append((field, ilike_contains(term)))
+            else:
+                candidates = found if candidates is None else candidates & found
+
+        start = bisect.bisect_right(self.tokens, after) if after is not None else 0
+        if candidates is None:
+            tokens: Iterable[str] = itertools.islice(self.tokens, start, None)
+        else:
+            tokens = sorted(t for t in candidates if after is None or t > after)
+
+        to_skip = 0 if after is not None else (page - 1) * page_size
+        result: List[OfferWall] = []
+        for token in tokens:
+            wall = self.by_token[token]
+            if not all(match(getattr(wall, field)) for field, match in predicates):
+                continue
+            if to_skip:
+                to_skip -= 1
+                continue
+            result.append(wall)
+            if len(result) == page_size:
+                break
+        return result
+
+
+class SnapshotStore:
+    """Держит текущий снапшот и обновляет его в фоне.
+
+    Каждые `refresh_interval` секунд сравнивается сигнатура `probe_version`;
+    при изменении (или если снапшот старше `max_age`) загружается новый и
+    подменяется одним присваиванием — читатели видят либо старый, либо новый.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        refresh_interval: float,
+        max_age: float,
+    ) -> None:
+        self.session_factory = session_factory
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.snapshot: Optional[OfferWallSnapshot] = None
+        self.reloads = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def current(self) -> OfferWallSnapshot:
+        snapshot = self.snapshot
+        if snapshot is None:
+            raise RuntimeError("Offerwall snapshot is not loaded")
+        return snapshot
+
+    async def load(self) -> OfferWallSnapshot:
+        started = time.perf_counter()
+        async with self.session_factory() as session:
+            # Сигнатура снимается до выборки: изменения во время загрузки вызовут повторную
+            version = await probe_version(session)
+            walls = await SqlAlchemyOfferWallRepository(session).load_all()
+        # Индексы и триграммы — O(таблица) на чистом Python: строим вне event loop,
+        # иначе каждое фоновое обновление останавливает обслуживание запросов
+        snapshot = await asyncio.to_thread(OfferWallSnapshot, walls, version)
+        self.snapshot = snapshot
+        self.reloads += 1
+        logger.info(
+            "Offerwall snapshot loaded: %d walls in %.1f ms", len(snapshot), (time.perf_counter() - started) * 1000
+        )
+        return snapshot
+
+    async def refresh_if_changed(self) -> bool:
+        current = self.snapshot
+        if current is not None and time.monotonic() - current.loaded_at < self.max_age:
+            async with self.session_factory() as session:
+                if await probe_version(session) == current.version:
+                    return False
+        await self.load()
+        return True
+
+    async def start(self) -> None:
+        await self.load()
+        self._task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refresh_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh_if_changed()
+            except Exception:
+                # Продолжаем обслуживать предыдущий снапшот
+                logger.exception("Offerwall snapshot refresh failed")
+
+
+class SnapshotOfferWallRepository(OfferWallRepository):
+    """Чтение офферволлов из снапшота в памяти, без обращений к БД."""
+
+    def __init__(self, store: SnapshotStore) -> None:
+        self.store = store
+
+    async def list(
+        self,
+        name: Optional[str],
+        url: Optional[str],
+        page: int,
+        page_size: int,
+        after: Optional[str] = None,
+        projection: Optional[OfferWallProjection] = None,
+    ) -> Sequence[OfferWall]:
+        # Офферволлы уже в памяти: проекцию применяет сериализация
+        return self.store.current().list(name=name, url=url, page=page, page_size=page_size, after=after)
+
+    async def get_by_token(self, token: str) -> Optional[OfferWall]:
+        return self.store.current().by_token.get(token)
+
+    async def get_by_url(self, url: str) -> Optional[OfferWall]:
+        matches = self.store.current().by_url.get(normalize_url(url), [])
+        if len(matches) > 1:
+            raise MultipleResultsFound("Multiple rows were found when one or none was required")
+        return matches[0] if matches else None
+
+    async def get_many_by_tokens(self, tokens: Sequence[str]) -> Sequence[Optional[OfferWall]]:
+        by_token = self.store.current().by_token
+        return [by_token.get(token) for token in tokens]
+
+    async def stream_all(self, chunk_size: int) -> AsyncIterator[Sequence[OfferWall]]:
+        snapshot = self.store.current()
+        for start in range(0, len(snapshot.tokens), chunk_size):
+            yield [snapshot.by_token[token] for token in snapshot.tokens[start : start + chunk_size]]
@@ -0,0 +1,370 @@
+"""Снапшот офферволлов в memory-mapped файле, общий для всех воркеров Granian.
+
+Формат файла (little-endian):
+
+    заголовок   _HEADER: magic, generation, число офферволлов, число URL,
+                смещения индекса по token, индекса по URL и метаданных
+    индекс token  count записей _TOKEN_ENTRY, отсортированных по token:
+                (token, name, url, blob) — пары (смещение, длина)
+    индекс URL    url_count записей _URL_ENTRY, отсортированных по (нормализованный url, token):
+                (нормализованный url, номер записи в индексе token)
+    метаданные  JSON: сигнатура данных, время сборки и таблица офферов
+    данные      строки UTF-8 и JSON-блоки офферволлов
+
+Блок офферволла хранит description и номера офферов в таблице офферов, поэтому
+каждый оффер записан в файле один раз. Файл заменяется атомарно (os.replace),
+читатели переоткрывают его, заметив новый inode.
+"""
+import asyncio
+import bisect
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.exc import MultipleResultsFound
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.domain.entities import Offer, OfferWall, OfferWallOffer, OfferWallPopupOffer, OfferWallProjection
+from app.domain.ports.offerwall_repository import OfferWallRepository
+from app.domain.urls import normalize_url
+from app.infrastructure.search.trigram_index import ilike_contains
+from app.infrastructure.snapshot.offerwall_repository import complete_wall_fields, probe_version
+from app.infrastructure.sqlalchemy.offerwall_repository import SqlAlchemyOfferWallRepository
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"OWSNAP02"
+_HEADER = struct.Struct("<8sQIIQQQI")
+_TOKEN_ENTRY = struct.Struct("<QIQIQIQI")
+_URL_ENTRY = struct.Struct("<QII")
+
+_OFFER_FIELDS = ("uuid", "id", "url", "is_active", "name", "sum_to", "term_to", "percent_rate")
+
+
+def write_snapshot_file(
+    path: Path, walls: Iterable[OfferWall], generation: int, version: Sequence[Any] = ()
+) -> None:
+    """Сериализовать офферволлы в файл снапшота и атомарно подменить `path`."""
+    walls = sorted(walls, key=lambda w: w.token)
+    offer_index: Dict[str, int] = {}
+    offers: List[List[Any]] = []
+
+    def offer_ref(offer: Offer) -> int:
+        ref = offer_index.get(offer.uuid)
+        if ref is None:
+            ref = offer_index[offer.uuid] = len(offers)
+            offers.append([getattr(offer, field) for field in _OFFER_FIELDS])
+        return ref
+
+    data = bytearray()
+
+    def put(raw: bytes) -> Tuple[int, int]:
+        data.extend(raw)
+        return len(data) - len(raw), len(raw)
+
+    token_entries = []
+    url_keys: List[Tuple[str, int, int]] = []
+    for i, wall in enumerate(walls):
+        blob = json.dumps(
+            [
+                wall.description,
+                [offer_ref(a.offer) for a in wall.offer_assignments],
+                [offer_ref(p.offer) for p in wall.popup_assignments],
+            ],
+            separators=(",", ":"),
+        ).encode()
+        name, url = complete_wall_fields(wall)
+        token_entries.append(
+            (*put(wall.token.encode()), *put(name.encode()), *put(url.encode()), *put(blob))
+        )
+        key = normalize_url(url)
+        url_keys.append((key, *put(key.encode())))
+    url_order = sorted(range(len(walls)), key=lambda i: (url_keys[i][0], walls[i].token))
+    meta = json.dumps(
+        {"version": list(version), "built_at": time.time(), "offers": offers}, separators=(",", ":")
+    ).encode()
+
+    token_index_off = _HEADER.size
+    url_index_off = token_index_off + len(token_entries) * _TOKEN_ENTRY.size
+    meta_off = url_index_off + len(url_order) * _URL_ENTRY.size
+    data_off = meta_off + len(meta)
+
+    out = bytearray(
+        _HEADER.pack(MAGIC, generation, len(walls), len(url_order), token_index_off, url_index_off, meta_off, len(meta))
+    )
+    for entry in token_entries:
+        (t_off, t_len, n_off, n_len, u_off, u_len, b_off, b_len) = entry
+        out += _TOKEN_ENTRY.pack(
+            data_off + t_off, t_len, data_off + n_off, n_len, data_off + u_off, u_len, data_off + b_off, b_len
+        )
+    for i in url_order:
+        _, k_off, k_len = url_keys[i]
+        out += _URL_ENTRY.pack(data_off + k_off, k_len, i)
+    out += meta
+    out += data
+
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(out)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class MappedSnapshot:
+    """Только-чтение поверх mmap: бинарный поиск по встроенным индексам."""
+
+    def __init__(self, path: Path) -> None:
+        with open(path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (stat.st_ino, stat.st_mtime_ns)
+        (magic, self.generation, self.count, self.url_count, self._token_index, self._url_index, meta_off, meta_len) = (
+            _HEADER.unpack_from(self.buf, 0)
+        )
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an offerwall snapshot")
+        meta = json.loads(self.buf[meta_off : meta_off + meta_len])
+        self.version = tuple(meta["version"])
+        self.built_at: float = meta["built_at"]
+        self.offers = [Offer(**dict(zip(_OFFER_FIELDS, values))) for values in meta["offers"]]
+        # Обёртки назначений неизменяемы — одна на оффер снапшота
+        self.offer_assignments = [OfferWallOffer(offer=offer) for offer in self.offers]
+        self.popup_assignments = [OfferWallPopupOffer(offer=offer) for offer in self.offers]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self.buf.close()
+
+    def _entry(self, i: int) -> Tuple[int, ...]:
+        return _TOKEN_ENTRY.unpack_from(self.buf, self._token_index + i * _TOKEN_ENTRY.size)
+
+    def _str(self, off: int, length: int) -> str:
+        return self.buf[off : off + length].decode()
+
+    def token_at(self, i: int) -> str:
+        entry = self._entry(i)
+        return self._str(entry[0], entry[1])
+
+    def _url_at(self, j: int) -> Tuple[str, int]:
+        off, length, i = _URL_ENTRY.unpack_from(self.buf, self._url_index + j * _URL_ENTRY.size)
+        return self._str(off, length), i
+
+    def wall_at(self, i: int) -> OfferWall:
+        t_off, t_len, n_off, n_len, u_off, u_len, b_off, b_len = self._entry(i)
+        description, offer_refs, popup_refs = json.loads(self.buf[b_off : b_off + b_len])
+        return OfferWall(
+            token=self._str(t_off, t_len),
+            name=self._str(n_off, n_len),
+            url=self._str(u_off, u_len),
+            description=description,
+            offer_assignments=tuple(self.offer_assignments[ref] for ref in offer_refs),
+            popup_assignments=tuple(self.popup_assignments[ref] for ref in popup_refs),
+        )
+
+    def get(self, token: str) -> Optional[OfferWall]:
+        i = bisect.bisect_left(range(self.count), token, key=self.token_at)
+        if i < self.count and self.token_at(i) == token:
+            return self.wall_at(i)
+        return None
+
+    def find_by_url(self, url: str) -> List[OfferWall]:
+        url = normalize_url(url)
+        lo = bisect.bisect_left(range(self.url_count), url, key=lambda j: self._url_at(j)[0])
+        result = []
+        while lo < self.url_count:
+            value, i = self._url_at(lo)
+            if value != url:
+                break
+            result.append(self.wall_at(i))
+            lo += 1
+        return result
+
+    def list(
+        self, name: Optional[str], url: Optional[str], page: int, page_size: int, after: Optional[str] = None
+    ) -> List[OfferWall]:
+        predicates = [(field, ilike_contains(term)) for field, term in ((2, name), (4, url)) if term]
+        start = bisect.bisect_right(range(self.count), after, key=self.token_at) if after is not None else 0
+        to_skip = 0 if after is not None else (page - 1) * page_size
+        result: List[OfferWall] = []
+        for i in range(start, self.count):
+            if predicates:
+                entry = self._entry(i)
+                if not all(match(self._str(entry[field], entry[field + 1])) for field, match in predicates):
+                    continue
+            if to_skip:
+                to_skip -= 1
+                continue
+            result.append(self.wall_at(i))
+            if len(result) == page_size:
+                break
+        return result
+
+
+class SharedSnapshotStore:
+    """Файл снапшота, который строит один процесс, а отображают все.
+
+    Строит снапшот процесс, удерживающий flock на `<path>.lock`; остальные
+    периодически пытаются взять блокировку, чтобы подхватить роль после его
+    остановки. Каждые `refresh_interval` секунд строитель сверяет сигнатуру
+    данных, а все процессы переоткрывают файл, если он был заменён.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        path: Path,
+        refresh_interval: float,
+        max_age: float,
+        startup_timeout: float = 30.0,
+    ) -> None:
+        self.session_factory = session_factory
+        self.path = Path(path)
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.startup_timeout = startup_timeout
+        self.mapped: Optional[MappedSnapshot] = None
+        self.is_builder = False
+        self.builds = 0
+        self.remaps = 0
+        self._lock_file: Optional[Any] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def current(self) -> MappedSnapshot:
+        mapped = self.mapped
+        if mapped is None:
+            raise RuntimeError("Shared offerwall snapshot is not mapped")
+        return mapped
+
+    def _try_become_builder(self) -> bool:
+        if self.is_builder:
+            return True
+        lock_file = open(self.path.with_name(self.path.name + ".lock"), "a+b")  # noqa: SIM115
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+        except BaseException:
+            lock_file.close()
+            raise
+        # Файл остаётся открытым, пока процесс — сборщик: закрытие снимает блокировку
+        self._lock_file = lock_file
+        self.is_builder = True
+        logger.info("Process %d builds the shared offerwall snapshot", os.getpid())
+        return True
+
+    async def build_if_changed(self) -> bool:
+        mapped = self.mapped
+        async with self.session_factory() as session:
+            version = await probe_version(session)
+            if mapped is not None and mapped.version == version and time.time() - mapped.built_at < self.max_age:
+                return False
+            walls = await SqlAlchemyOfferWallRepository(session).load_all()
+        generation = (mapped.generation if mapped else 0) + 1
+        await asyncio.to_thread(write_snapshot_file, self.path, walls, generation, version)
+        self.builds += 1
+        logger.info("Shared offerwall snapshot generation %d written: %d walls", generation, len(walls))
+        self.remap_if_replaced()
+        return True
+
+    def remap_if_replaced(self) -> bool:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        if self.mapped is not None and self.mapped.identity == (stat.st_ino, stat.st_mtime_ns):
+            return False
+        try:
+            mapped = MappedSnapshot(self.path)
+        except ValueError:
+            # Файл прежнего формата (MAGIC): ждём, пока сборщик его заменит
+            logger.warning("Ignoring offerwall snapshot %s in an outdated format", self.path)
+            return False
+        # Старое отображение не закрываем: его могут читать текущие запросы, GC освободит
+        self.mapped = mapped
+        self.remaps += 1
+        return True
+
+    async def start(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        deadline = time.monotonic() + self.startup_timeout
+        while True:
+            self.remap_if_replaced()
+            if self._try_become_builder():
+                await self.build_if_changed()
+            if self.mapped is not None:
+                break
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Shared offerwall snapshot {self.path} did not appear in time")
+            await asyncio.sleep(0.1)
+        self._task = asyncio.create_task(self._refresh_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+            self.is_builder = False
+
+    async def _refresh_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                self.remap_if_replaced()
+                if self._try_become_builder():
+                    await self.build_if_changed()
+            except Exception:
+                logger.exception("Shared offerwall snapshot refresh failed")
+
+
+class SharedSnapshotOfferWallRepository(OfferWallRepository):
+    """Чтение офферволлов из общего memory-mapped снапшота."""
+
+    def __init__(self, store: SharedSnapshotStore) -> None:
+        self.store = store
+
+    async def list(
+        self,
+        name: Optional[str],
+        url: Optional[str],
+        page: int,
+        page_size: int,
+        after: Optional[str] = None,
+        projection: Optional[OfferWallProjection] = None,
+    ) -> Sequence[OfferWall]:
+        # Офферволлы уже в памяти: проекцию применяет сериализация
+        return self.store.current().list(name=name, url=url, page=page, page_size=page_size, after=after)
+
+    async def get_by_token(self, token: str) -> Optional[OfferWall]:
+        return self.store.current().get(token)
+
+    async def get_by_url(self, url: str) -> Optional[OfferWall]:
+        matches = self.store.current().find_by_url(url)
+        if len(matches) > 1:
+            raise MultipleResultsFound("Multiple rows were found when one or none was required")
+        return matches[0] if matches else None
+
+    async def get_many_by_tokens(self, tokens: Sequence[str]) -> Sequence[Optional[OfferWall]]:
+        mapped = self.store.current()
+        return [mapped.get(token) for token in tokens]
+
+    async def stream_all(self, chunk_size: int) -> AsyncIterator[Sequence[OfferWall]]:
+        # Ссылка на отображение держится до конца экспорта, даже если файл заменят
+        mapped = self.store.current()
+        for start in range(0, len(mapped), chunk_size):
+            yield [mapped.wall_at(i) for i in range(start, min(start + chunk_size, len(mapped)))]
@@ -0,0 +1,279 @@
+"""Пакетная загрузка справочников (offers, offerwalls, назначения).
+
+Записи приходят потоком и пишутся чанками: на SQLite — executemany с
+`INSERT ... ON CONFLICT`, на PostgreSQL через asyncpg — `COPY` (для upsert —
+через временную таблицу и `INSERT ... SELECT ... ON CONFLICT`). Каждый чанк —
+отдельная транзакция, поэтому память ограничена размером чанка, а повторный
+запуск после сбоя с upsert-семантикой идемпотентен.
+
+У назначений нет естественного ключа, поэтому для них upsert означает замену:
+назначения офферволла из входных данных полностью заменяют прежние.
+"""
+
+import time
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Callable,
+    Container,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Mapping,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from sqlalchemy import Boolean, Integer, String, Table, delete, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from app.domain.urls import url_hash
+from app.models import Offer, OfferAssignment, OfferWall, PopupAssignment, offer_names
+
+OnConflict = Literal["update", "ignore", "error"]
+
+_TRUE = {"1", "true", "t", "yes", "y"}
+_FALSE = {"0", "false", "f", "no", "n"}
+
+
+class ImportRecordError(ValueError):
+    """Запись входных данных не соответствует таблице."""
+
+    def __init__(self, line: int, message: str) -> None:
+        super().__init__(f"record {line}: {message}")
+        self.line = line
+
+
+@dataclass(frozen=True)
+class ImportTarget:
+    table: Table
+    columns: Tuple[str, ...]
+    key: Tuple[str, ...] = ()
+    # Назначения: столбец, по которому заменяется набор строк
+    replace_by: Optional[str] = None
+    # Столбцы с закрытым набором значений (проверка `in` должна быть O(1))
+    allowed: Mapping[str, Container[Any]] = field(default_factory=dict)
+    # Столбцы, вычисляемые из приведённой строки (во входных данных их нет)
+    derived: Mapping[str, Callable[[Mapping[str, Any]], Any]] = field(default_factory=dict)
+
+    @property
+    def write_columns(self) -> Tuple[str, ...]:
+        return self.columns + tuple(self.derived)
+
+
+TARGETS: Dict[str, ImportTarget] = {
+    "offers": ImportTarget(
+        Offer.__table__,
+        ("uuid", "id", "url", "is_active", "name", "sum_to", "term_to", "percent_rate"),
+        key=("uuid",),
+        allowed={"name": offer_names},
+    ),
+    "offerwalls": ImportTarget(
+        OfferWall.__table__,
+        ("token", "name", "url", "description"),
+        key=("token",),
+        derived={"url_hash": lambda row: url_hash(row["url"])},
+    ),
+    "offer_assignments": ImportTarget(
+        OfferAssignment.__table__,
+        ("offer_wall_token", "offer_uuid", "order"),
+        replace_by="offer_wall_token",
+    ),
+    "popup_assignments": ImportTarget(
+        PopupAssignment.__table__,
+        ("offer_wall_token", "offer_uuid", "order"),
+        replace_by="offer_wall_token",
+    ),
+}
+
+
+@dataclass
+class ImportStats:
+    rows: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _coerce_value(target: ImportTarget, name: str, value: Any, line: int) -> Any:
+    column = target.table.c[name]
+    if value is None or value == "":
+        if column.nullable:
+            return None
+        if column.default is not None and column.default.is_scalar:
+            return column.default.arg
+        raise ImportRecordError(line, f"{name} is required")
+    try:
+        if isinstance(column.type, Boolean):
+            if isinstance(value, bool):
+                return value
+            text = str(value).strip().lower()
+            if text not in _TRUE | _FALSE:
+                raise ValueError(value)
+            return text in _TRUE
+        if isinstance(column.type, Integer):
+            if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+                raise ValueError(value)
+            return int(value)
+    except ValueError:
+        raise ImportRecordError(line, f"{name}: invalid {column.type} value {value!r}") from None
+    value = str(value)
+    if isinstance(column.type, String) and column.type.length and len(value) > column.type.length:
+        raise ImportRecordError(line, f"{name} is longer than {column.type.length} characters")
+    allowed = target.allowed.get(name)
+    if allowed is not None and value not in allowed:
+        raise ImportRecordError(line, f"{name}: unknown value {value!r}")
+    return value
+
+
+def coerce_record(target: ImportTarget, record: Mapping[str, Any], line: int) -> Dict[str, Any]:
+    """Привести запись JSONL/CSV к строке таблицы (типы, обязательность, длина)."""
+    unknown = set(record) - set(target.columns)
+    if unknown:
+        raise ImportRecordError(line, f"unknown columns {sorted(unknown)}")
+    row = {name: _coerce_value(target, name, record.get(name), line) for name in target.columns}
+    for name, compute in target.derived.items():
+        row[name] = compute(row)
+    return row
+
+
+def chunked(
+    records: Iterable[Mapping[str, Any]], target: ImportTarget, size: int
+) -> Iterator[List[Dict[str, Any]]]:
+    chunk: List[Dict[str, Any]] = []
+    for line, record in enumerate(records, start=1):
+        chunk.append(coerce_record(target, record, line))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _dedupe_by_key(target: ImportTarget, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # Один ключ дважды в одном INSERT ... ON CONFLICT DO UPDATE PostgreSQL не принимает; побеждает последняя
+    if not target.key:
+        return rows
+    return list({tuple(row[k] for k in target.key): row for row in rows}.values())
+
+
+class ChunkWriter:
+    """Запись чанков через SQLAlchemy: executemany и ON CONFLICT диалекта."""
+
+    def __init__(
+        self, conn: AsyncConnection, target: ImportTarget, on_conflict: OnConflict
+    ) -> None:
+        self.conn = conn
+        self.target = target
+        self.on_conflict = on_conflict
+        self.replaced: Set[Any] = set()
+
+    def _insert(self) -> Any:
+        table, dialect = self.target.table, self.conn.dialect.name
+        if self.on_conflict == "error" or not self.target.key:
+            return insert(table)
+        module = {"postgresql": postgresql, "sqlite": sqlite}.get(dialect)
+        if module is None:
+            raise NotImplementedError(
+                f"on_conflict={self.on_conflict!r} is not supported for {dialect}"
+            )
+        stmt = module.insert(table)
+        if self.on_conflict == "ignore":
+            return stmt.on_conflict_do_nothing(index_elements=list(self.target.key))
+        updates = {
+            name: stmt.excluded[name]
+            for name in self.target.write_columns
+            if name not in self.target.key
+        }
+        return stmt.on_conflict_do_update(index_elements=list(self.target.key), set_=updates)
+
+    def _take_replaced(self, rows: List[Dict[str, Any]]) -> List[Any]:
+        """Значения replace_by из чанка, которые в этом запуске ещё не заменялись."""
+        column = self.target.replace_by
+        fresh = {row[column] for row in rows} - self.replaced
+        self.replaced |= fresh
+        return sorted(fresh)
+
+    async def write(self, rows: List[Dict[str, Any]]) -> None:
+        table = self.target.table
+        async with self.conn.begin():
+            if self.target.replace_by and self.on_conflict == "update":
+                fresh = self._take_replaced(rows)
+                if fresh:
+                    await self.conn.execute(
+                        delete(table).where(table.c[self.target.replace_by].in_(fresh))
+                    )
+            await self.conn.execute(self._insert(), _dedupe_by_key(self.target, rows))
+
+
+class CopyChunkWriter(ChunkWriter):
+    """PostgreSQL + asyncpg: COPY вместо INSERT, upsert через временную таблицу."""
+
+    async def write(self, rows: List[Dict[str, Any]]) -> None:
+        table, columns = self.target.table, list(self.target.write_columns)
+        rows = _dedupe_by_key(self.target, rows)
+        records = [tuple(row[name] for name in columns) for row in rows]
+        raw = (await self.conn.get_raw_connection()).driver_connection
+        async with raw.transaction():
+            if self.target.replace_by and self.on_conflict == "update":
+                fresh = self._take_replaced(rows)
+                if fresh:
+                    await raw.execute(
+                        f'DELETE FROM {table.name} WHERE "{self.target.replace_by}" = ANY($1::text[])',
+                        fresh,
+                    )
+            if self.on_conflict == "error" or not self.target.key:
+                await raw.copy_records_to_table(table.name, records=records, columns=columns)
+                return
+            staging = f"import_{table.name}"
+            await raw.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {staging} "
+                f"(LIKE {table.name} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+            )
+            await raw.copy_records_to_table(staging, records=records, columns=columns)
+            quoted = ", ".join(f'"{name}"' for name in columns)
+            key = ", ".join(f'"{name}"' for name in self.target.key)
+            if self.on_conflict == "ignore":
+                action = "DO NOTHING"
+            else:
+                updates = ", ".join(
+                    f'"{name}" = EXCLUDED."{name}"'
+                    for name in columns
+                    if name not in self.target.key
+                )
+                action = f"DO UPDATE SET {updates}"
+            await raw.execute(
+                f"INSERT INTO {table.name} ({quoted}) SELECT {quoted} FROM {staging} ON CONFLICT ({key}) {action}"
+            )
+
+
+async def import_records(
+    engine: AsyncEngine,
+    target: ImportTarget,
+    records: Iterable[Mapping[str, Any]],
+    chunk_size: int = 5_000,
+    on_conflict: OnConflict = "update",
+    use_copy: bool = True,
+    progress: Optional[Callable[[ImportStats], None]] = None,
+) -> ImportStats:
+    stats = ImportStats()
+    started = time.perf_counter()
+    async with engine.connect() as conn:
+        copy = use_copy and conn.dialect.name == "postgresql" and conn.dialect.driver == "asyncpg"
+        writer = (CopyChunkWriter if copy else ChunkWriter)(conn, target, on_conflict)
+        for chunk in chunked(records, target, chunk_size):
+            await writer.write(chunk)
+            stats.rows += len(chunk)
+            stats.chunks += 1
+            stats.seconds = time.perf_counter() - started
+            if progress is not None:
+                progress(stats)
+    stats.seconds = time.perf_counter() - started
+    return stats
@@ -1,78 +1,256 @@
-from typing import Optional, Sequence, List
-from sqlalchemy import select
+from typing import AsyncIterator, Dict, Iterable, Literal, Optional, Sequence, List, Tuple
+from sqlalchemy import Row, Select, literal, select, union_all
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import load_only, selectinload
 
-from app.domain.entities import OfferWall as DomainOfferWall, Offer as DomainOffer, OfferWallOffer, OfferWallPopupOffer
+from app.domain.entities import OfferWall as DomainOfferWall, Offer as DomainOffer, OfferInternTable, OfferWallOffer, OfferWallPopupOffer
+from app.domain.entities import WALL_FIELDS, WALL_RELATIONS, OfferWallProjection
 from app.domain.ports.offerwall_repository import OfferWallRepository
+from app.domain.urls import hash_normalized_url, normalize_url
+from app.infrastructure.search.offerwall_search import OfferWallSearch, search_for_dialect
+from app.infrastructure.sqlalchemy.query_budget import exempt_from_query_budget
 from app.models import OfferWall, OfferAssignment, PopupAssignment, Offer
+from app.tracing import span
+
+# "orm"  — ORM-объекты с selectinload (1 + 4 запроса) и копирование в доменные сущности;
+# "core" — две Core-выборки (офферволлы + все назначения), сущности строятся прямо из строк.
+FetchMode = Literal["orm", "core"]
+
+_OFFER_KIND = 0
+_POPUP_KIND = 1
+
+# Общая для процесса: одинаковый оффер во всех офферволлах и запросах — один объект
+offer_interns = OfferInternTable()
+
+_WALL_COLUMNS = (OfferWall.token, OfferWall.name, OfferWall.url, OfferWall.description)
+_KINDS = ((_OFFER_KIND, "offer_assignments", OfferAssignment), (_POPUP_KIND, "popup_assignments", PopupAssignment))
+_OFFER_COLUMNS = (
+    Offer.uuid,
+    Offer.id,
+    Offer.url,
+    Offer.is_active,
+    Offer.name,
+    Offer.sum_to,
+    Offer.term_to,
+    Offer.percent_rate,
+)
+
+def _wall_columns(projection: Optional[OfferWallProjection]) -> tuple:
+    if projection is None:
+        return _WALL_COLUMNS
+    return tuple(column for column in _WALL_COLUMNS if column.key in projection.fields)
 
 class SqlAlchemyOfferWallRepository(OfferWallRepository):
-    def __init__(self, session: AsyncSession) -> None:
+    def __init__(
+        self,
+        session: AsyncSession,
+        fetch_mode: FetchMode = "core",
+        search: Optional[OfferWallSearch] = None,
+    ) -> None:
+        if fetch_mode not in ("orm", "core"):
+            raise ValueError(f"Unknown fetch mode: {fetch_mode}")
         self.session = session
+        self.fetch_mode = fetch_mode
+        # Поиск по подстроке: pg_trgm на PostgreSQL, индекс триграмм в памяти на SQLite
+        self.search = search if search is not None else search_for_dialect(session.bind.dialect.name)
 
-    def _base_query(self):
-        return (
-            select(OfferWall)
-            .options(
-                selectinload(OfferWall.offer_assignments).selectinload(OfferAssignment.offer),
-                selectinload(OfferWall.popup_assignments).selectinload(PopupAssignment.offer),
-            )
-        )
+    def _base_query(self, projection: Optional[OfferWallProjection] = None):
+        if projection is None:
+            projection = OfferWallProjection()
+        options = [
+            selectinload(getattr(OfferWall, relation)).selectinload(model.offer)
+            for _, relation, model in _KINDS
+            if relation in projection.include
+        ]
+        if projection.fields != WALL_FIELDS:
+            options.append(load_only(*_wall_columns(projection)))
+        return select(OfferWall).options(*options)
 
     @staticmethod
     def _to_domain_offer(orm_offer: Offer) -> DomainOffer:
-        return DomainOffer(
-            uuid=orm_offer.uuid,
-            id=orm_offer.id,
-            url=orm_offer.url,
-            is_active=orm_offer.is_active,
-            name=orm_offer.name,
-            sum_to=orm_offer.sum_to,
-            term_to=orm_offer.term_to,
-            percent_rate=orm_offer.percent_rate,
-        )
+        return offer_interns.offer(orm_offer)
 
     @staticmethod
-    def _to_domain(orm_ow: OfferWall) -> DomainOfferWall:
-        offers: List[OfferWallOffer] = [
-            OfferWallOffer(offer=SqlAlchemyOfferWallRepository._to_domain_offer(a.offer))
-            for a in orm_ow.offer_assignments
-            if a.offer is not None
-        ]
-        popups: List[OfferWallPopupOffer] = [
-            OfferWallPopupOffer(offer=SqlAlchemyOfferWallRepository._to_domain_offer(p.offer))
-            for p in orm_ow.popup_assignments
-            if p.offer is not None
-        ]
+    def _to_domain(orm_ow: OfferWall, projection: Optional[OfferWallProjection] = None) -> DomainOfferWall:
+        if projection is None:
+            projection = OfferWallProjection()
+        # Незагруженные атрибуты не трогаем: ленивая загрузка в async-сессии недоступна
+        fields, include = projection.fields, projection.include
         return DomainOfferWall(
             token=orm_ow.token,
-            name=orm_ow.name,
-            url=orm_ow.url,
-            description=orm_ow.description,
-            offer_assignments=offers,
-            popup_assignments=popups,
+            name=orm_ow.name if "name" in fields else None,
+            url=orm_ow.url if "url" in fields else None,
+            description=orm_ow.description if "description" in fields else None,
+            offer_assignments=tuple(
+                offer_interns.offer_assignment(a.offer) for a in orm_ow.offer_assignments if a.offer is not None
+            )
+            if "offer_assignments" in include
+            else (),
+            popup_assignments=tuple(
+                offer_interns.popup_assignment(p.offer) for p in orm_ow.popup_assignments if p.offer is not None
+            )
+            if "popup_assignments" in include
+            else (),
         )
 
-    async def list(self, name: Optional[str], url: Optional[str], page: int, page_size: int) -> Sequence[DomainOfferWall]:
-        stmt = self._base_query()
+    @staticmethod
+    def _assignments_query(tokens: Optional[Sequence[str]], include: Sequence[str] = WALL_RELATIONS) -> Select:
+        """Назначения видов из `include` для набора офферволлов (None — для всех) одной выборкой, в порядке `order`."""
+        parts = []
+        for kind, relation, model in _KINDS:
+            if relation not in include:
+                continue
+            part = select(
+                literal(kind).label("kind"),
+                model.offer_wall_token.label("wall_token"),
+                model.order.label("position"),
+                model.id.label("assignment_id"),
+                *_OFFER_COLUMNS,
+            ).join(Offer, Offer.uuid == model.offer_uuid)
+            if tokens is not None:
+                part = part.where(model.offer_wall_token.in_(tokens))
+            parts.append(part)
+        assignments = (union_all(*parts) if len(parts) > 1 else parts[0]).subquery()
+        return select(assignments).order_by(
+            assignments.c.kind, assignments.c.position, assignments.c.assignment_id
+        )
+
+    async def _fetch_core(
+        self, stmt: Select, single: bool = False, projection: Optional[OfferWallProjection] = None
+    ) -> List[DomainOfferWall]:
+        result = await self.session.execute(stmt)
+        if single:
+            row = result.one_or_none()
+            wall_rows = [row] if row is not None else []
+        else:
+            wall_rows = result.all()
+        if not wall_rows:
+            return []
+        include = WALL_RELATIONS if projection is None else projection.include
+        if not include:
+            # Назначения не нужны: одна выборка вместо двух
+            assignment_rows = ()
+        else:
+            assignment_rows = await self.session.execute(
+                self._assignments_query([row.token for row in wall_rows], include)
+            )
+        with span("repository.hydrate", walls=len(wall_rows)):
+            return self._hydrate(wall_rows, assignment_rows)
+
+    @staticmethod
+    def _hydrate(wall_rows: Sequence[Row], assignment_rows: Iterable[Row]) -> List[DomainOfferWall]:
+        assignments: Dict[str, Tuple[List[OfferWallOffer], List[OfferWallPopupOffer]]] = {
+            row.token: ([], []) for row in wall_rows
+        }
+        for row in assignment_rows:
+            lists = assignments.get(row.wall_token)
+            if lists is None:
+                # Офферволл добавлен между двумя выборками (READ COMMITTED)
+                continue
+            if row.kind == _OFFER_KIND:
+                lists[0].append(offer_interns.offer_assignment(row))
+            else:
+                lists[1].append(offer_interns.popup_assignment(row))
+        walls = []
+        for row in wall_rows:
+            offers, popups = assignments[row.token]
+            walls.append(
+                DomainOfferWall(
+                    token=row.token,
+                    # Столбцов вне проекции в строке нет
+                    name=getattr(row, "name", None),
+                    url=getattr(row, "url", None),
+                    description=getattr(row, "description", None),
+                    offer_assignments=tuple(offers),
+                    popup_assignments=tuple(popups),
+                )
+            )
+        return walls
+
+    async def load_all(self) -> List[DomainOfferWall]:
+        """Все офферволлы с назначениями двумя выборками (для снапшотов), в порядке token."""
+        wall_rows = (await self.session.execute(select(*_WALL_COLUMNS).order_by(OfferWall.token))).all()
+        assignment_rows = await self.session.execute(self._assignments_query(None))
+        return self._hydrate(wall_rows, assignment_rows)
+
+    async def stream_all(self, chunk_size: int) -> AsyncIterator[Sequence[DomainOfferWall]]:
+        """Офферволлы через серверный курсор (yield_per), назначения — выборкой на каждую порцию."""
+        if self.session.bind.dialect.name == "postgresql" and not self.session.in_transaction():
+            # Все порции — из одного снимка данных
+            await self.session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        stmt = select(*_WALL_COLUMNS).order_by(OfferWall.token).execution_options(yield_per=chunk_size)
+        result = await self.session.stream(stmt)
+        async for wall_rows in result.partitions():
+            # Запрос назначений повторяется на каждую порцию — это не N+1
+            with exempt_from_query_budget():
+                assignment_rows = await self.session.execute(
+                    self._assignments_query([row.token for row in wall_rows])
+                )
+            yield self._hydrate(wall_rows, assignment_rows)
+
+    async def list(
+        self,
+        name: Optional[str],
+        url: Optional[str],
+        page: int,
+        page_size: int,
+        after: Optional[str] = None,
+        projection: Optional[OfferWallProjection] = None,
+    ) -> Sequence[DomainOfferWall]:
+        stmt = select(*_wall_columns(projection)) if self.fetch_mode == "core" else self._base_query(projection)
         if name:
-            stmt = stmt.where(OfferWall.name.ilike(f"%{name}%"))
+            stmt = stmt.where(await self.search.clause(self.session, "name", name))
         if url:
-            stmt = stmt.where(OfferWall.url.ilike(f"%{url}%"))
-        stmt = stmt.offset((page - 1) * page_size).limit(page_size)
+            stmt = stmt.where(await self.search.clause(self.session, "url", url))
+        # Детерминированный порядок по первичному ключу: keyset по token вместо OFFSET
+        stmt = stmt.order_by(OfferWall.token).limit(page_size)
+        if after is not None:
+            stmt = stmt.where(OfferWall.token > after)
+        else:
+            stmt = stmt.offset((page - 1) * page_size)
+        if self.fetch_mode == "core":
+            return await self._fetch_core(stmt, projection=projection)
         result = await self.session.execute(stmt)
         orm_items = result.scalars().unique().all()
-        return [self._to_domain(ow) for ow in orm_items]
+        with span("repository.to_domain", walls=len(orm_items)):
+            return [self._to_domain(ow, projection) for ow in orm_items]
 
     async def get_by_token(self, token: str) -> Optional[DomainOfferWall]:
+        if self.fetch_mode == "core":
+            items = await self._fetch_core(select(*_WALL_COLUMNS).where(OfferWall.token == token), single=True)
+            return items[0] if items else None
         stmt = self._base_query().where(OfferWall.token == token)
         result = await self.session.execute(stmt)
         orm_item = result.scalar_one_or_none()
-        return self._to_domain(orm_item) if orm_item else None
+        with span("repository.to_domain", walls=int(orm_item is not None)):
+            return self._to_domain(orm_item) if orm_item else None
 
     async def get_by_url(self, url: str) -> Optional[DomainOfferWall]:
-        stmt = self._base_query().where(OfferWall.url == url)
-        result = await self.session.execute(stmt)
-        orm_item = result.scalar_one_or_none()
-        return self._to_domain(orm_item) if orm_item else None
\ No newline at end of file
+        # normalize → hash → проба уникального индекса url_hash → сверка нормализованного URL
+        key = normalize_url(url)
+        where = OfferWall.url_hash == hash_normalized_url(key)
+        if self.fetch_mode == "core":
+            items = await self._fetch_core(select(*_WALL_COLUMNS).where(where), single=True)
+            offerwall = items[0] if items else None
+        else:
+            orm_item = (await self.session.execute(self._base_query().where(where))).scalar_one_or_none()
+            with span("repository.to_domain", walls=int(orm_item is not None)):
+                offerwall = self._to_domain(orm_item) if orm_item else None
+        if offerwall is None or offerwall.url is None or normalize_url(offerwall.url) != key:
+            # Коллизия хэша: под тем же хэшем другой адрес
+            return None
+        return offerwall
+
+    async def get_many_by_tokens(self, tokens: Sequence[str]) -> Sequence[Optional[DomainOfferWall]]:
+        unique = list(dict.fromkeys(tokens))
+        if not unique:
+            return []
+        if self.fetch_mode == "core":
+            items = await self._fetch_core(select(*_WALL_COLUMNS).where(OfferWall.token.in_(unique)))
+        else:
+            result = await self.session.execute(self._base_query().where(OfferWall.token.in_(unique)))
+            orm_items = result.scalars().unique().all()
+            with span("repository.to_domain", walls=len(orm_items)):
+                items = [self._to_domain(ow) for ow in orm_items]
+        by_token = {ow.token: ow for ow in items}
+        return [by_token.get(token) for token in tokens]
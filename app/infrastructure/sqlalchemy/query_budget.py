@@ -0,0 +1,184 @@
+"""Учёт SQL-выражений в рамках запроса: бюджет и обнаружение N+1.
+
+Трекер привязывается к контексту (ContextVar) и получает каждое выражение из
+события `before_cursor_execute`. Трекеры вкладываются: выражение учитывается
+текущим трекером и всеми внешними, поэтому `track_queries()` в тесте видит
+запросы, выполненные внутри обработчика со своим трекером из middleware.
+"""
+
+import contextvars
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Iterator, List, Literal, Optional
+
+from litestar.types import ASGIApp, Receive, Scope, Send
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+BudgetMode = Literal["off", "log", "raise"]
+
+_WHITESPACE = re.compile(r"\s+")
+_NUMBERED_PARAM = re.compile(r"\$\d+|%s|%\(\w+\)s")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM_LIST = re.compile(r"\(\?(?:, \?)+\)")
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Запрос выполнил больше SQL-выражений, чем разрешено бюджетом."""
+
+
+class RepeatedQueryDetected(RuntimeError):
+    """Одно и то же выражение выполнено слишком много раз (вероятный N+1)."""
+
+
+def statement_shape(statement: str) -> str:
+    """Форма выражения без литералов и с одним плейсхолдером на IN-список."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _NUMBERED_PARAM.sub("?", shape)
+    shape = _STRING_LITERAL.sub("?", shape)
+    shape = _NUMBER_LITERAL.sub("?", shape)
+    return _PARAM_LIST.sub("(?)", shape)
+
+
+class QueryTracker:
+    """Счётчик выражений с необязательными лимитами.
+
+    `max_statements` — бюджет на весь трекер, `repeat_threshold` — сколько раз
+    допускается одна форма выражения. 0 отключает соответствующую проверку.
+    """
+
+    def __init__(
+        self,
+        max_statements: int = 0,
+        repeat_threshold: int = 0,
+        mode: BudgetMode = "raise",
+        label: str = "",
+        parent: Optional["QueryTracker"] = None,
+    ) -> None:
+        self.max_statements = max_statements
+        self.repeat_threshold = repeat_threshold
+        self.mode = mode
+        self.label = label
+        self.parent = parent
+        self.statements: List[str] = []
+        self.shapes: Counter[str] = Counter()
+        self._reported: set = set()
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def record(self, statement: str) -> None:
+        shape = statement_shape(statement)
+        trackers: List[QueryTracker] = []
+        tracker: Optional[QueryTracker] = self
+        while tracker is not None:
+            tracker.statements.append(statement)
+            tracker.shapes[shape] += 1
+            trackers.append(tracker)
+            tracker = tracker.parent
+        # Проверки — после учёта во всех трекерах, чтобы исключение не исказило внешние счётчики
+        for tracker in trackers:
+            tracker._check(shape)
+
+    def _check(self, shape: str) -> None:
+        if self.max_statements and self.count > self.max_statements:
+            self._violation(
+                "budget",
+                QueryBudgetExceeded(
+                    f"{self._where()}executed {self.count} SQL statements, budget is {self.max_statements}"
+                ),
+            )
+        if self.repeat_threshold and self.shapes[shape] > self.repeat_threshold:
+            self._violation(
+                ("repeat", shape),
+                RepeatedQueryDetected(
+                    f"{self._where()}executed the same statement {self.shapes[shape]} times "
+                    f"(threshold {self.repeat_threshold}): {shape}"
+                ),
+            )
+
+    def _where(self) -> str:
+        return f"{self.label} " if self.label else ""
+
+    def _violation(self, key: Any, exc: Exception) -> None:
+        if self.mode == "raise":
+            raise exc
+        if self.mode == "log" and key not in self._reported:
+            self._reported.add(key)
+            logger.warning("%s", exc)
+
+    def report(self) -> str:
+        lines = [f"{self.count} SQL statements:"]
+        lines.extend(f"  {count} x {shape}" for shape, count in self.shapes.most_common())
+        return "\n".join(lines)
+
+
+_current_tracker: contextvars.ContextVar[Optional[QueryTracker]] = contextvars.ContextVar(
+    "query_tracker", default=None
+)
+
+
+@contextmanager
+def track_queries(
+    max_statements: int = 0, repeat_threshold: int = 0, mode: BudgetMode = "raise", label: str = ""
+) -> Iterator[QueryTracker]:
+    tracker = QueryTracker(
+        max_statements=max_statements,
+        repeat_threshold=repeat_threshold,
+        mode=mode,
+        label=label,
+        parent=_current_tracker.get(),
+    )
+    token = _current_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current_tracker.reset(token)
+
+
+@contextmanager
+def exempt_from_query_budget() -> Iterator[None]:
+    """Не учитывать выражения блока (ожидаемо повторяющиеся порционные выборки)."""
+    token = _current_tracker.set(None)
+    try:
+        yield
+    finally:
+        _current_tracker.reset(token)
+
+
+def install_query_tracker(engine: AsyncEngine) -> None:
+    """Передавать выражения движка текущему трекеру (если он есть)."""
+    if event.contains(engine.sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def _before_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    tracker = _current_tracker.get()
+    if tracker is not None:
+        tracker.record(statement)
+
+
+def query_budget_middleware(max_statements: int, repeat_threshold: int, mode: BudgetMode) -> Any:
+    """Фабрика middleware, открывающего трекер на каждый HTTP-запрос."""
+
+    def factory(app: ASGIApp) -> ASGIApp:
+        async def middleware(scope: Scope, receive: Receive, send: Send) -> None:
+            if scope["type"] != "http":
+                await app(scope, receive, send)
+                return
+            label = f"{scope['method']} {scope.get('path_template') or scope['path']}"
+            with track_queries(max_statements, repeat_threshold, mode, label=label):
+                await app(scope, receive, send)
+
+        return middleware
+
+    return factory
@@ -0,0 +1,89 @@
+"""SQL-выражения в трассе запроса и журнал медленных запросов.
+
+Каждое выражение становится спаном `sql` текущей трассы (если она есть).
+Выражения дольше порога пишутся в лог `app.slow_queries` с формой выражения,
+формой параметров (типы и их число, без значений), длительностью и request ID.
+"""
+
+import logging
+from collections.abc import Mapping
+from typing import Any, List, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.infrastructure.sqlalchemy.query_budget import statement_shape
+from app.infrastructure.sqlalchemy.statement_timing import StatementTiming, observe_statements
+from app.tracing import current_request_id, is_tracing, record_span
+
+slow_query_logger = logging.getLogger("app.slow_queries")
+
+
+def _row_shape(row: Any) -> str:
+    if isinstance(row, Mapping):
+        return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in row.items()) + "}"
+    if not isinstance(row, (list, tuple)):
+        return type(row).__name__
+    # Подряд идущие параметры одного типа схлопываются: IN-список из 500 токенов — "str x 500"
+    runs: List[Tuple[str, int]] = []
+    for value in row:
+        name = type(value).__name__
+        if runs and runs[-1][0] == name:
+            runs[-1] = (name, runs[-1][1] + 1)
+        else:
+            runs.append((name, 1))
+    return "(" + ", ".join(name if count == 1 else f"{name} x {count}" for name, count in runs) + ")"
+
+
+def parameters_shape(parameters: Any, executemany: bool = False) -> str:
+    """Форма параметров выражения без значений (значения могут быть персональными данными)."""
+    if executemany:
+        rows = list(parameters)
+        return f"{len(rows)} x {_row_shape(rows[0])}" if rows else "0 x ()"
+    return _row_shape(parameters)
+
+
+class SlowQueryLog:
+    """Порог медленного выражения; 0 отключает журнал. Меняется на лету."""
+
+    def __init__(self, threshold_ms: float) -> None:
+        self.threshold_ms = threshold_ms
+        self.logged = 0
+
+    def observe(self, statement: str, parameters: Any, executemany: bool, duration_ms: float) -> None:
+        if not self.threshold_ms or duration_ms < self.threshold_ms:
+            return
+        self.logged += 1
+        request_id = current_request_id()
+        shape = statement_shape(statement)
+        params = parameters_shape(parameters, executemany)
+        slow_query_logger.warning(
+            "slow query %.1f ms request_id=%s params=%s: %s",
+            duration_ms,
+            request_id or "-",
+            params,
+            shape,
+            extra={
+                "request_id": request_id,
+                "duration_ms": duration_ms,
+                "statement": shape,
+                "parameters_shape": params,
+            },
+        )
+
+
+def install_sql_tracing(engine: AsyncEngine, slow_query_log: SlowQueryLog) -> None:
+    """Спаны `sql` для трассировки и журнал медленных выражений движка."""
+
+    def observe(timing: StatementTiming) -> None:
+        duration_ms = timing.seconds * 1000
+        slow_query_log.observe(timing.statement, timing.parameters, timing.executemany, duration_ms)
+        if is_tracing():
+            record_span(
+                "sql",
+                timing.start,
+                duration_ms,
+                statement=statement_shape(timing.statement),
+                parameters=parameters_shape(timing.parameters, timing.executemany),
+            )
+
+    observe_statements(engine, observe)
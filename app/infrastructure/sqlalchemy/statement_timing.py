@@ -0,0 +1,63 @@
+"""Время выполнения SQL-выражений: одна пара слушателей на движок, подписчиков — сколько угодно.
+
+Время начала хранится в контексте выполнения, который у каждого выражения
+свой: упавшее выражение (after_cursor_execute для него не вызывается) не
+оставляет состояния на соединении из пула.
+"""
+
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Any, Callable, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+@dataclass
+class StatementTiming:
+    statement: str
+    parameters: Any
+    executemany: bool
+    # Время начала (unix, секунды) и длительность
+    start: float
+    seconds: float
+
+
+StatementObserver = Callable[[StatementTiming], None]
+
+_observers: "weakref.WeakKeyDictionary[Engine, List[StatementObserver]]" = weakref.WeakKeyDictionary()
+
+
+def observe_statements(engine: AsyncEngine, observer: StatementObserver) -> None:
+    """Вызывать `observer` после каждого выражения движка."""
+    sync_engine = engine.sync_engine
+    observers = _observers.get(sync_engine)
+    if observers is None:
+        observers = _observers[sync_engine] = []
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    if observer not in observers:
+        observers.append(observer)
+
+
+def _before_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    context._statement_started = (time.time(), time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Any, cursor: Any, statement: str, parameters: Any, context: Any, executemany: bool
+) -> None:
+    start, started = context._statement_started
+    timing = StatementTiming(
+        statement=statement,
+        parameters=parameters,
+        executemany=executemany,
+        start=start,
+        seconds=time.perf_counter() - started,
+    )
+    for observer in _observers.get(conn.engine, ()):
+        observer(timing)
@@ -0,0 +1,301 @@
+"""Метрики в формате Prometheus text exposition (0.0.4) без внешних зависимостей.
+
+Запрос проходит через `metrics_middleware_factory`: латентность по маршруту и
+статусу, а также число SQL-выражений и время в БД за запрос (события
+SQLAlchemy, см. `install_sql_metrics`). Показатели внешних объектов (кэши,
+пул соединений) снимаются в момент скрейпа через `MetricsRegistry.on_collect`.
+"""
+
+import bisect
+import contextvars
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.infrastructure.sqlalchemy.statement_timing import StatementTiming, observe_statements
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(line + "\n" for line in self.samples())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def set(self, value: float, *labels: str) -> None:
+        """Отразить монотонный счётчик, который ведётся в другом объекте."""
+        self.values[labels] = value
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in self.values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Значения по лейблам: [счётчики по корзинам (+Inf последняя), сумма]
+        self.values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+                )
+            lines.append(
+                f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total[0])}"
+            )
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.metrics: Dict[str, _Metric] = {}
+        self.collectors: List[Callable[[], None]] = []
+
+    def _register(self, metric: Any) -> Any:
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def on_collect(self, collector: Callable[[], None]) -> Callable[[], None]:
+        """Зарегистрировать функцию, обновляющую метрики перед каждым скрейпом."""
+        self.collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        for collector in self.collectors:
+            collector()
+        return "".join(metric.render() for metric in self.metrics.values())
+
+
+metrics = MetricsRegistry()
+
+http_requests_total = metrics.counter(
+    "http_requests_total",
+    "HTTP requests by route template and status.",
+    ("method", "route", "status"),
+)
+http_request_duration_seconds = metrics.histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ("method", "route", "status")
+)
+http_request_db_statements = metrics.histogram(
+    "http_request_db_statements",
+    "SQL statements executed per HTTP request.",
+    ("route",),
+    COUNT_BUCKETS,
+)
+http_request_db_seconds = metrics.histogram(
+    "http_request_db_seconds", "Time spent in SQL statements per HTTP request.", ("route",)
+)
+db_statements_total = metrics.counter("db_statements_total", "SQL statements executed.")
+db_statement_duration_seconds = metrics.histogram(
+    "db_statement_duration_seconds", "SQL statement latency."
+)
+
+cache_requests_total = metrics.counter(
+    "cache_requests_total", "Cache lookups by result.", ("cache", "result")
+)
+cache_evictions_total = metrics.counter(
+    "cache_evictions_total", "Entries evicted by LRU.", ("cache",)
+)
+cache_entries = metrics.gauge("cache_entries", "Entries currently stored.", ("cache",))
+singleflight_calls_total = metrics.counter(
+    "singleflight_calls_total", "Coalesced lookups by outcome.", ("flight", "outcome")
+)
+db_pool_connections = metrics.gauge("db_pool_connections", "Connection pool gauges.", ("state",))
+db_pool_checkouts_total = metrics.counter(
+    "db_pool_checkouts_total", "Connections handed out by the pool."
+)
+db_pool_timeouts_total = metrics.counter(
+    "db_pool_timeouts_total", "Checkouts that hit pool_timeout."
+)
+db_pool_wait_seconds_total = metrics.counter(
+    "db_pool_wait_seconds_total", "Time spent waiting for a connection."
+)
+admission_requests_total = metrics.counter(
+    "admission_requests_total", "Admission decisions by route and outcome.", ("route", "outcome")
+)
+admission_queue_depth = metrics.gauge(
+    "admission_queue_depth", "Requests waiting for a concurrency slot.", ("route",)
+)
+admission_active_requests = metrics.gauge(
+    "admission_active_requests", "Requests holding a concurrency slot.", ("route",)
+)
+
+
+def collect_cache(name: str, stats: Any, size: int) -> None:
+    cache_requests_total.set(stats.hits, name, "hit")
+    cache_requests_total.set(stats.misses, name, "miss")
+    cache_evictions_total.set(stats.evictions, name)
+    cache_entries.set(size, name)
+
+
+def collect_singleflight(name: str, stats: Any) -> None:
+    singleflight_calls_total.set(stats.executed, name, "executed")
+    singleflight_calls_total.set(stats.deduplicated, name, "deduplicated")
+    singleflight_calls_total.set(stats.cancelled, name, "cancelled")
+
+
+def collect_pool(status: Dict[str, float]) -> None:
+    for state in ("size", "checked_in", "checked_out", "overflow"):
+        if state in status:
+            db_pool_connections.set(status[state], state)
+    db_pool_checkouts_total.set(status["checkouts"])
+    db_pool_timeouts_total.set(status["timeouts"])
+    db_pool_wait_seconds_total.set(status["wait_seconds_total"])
+
+
+def collect_admission(limiters: Dict[str, Any]) -> None:
+    for route, limiter in limiters.items():
+        stats = limiter.stats
+        admission_requests_total.set(stats.admitted, route, "admitted")
+        admission_requests_total.set(stats.rejected_queue_full, route, "rejected_queue_full")
+        admission_requests_total.set(stats.rejected_timeout, route, "rejected_timeout")
+        admission_requests_total.set(stats.shed, route, "shed")
+        admission_queue_depth.set(limiter.queue_depth, route)
+        admission_active_requests.set(limiter.active, route)
+
+
+@dataclass
+class RequestDbStats:
+    statements: int = 0
+    seconds: float = 0.0
+
+
+_request_db_stats: contextvars.ContextVar[Optional[RequestDbStats]] = contextvars.ContextVar(
+    "request_db_stats", default=None
+)
+
+
+def _observe_sql_statement(timing: StatementTiming) -> None:
+    db_statements_total.inc()
+    db_statement_duration_seconds.observe(timing.seconds)
+    stats = _request_db_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.seconds += timing.seconds
+
+
+def install_sql_metrics(engine: AsyncEngine) -> None:
+    """Считать SQL-выражения и время в БД (глобально и для текущего запроса)."""
+    observe_statements(engine, _observe_sql_statement)
+
+
+def metrics_middleware_factory(app: ASGIApp) -> ASGIApp:
+    async def middleware(scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await app(scope, receive, send)
+            return
+        status = 500
+        stats = RequestDbStats()
+        token = _request_db_stats.set(stats)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_db_stats.reset(token)
+            route = scope.get("path_template") or scope["path"]
+            method = scope["method"]
+            http_requests_total.inc(method, route, str(status))
+            http_request_duration_seconds.observe(elapsed, method, route, str(status))
+            http_request_db_statements.observe(stats.statements, route)
+            http_request_db_seconds.observe(stats.seconds, route)
+
+    return middleware
@@ -1,6 +1,8 @@
-from sqlalchemy import ForeignKey, String, Boolean, Integer
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import ForeignKey, Index, String, Boolean, Integer
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
 from app.db import Base
+from app.domain.offer_names import OfferNameRegistry
+from app.domain.urls import URL_HASH_LENGTH, url_hash
 
 class OfferChoices:
     choices = [
@@ -42,6 +44,9 @@ class OfferChoices:
         ("AvansCredit", "AvansCredit"),
     ]
 
+# Справочник названий на время жизни процесса: проверка Offer.name за O(1)
+offer_names = OfferNameRegistry.from_choices(OfferChoices.choices)
+
 class Offer(Base):
     __tablename__ = "offers"
     uuid: Mapped[str] = mapped_column(String(36), primary_key=True)
@@ -60,11 +65,19 @@ class Offer(Base):
         back_populates="offer", cascade="all, delete-orphan"
     )
 
+def _url_hash_default(context) -> str:
+    return url_hash(context.get_current_parameters()["url"])
+
 class OfferWall(Base):
     __tablename__ = "offerwalls"
+    # Индексы заводятся миграциями (migrations/versions); здесь — для согласованности метаданных
+    __table_args__ = (Index("ix_offerwalls_url_hash", "url_hash", unique=True),)
     token: Mapped[str] = mapped_column(String(36), primary_key=True)
     name: Mapped[str] = mapped_column(String(255))
     url: Mapped[str] = mapped_column(String(500))
+    # Хэш нормализованного url (app.domain.urls): поиск по URL — проба уникального индекса.
+    # Вставки через Core получают его из default, изменения через ORM — из _sync_url_hash
+    url_hash: Mapped[str] = mapped_column(String(URL_HASH_LENGTH), default=_url_hash_default)
     description: Mapped[str | None] = mapped_column(String(2000), nullable=True)
 
     offer_assignments: Mapped[list["OfferAssignment"]] = relationship(
@@ -78,8 +91,18 @@ class OfferWall(Base):
         order_by=lambda: PopupAssignment.order,
     )
 
+    @validates("url")
+    def _sync_url_hash(self, key: str, url: str) -> str:
+        self.url_hash = url_hash(url)
+        return url
+
 class OfferAssignment(Base):
     __tablename__ = "offer_wall_offers"
+    __table_args__ = (
+        # Назначения офферволлов в порядке order читаются по диапазону индекса
+        Index("ix_offer_wall_offers_wall_order", "offer_wall_token", "order", "id", "offer_uuid"),
+        Index("ix_offer_wall_offers_offer_uuid", "offer_uuid"),
+    )
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     offer_wall_token: Mapped[str] = mapped_column(ForeignKey("offerwalls.token", ondelete="CASCADE"))
     offer_uuid: Mapped[str] = mapped_column(ForeignKey("offers.uuid", ondelete="CASCADE"))
@@ -90,6 +113,10 @@ class OfferAssignment(Base):
 
 class PopupAssignment(Base):
     __tablename__ = "offer_wall_popup_offers"
+    __table_args__ = (
+        Index("ix_offer_wall_popup_offers_wall_order", "offer_wall_token", "order", "id", "offer_uuid"),
+        Index("ix_offer_wall_popup_offers_offer_uuid", "offer_uuid"),
+    )
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     offer_wall_token: Mapped[str] = mapped_column(ForeignKey("offerwalls.token", ondelete="CASCADE"))
     offer_uuid: Mapped[str] = mapped_column(ForeignKey("offers.uuid", ondelete="CASCADE"))
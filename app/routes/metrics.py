@@ -0,0 +1,18 @@
+from litestar import Response, get
+from litestar.enums import MediaType
+
+from app.config import settings
+from app.metrics import metrics
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+@get(
+    settings.metrics_path,
+    include_in_schema=False,
+    media_type=MediaType.TEXT,
+    opt={"admission": False},
+)
+async def metrics_endpoint() -> Response[str]:
+    """Метрики сервиса в формате Prometheus."""
+    return Response(content=metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,13 +1,87 @@
-from typing import Optional
+from typing import AsyncIterator, Optional
 
-from litestar import Controller, get
-from sqlalchemy import select
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
+from litestar import Controller, Request, Response, get, post
+from litestar.datastructures import ResponseHeader
+from litestar.enums import MediaType
+from litestar.params import Parameter
+from litestar.response import Stream
 
-from app.models import OfferWall, OfferChoices, OfferAssignment, PopupAssignment
-from app.schemas import OfferWall as OfferWallSchema, OfferNames
+from app.models import offer_names
+from app.schemas import (
+    OfferWall as OfferWallSchema,
+    OfferNames,
+    OfferWallBatchRequest,
+    OfferWallBatchResponse,
+)
+from app.admission import check_not_shedding
 from app.application.offerwall_service import OfferWallService
+from app.compression import negotiate
+from app.config import settings
+from app.di.providers import response_body_cache, response_encoder, stream_offerwalls
+from app.infrastructure.cache.response_cache import EncodedResponse
+from app.domain.entities import OfferWall as DomainOfferWall
+from app.tracing import span
+
+
+def _encode_offerwall(offerwall: DomainOfferWall) -> bytes:
+    with span("serialize.offerwall"):
+        return response_encoder.offerwall(offerwall)
+
+
+def _etag_matches(request: Request, *etags: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match использует слабое сравнение
+    return any(tag.strip().removeprefix("W/") in etags for tag in header.split(","))
+
+
+def _offerwall_response(request: Request, offerwall: DomainOfferWall) -> Response[OfferWallSchema]:
+    """Ответ из закэшированного тела с ETag; 304 без тела при совпадении If-None-Match.
+
+    Сжатый вариант тела берётся из той же записи кэша — сжимается один раз на версию.
+    """
+    encoded = response_body_cache.get_or_encode(offerwall, _encode_offerwall)
+    encoding = None
+    if settings.compression_enabled and len(encoded.body) >= settings.compression_min_size:
+        encoding = negotiate(request.headers.get("accept-encoding"))
+    etag = encoded.etag if encoding is None else encoded.variant_etag(encoding)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": settings.offerwall_cache_control,
+        "Vary": "Accept-Encoding",
+    }
+    if _etag_matches(request, encoded.etag, etag):
+        return Response(content=b"", status_code=304, headers=headers)
+    if encoding is None:
+        return Response(content=encoded.body, media_type=MediaType.JSON, headers=headers)
+    headers["Content-Encoding"] = encoding
+    with span("serialize.compress", encoding=encoding):
+        body = encoded.variant(encoding)
+    return Response(content=body, media_type=MediaType.JSON, headers=headers)
+
+
+def _encode_offer_names() -> EncodedResponse:
+    body = OfferNames(offer_names=list(offer_names.names)).model_dump_json().encode()
+    # Тело определяется списком целиком: версия справочника и есть сильный ETag
+    return EncodedResponse(body=body, etag=f'"{offer_names.version}"')
+
+
+# Справочник названий неизменен на время жизни процесса: тело и ETag готовы заранее
+_OFFER_NAMES_RESPONSE = _encode_offer_names()
+
+
+_CONDITIONAL_HEADERS = [
+    ResponseHeader(name="ETag", description="Сильный ETag содержимого", documentation_only=True),
+    ResponseHeader(name="Cache-Control", description="Политика кэширования", documentation_only=True),
+    ResponseHeader(
+        name="Content-Encoding",
+        description="gzip, br или zstd по Accept-Encoding (для тел от APP_COMPRESSION_MIN_SIZE байт)",
+        documentation_only=True,
+    ),
+]
 
 
 class OfferWallController(Controller):
@@ -17,7 +91,16 @@ class OfferWallController(Controller):
     @get(
         "",
         summary="Получить список офферволлов",
-        description="Возвращает список всех офферволлов с возможностью фильтрации по имени и URL",
+        description="Возвращает список всех офферволлов с возможностью фильтрации по имени и URL. "
+        "Элементы упорядочены по token; для перехода на следующую страницу передайте "
+        "значение заголовка X-Next-Cursor в параметре cursor.",
+        response_headers=[
+            ResponseHeader(
+                name="X-Next-Cursor",
+                description="Курсор следующей страницы (отсутствует на последней странице)",
+                documentation_only=True,
+            )
+        ],
         responses={
             200: {
                 "description": "Список офферволлов успешно получен",
@@ -34,9 +117,20 @@ class OfferWallController(Controller):
         service: OfferWallService,
         name: Optional[str] = None,
         url: Optional[str] = None,
-        page: int = 1,
-        page_size: int = 20,
-    ) -> list[OfferWallSchema]:
+        page: int = Parameter(default=1, ge=1),
+        page_size: int = Parameter(default=20, ge=1, le=settings.max_page_size),
+        cursor: Optional[str] = None,
+        fields: Optional[str] = Parameter(
+            default=None,
+            description="Поля офферволла через запятую: token, name, url, description "
+            "(token возвращается всегда). По умолчанию — все.",
+        ),
+        include: Optional[str] = Parameter(
+            default=None,
+            description="Списки назначений через запятую: offer_assignments, popup_assignments. "
+            "Пустое значение — без назначений; по умолчанию — оба.",
+        ),
+    ) -> Response[list[OfferWallSchema]]:
         """Получить список офферволлов с фильтрацией.
         
         Args:
@@ -45,17 +139,26 @@ class OfferWallController(Controller):
             url: Фильтр по URL офферволла (опционально)
             page: Номер страницы для пагинации (по умолчанию 1)
             page_size: Количество элементов на странице (по умолчанию 20)
+            cursor: Курсор из X-Next-Cursor предыдущей страницы (имеет приоритет над page)
+            fields: Скалярные поля в ответе (sparse fieldset)
+            include: Списки назначений в ответе
             
         Returns:
             Список офферволлов
         """
-        offerwalls = await service.list_offerwalls(name=name, url=url, page=page, page_size=page_size)
-        return [OfferWallSchema.model_validate(ow) for ow in offerwalls]
+        result = await service.list_offerwalls_page(
+            name=name, url=url, page=page, page_size=page_size, cursor=cursor, fields=fields, include=include
+        )
+        headers = {"X-Next-Cursor": result.next_cursor} if result.next_cursor else {}
+        with span("serialize.offerwalls", count=len(result.items)):
+            body = response_encoder.offerwalls(result.items, result.projection)
+        return Response(content=body, media_type=MediaType.JSON, headers=headers)
 
     @get(
         "/{token:str}",
         summary="Получить офферволл по токену",
         description="Возвращает детали конкретного офферволла по его уникальному токену",
+        response_headers=_CONDITIONAL_HEADERS,
         responses={
             200: {
                 "description": "Офферволл успешно найден",
@@ -65,15 +168,21 @@ class OfferWallController(Controller):
                     }
                 }
             },
+            304: {
+                "description": "Содержимое не изменилось (If-None-Match)"
+            },
             404: {
                 "description": "Офферволл не найден"
             }
         }
     )
-    async def get_offerwall(self, service: OfferWallService, token: str) -> OfferWallSchema:
+    async def get_offerwall(
+        self, request: Request, service: OfferWallService, token: str
+    ) -> Response[OfferWallSchema]:
         """Получить офферволл по токену.
         
         Args:
+            request: Текущий запрос (для If-None-Match)
             service: Сервис для работы с офферволлами
             token: Уникальный токен офферволла
             
@@ -84,12 +193,13 @@ class OfferWallController(Controller):
             NotFoundException: Если офферволл не найден
         """
         offerwall = await service.get_offerwall(token=token)
-        return OfferWallSchema.model_validate(offerwall)
+        return _offerwall_response(request, offerwall)
 
     @get(
         "/by_url/{url:str}",
         summary="Получить офферволл по URL",
         description="Возвращает детали конкретного офферволла по его URL",
+        response_headers=_CONDITIONAL_HEADERS,
         responses={
             200: {
                 "description": "Офферволл успешно найден",
@@ -99,15 +209,21 @@ class OfferWallController(Controller):
                     }
                 }
             },
+            304: {
+                "description": "Содержимое не изменилось (If-None-Match)"
+            },
             404: {
                 "description": "Офферволл не найден"
             }
         }
     )
-    async def get_offerwall_by_url(self, service: OfferWallService, url: str) -> OfferWallSchema:
+    async def get_offerwall_by_url(
+        self, request: Request, service: OfferWallService, url: str
+    ) -> Response[OfferWallSchema]:
         """Получить офферволл по URL.
         
         Args:
+            request: Текущий запрос (для If-None-Match)
             service: Сервис для работы с офферволлами
             url: URL офферволла
             
@@ -118,12 +234,78 @@ class OfferWallController(Controller):
             NotFoundException: Если офферволл не найден
         """
         offerwall = await service.get_offerwall_by_url(url=url)
-        return OfferWallSchema.model_validate(offerwall)
+        return _offerwall_response(request, offerwall)
+
+    @post(
+        "/batch",
+        status_code=200,
+        summary="Получить несколько офферволлов по токенам",
+        description="Возвращает офферволлы для списка токенов одним запросом, в порядке запроса. "
+        "Для ненайденных токенов found=false и offerwall=null.",
+        responses={
+            200: {
+                "description": "Результаты по каждому токену",
+                "content": {
+                    "application/json": {
+                        "schema": {"$ref": "#/components/schemas/OfferWallBatchResponse"}
+                    }
+                }
+            }
+        }
+    )
+    async def get_offerwalls_batch(
+        self, service: OfferWallService, data: OfferWallBatchRequest
+    ) -> Response[OfferWallBatchResponse]:
+        """Получить несколько офферволлов по токенам.
+        
+        Args:
+            service: Сервис для работы с офферволлами
+            data: Список токенов
+            
+        Returns:
+            Результаты в порядке запрошенных токенов
+        """
+        results = await service.get_offerwalls_by_tokens(data.tokens)
+        with span("serialize.batch", count=len(results)):
+            body = response_encoder.batch(results)
+        return Response(content=body, media_type=MediaType.JSON)
+
+    @get(
+        "/export",
+        summary="Выгрузить все офферволлы (NDJSON)",
+        description="Потоковая выгрузка всех офферволлов с назначениями: по одному JSON-объекту "
+        "на строку, в порядке token. Память сервера не зависит от числа офферволлов.",
+        responses={
+            200: {
+                "description": "Поток офферволлов",
+                "content": {"application/x-ndjson": {"schema": {"$ref": "#/components/schemas/OfferWall"}}},
+            }
+        }
+    )
+    async def export_offerwalls(self) -> Stream:
+        """Выгрузить все офферволлы построчно.
+
+        Каждая порция уходит клиенту, как только для неё выбраны назначения.
+        """
+        # Репозиторий проверит сброс нагрузки только внутри потока, когда статус 200
+        # уже отправлен: отклоняем выгрузку до ответа, чтобы клиент получил 503
+        check_not_shedding()
+
+        async def lines() -> AsyncIterator[bytes]:
+            async for chunk in stream_offerwalls(settings.export_chunk_size):
+                # Без спана на каждый офферволл: трасса выгрузки была бы размером с таблицу
+                yield b"".join(response_encoder.offerwall(offerwall) + b"\n" for offerwall in chunk)
+
+        return Stream(lines(), media_type="application/x-ndjson")
 
     @get(
         "/get_offer_names",
         summary="Получить список названий предложений",
-        description="Возвращает список всех доступных названий предложений из OfferChoices",
+        description="Возвращает список всех доступных названий предложений из OfferChoices. "
+        "Тело закодировано один раз при запуске; ETag меняется только вместе со списком.",
+        response_headers=_CONDITIONAL_HEADERS[:2],
+        # Тело готово заранее, БД не нужна: лимит конкурентности не применяется
+        opt={"admission": False},
         responses={
             200: {
                 "description": "Список названий предложений успешно получен",
@@ -132,17 +314,23 @@ class OfferWallController(Controller):
                         "schema": {"$ref": "#/components/schemas/OfferNames"}
                     }
                 }
+            },
+            304: {
+                "description": "Содержимое не изменилось (If-None-Match)"
             }
         }
     )
-    async def get_offer_names(self, service: OfferWallService) -> OfferNames:
+    async def get_offer_names(self, request: Request) -> Response[OfferNames]:
         """Получить список названий предложений.
         
         Args:
-            service: Сервис для работы с офферволлами
+            request: Текущий запрос (для If-None-Match)
             
         Returns:
             Список названий предложений
         """
-        names = service.get_offer_names()
-        return OfferNames(offer_names=names)
\ No newline at end of file
+        encoded = _OFFER_NAMES_RESPONSE
+        headers = {"ETag": encoded.etag, "Cache-Control": settings.offer_names_cache_control}
+        if _etag_matches(request, encoded.etag):
+            return Response(content=b"", status_code=304, headers=headers)
+        return Response(content=encoded.body, media_type=MediaType.JSON, headers=headers)
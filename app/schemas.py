@@ -40,6 +40,23 @@ class OfferWall(BaseModel):
     popup_assignments: List[OfferWallPopupOffer] = Field(default_factory=list, description="Список popup предложений")
 
 
+class OfferWallBatchRequest(BaseModel):
+    """Запрос пакетного получения офферволлов"""
+    tokens: List[str] = Field(..., min_length=1, description="Токены офферволлов")
+
+
+class OfferWallBatchItem(BaseModel):
+    """Результат для одного токена пакетного запроса"""
+    token: str = Field(..., description="Запрошенный токен")
+    found: bool = Field(..., description="Найден ли офферволл")
+    offerwall: Optional[OfferWall] = Field(None, description="Офферволл (null, если не найден)")
+
+
+class OfferWallBatchResponse(BaseModel):
+    """Ответ пакетного получения офферволлов (в порядке запроса)"""
+    items: List[OfferWallBatchItem] = Field(..., description="Результаты по каждому токену")
+
+
 class OfferNames(BaseModel):
     """Модель списка названий предложений"""
     offer_names: List[str] = Field(..., description="Список названий предложений")
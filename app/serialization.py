@@ -0,0 +1,133 @@
+"""Кодирование ответов с офферволлами в JSON.
+
+"pydantic" — через схемы app.schemas (model_validate с from_attributes и
+model_dump_json); "msgspec" — через app.structs: доменные сущности переводятся
+в Struct одним вызовом msgspec.convert и кодируются без промежуточных dict.
+Формат тел одинаковый, выбор — APP_RESPONSE_ENCODER.
+"""
+
+from typing import Any, Dict, List, Literal, Optional, Protocol, Sequence, Tuple
+
+import msgspec
+from pydantic import TypeAdapter
+
+from app import schemas, structs
+from app.domain.entities import OfferWall, OfferWallProjection
+
+ResponseEncoderName = Literal["pydantic", "msgspec"]
+
+BatchResults = Sequence[Tuple[str, Optional[OfferWall]]]
+
+_offers = TypeAdapter(List[schemas.OfferWallOffer])
+_popup_offers = TypeAdapter(List[schemas.OfferWallPopupOffer])
+_partials = TypeAdapter(List[Dict[str, Any]])
+
+
+class ResponseEncoder(Protocol):
+    def offerwall(self, offerwall: OfferWall) -> bytes: ...
+
+    def offerwalls(
+        self, offerwalls: Sequence[OfferWall], projection: Optional[OfferWallProjection] = None
+    ) -> bytes:
+        """Массив офферволлов; с `projection` — только её поля, в порядке схемы."""
+        ...
+
+    def batch(self, results: BatchResults) -> bytes:
+        """Ответ POST /batch: пары (запрошенный токен, офферволл или None)."""
+        ...
+
+
+class PydanticResponseEncoder:
+    def offerwall(self, offerwall: OfferWall) -> bytes:
+        return schemas.OfferWall.model_validate(offerwall).model_dump_json().encode()
+
+    def offerwalls(
+        self, offerwalls: Sequence[OfferWall], projection: Optional[OfferWallProjection] = None
+    ) -> bytes:
+        if projection is None:
+            return b"[" + b",".join(self.offerwall(offerwall) for offerwall in offerwalls) + b"]"
+        # Поля вне проекции в сущности — None: схема OfferWall их не пропустит
+        items = [self._partial(offerwall, projection) for offerwall in offerwalls]
+        return _partials.dump_json(items)
+
+    @staticmethod
+    def _partial(offerwall: OfferWall, projection: OfferWallProjection) -> Dict[str, Any]:
+        item: Dict[str, Any] = {name: getattr(offerwall, name) for name in projection.fields}
+        if "offer_assignments" in projection.include:
+            item["offer_assignments"] = _offers.validate_python(
+                offerwall.offer_assignments, from_attributes=True
+            )
+        if "popup_assignments" in projection.include:
+            item["popup_assignments"] = _popup_offers.validate_python(
+                offerwall.popup_assignments, from_attributes=True
+            )
+        return item
+
+    def batch(self, results: BatchResults) -> bytes:
+        response = schemas.OfferWallBatchResponse(
+            items=[
+                schemas.OfferWallBatchItem(
+                    token=token,
+                    found=offerwall is not None,
+                    offerwall=schemas.OfferWall.model_validate(offerwall) if offerwall else None,
+                )
+                for token, offerwall in results
+            ]
+        )
+        return response.model_dump_json().encode()
+
+
+class MsgspecResponseEncoder:
+    def __init__(self) -> None:
+        self.encoder = msgspec.json.Encoder()
+
+    @staticmethod
+    def _struct(offerwall: OfferWall) -> structs.OfferWall:
+        return msgspec.convert(offerwall, structs.OfferWall, from_attributes=True)
+
+    def offerwall(self, offerwall: OfferWall) -> bytes:
+        return self.encoder.encode(self._struct(offerwall))
+
+    def offerwalls(
+        self, offerwalls: Sequence[OfferWall], projection: Optional[OfferWallProjection] = None
+    ) -> bytes:
+        if projection is None:
+            items: List[structs.OfferWall] = msgspec.convert(
+                offerwalls, List[structs.OfferWall], from_attributes=True
+            )
+            return self.encoder.encode(items)
+        return self.encoder.encode([self._partial(offerwall, projection) for offerwall in offerwalls])
+
+    @staticmethod
+    def _partial(offerwall: OfferWall, projection: OfferWallProjection) -> Dict[str, Any]:
+        item: Dict[str, Any] = {name: getattr(offerwall, name) for name in projection.fields}
+        if "offer_assignments" in projection.include:
+            item["offer_assignments"] = msgspec.convert(
+                offerwall.offer_assignments, List[structs.OfferWallOffer], from_attributes=True
+            )
+        if "popup_assignments" in projection.include:
+            item["popup_assignments"] = msgspec.convert(
+                offerwall.popup_assignments, List[structs.OfferWallPopupOffer], from_attributes=True
+            )
+        return item
+
+    def batch(self, results: BatchResults) -> bytes:
+        response = structs.OfferWallBatchResponse(
+            items=[
+                structs.OfferWallBatchItem(
+                    token=token,
+                    found=offerwall is not None,
+                    offerwall=self._struct(offerwall) if offerwall else None,
+                )
+                for token, offerwall in results
+            ]
+        )
+        return self.encoder.encode(response)
+
+
+def encoder_for(name: ResponseEncoderName) -> ResponseEncoder:
+    if name == "pydantic":
+        return PydanticResponseEncoder()
+    if name == "msgspec":
+        return MsgspecResponseEncoder()
+    raise ValueError(f"Unknown response encoder: {name}")
@@ -1,25 +1,51 @@
 import logging
 import sys
-from typing import Any, Dict
+from typing import Any
 
-from litestar import Litestar, Router, Response
+from litestar import Litestar, Router
 from litestar.config.cors import CORSConfig
 from litestar.exceptions import NotFoundException
 from litestar.openapi import OpenAPIConfig
 from pydantic import ValidationError
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import SQLAlchemyError, TimeoutError as PoolTimeoutError
 
 from litestar.di import Provide
 from app.config import settings
-from app.db import get_db_session, init_db
+from app.db import check_schema_on_startup, engine, get_db_session, pool_status, warm_up_pool
 from app.errors import (
     not_found_handler,
+    overloaded_handler,
+    pool_timeout_handler,
     pydantic_validation_error_handler,
     sqlalchemy_error_handler,
 )
-from app.application.offerwall_service import OfferWallService
+from app.routes.metrics import metrics_endpoint
 from app.routes.offerwalls import OfferWallController
-from app.di.providers import provide_offerwall_repository, provide_offerwall_service
+from app.di.providers import (
+    offerwall_cache,
+    offerwall_flight,
+    provide_offerwall_repository,
+    provide_offerwall_service,
+    response_body_cache,
+    start_offerwall_search,
+    start_offerwall_snapshot,
+    stop_offerwall_search,
+    stop_offerwall_snapshot,
+)
+from app.infrastructure.sqlalchemy.query_budget import install_query_tracker, query_budget_middleware
+from app.infrastructure.sqlalchemy.sql_tracing import SlowQueryLog, install_sql_tracing
+from app.admission import AdmissionController, Overloaded, admission_middleware_factory
+from app.compression import compression_middleware_factory
+from app.tracing import Tracer, exporter_for, request_tracing_middleware_factory
+from app.metrics import (
+    collect_admission,
+    collect_cache,
+    collect_pool,
+    collect_singleflight,
+    install_sql_metrics,
+    metrics,
+    metrics_middleware_factory,
+)
 
 # Configure logging
 def configure_logging() -> None:
@@ -46,6 +72,67 @@ def configure_logging() -> None:
 # Call the logging configuration when the module is imported
 configure_logging()
 
+def configure_metrics() -> None:
+    """Подключить сбор SQL-метрик и показателей кэшей/пула к реестру."""
+    install_sql_metrics(engine)
+
+    @metrics.on_collect
+    def collect_runtime() -> None:
+        collect_cache("offerwall", offerwall_cache.stats, len(offerwall_cache.entries))
+        collect_cache("response_body", response_body_cache.stats, len(response_body_cache.entries))
+        collect_singleflight("offerwall", offerwall_flight.stats)
+        collect_pool(pool_status())
+        collect_admission(admission.limiters)
+
+# Лимитеры по маршрутам: общие для всех запросов воркера
+admission = AdmissionController(
+    limit=settings.admission_max_concurrency,
+    max_queue=settings.admission_max_queue,
+    queue_timeout=settings.admission_queue_timeout_seconds,
+    retry_after=settings.admission_retry_after_seconds,
+    route_limits=settings.admission_route_limits,
+)
+
+if settings.metrics_enabled:
+    configure_metrics()
+
+# Трекер нужен и при выключенном бюджете: на нём держится track_queries() в тестах
+install_query_tracker(engine)
+
+# Трассировка запросов (APP_TRACING_*) и журнал медленных SQL-выражений
+tracer = (
+    Tracer(
+        exporter_for(settings.tracing_exporter, settings.tracing_file_path),
+        sample_rate=settings.tracing_sample_rate,
+    )
+    if settings.tracing_enabled
+    else None
+)
+slow_query_log = SlowQueryLog(threshold_ms=settings.slow_query_threshold_ms)
+install_sql_tracing(engine, slow_query_log)
+
+# Первым: request ID и корневой спан охватывают метрики, admission и все остальные слои
+middleware: list[Any] = [request_tracing_middleware_factory(tracer)]
+if settings.metrics_enabled:
+    middleware.append(metrics_middleware_factory)
+if settings.admission_enabled:
+    # После метрик: отказы 503 попадают в http_requests_total
+    middleware.append(
+        admission_middleware_factory(admission, serve_stale=settings.admission_serve_stale)
+    )
+if settings.query_budget_mode != "off":
+    middleware.append(
+        query_budget_middleware(
+            max_statements=settings.query_budget_max_statements,
+            repeat_threshold=settings.query_budget_repeat_threshold,
+            mode=settings.query_budget_mode,
+        )
+    )
+
+if settings.compression_enabled:
+    # Офферволлы по token/URL приходят уже сжатыми из кэша тел и здесь не пережимаются
+    middleware.append(compression_middleware_factory(min_size=settings.compression_min_size))
+
 cors_config = CORSConfig(allow_origins=settings.allowed_origins)
 
 openapi_config = OpenAPIConfig(
@@ -91,16 +178,30 @@ app = Litestar(
             path="/api",
             route_handlers=[OfferWallController],
             dependencies={"service": Provide(provide_offerwall_service, sync_to_thread=False)},
-        )
+        ),
+        *([metrics_endpoint] if settings.metrics_enabled else []),
     ],
+    middleware=middleware,
     dependencies={
         "db_session": Provide(get_db_session),
         "repo": Provide(provide_offerwall_repository, sync_to_thread=False),
     },
     cors_config=cors_config,
-    on_startup=[init_db],
+    on_startup=[
+        check_schema_on_startup,
+        warm_up_pool,
+        start_offerwall_snapshot,
+        start_offerwall_search,
+    ],
+    on_shutdown=[
+        stop_offerwall_snapshot,
+        stop_offerwall_search,
+        *([tracer.close] if tracer is not None else []),
+    ],
     exception_handlers={
         NotFoundException: not_found_handler,
+        Overloaded: overloaded_handler,
+        PoolTimeoutError: pool_timeout_handler,
         ValidationError: pydantic_validation_error_handler,
         SQLAlchemyError: sqlalchemy_error_handler,
     },
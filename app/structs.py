@@ -0,0 +1,47 @@
+"""msgspec-модели ответов с тем же форматом, что и pydantic-схемы из app.schemas.
+
+Порядок полей совпадает со схемами: тела ответов побайтно одинаковы при любом
+APP_RESPONSE_ENCODER. Документация OpenAPI по-прежнему строится из app.schemas.
+"""
+
+from typing import List, Optional
+
+import msgspec
+
+
+class Offer(msgspec.Struct):
+    uuid: str
+    id: int
+    url: str
+    is_active: bool
+    name: str
+    sum_to: Optional[str] = None
+    term_to: Optional[int] = None
+    percent_rate: Optional[int] = None
+
+
+class OfferWallOffer(msgspec.Struct):
+    offer: Offer
+
+
+class OfferWallPopupOffer(msgspec.Struct):
+    offer: Offer
+
+
+class OfferWall(msgspec.Struct):
+    token: str
+    name: str
+    url: str
+    description: Optional[str] = None
+    offer_assignments: List[OfferWallOffer] = []
+    popup_assignments: List[OfferWallPopupOffer] = []
+
+
+class OfferWallBatchItem(msgspec.Struct):
+    token: str
+    found: bool
+    offerwall: Optional[OfferWall] = None
+
+
+class OfferWallBatchResponse(msgspec.Struct):
+    items: List[OfferWallBatchItem]
@@ -0,0 +1,301 @@
+"""Трассировка запросов: вложенные спаны внутри процесса и идентификатор запроса.
+
+Middleware присваивает каждому HTTP-запросу request ID (из заголовка
+X-Request-ID или новый), возвращает его в ответе и, если трассировка
+включена, открывает корневой спан. `span(name)` открывает дочерний спан
+текущего; вне трассы это no-op ценой одного чтения ContextVar. Законченные
+спаны запроса уходят в экспортёр одним пакетом после ответа.
+
+Экспортёр — любой объект с методом `export(spans)`: в памяти (тесты), файл
+JSON Lines (по строке на спан, запись в фоновом потоке) или свой. `export`
+вызывается на пути ответа и не должен блокироваться.
+"""
+
+import contextvars
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, ContextManager, Deque, Dict, Iterator, List, Literal, Optional, Protocol, Sequence
+
+from litestar.datastructures import MutableScopeHeaders
+from litestar.types import ASGIApp, Message, Receive, Scope, Send
+
+TraceExporterName = Literal["memory", "file"]
+
+REQUEST_ID_HEADER = "x-request-id"
+
+# Чужой request ID принимается, только если он похож на идентификатор
+_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,128}")
+
+_NOOP: ContextManager[None] = nullcontext()
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    request_id: Optional[str]
+    # Время начала (unix, секунды) и длительность
+    start: float
+    duration_ms: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class SpanExporter(Protocol):
+    def export(self, spans: Sequence[Span]) -> None: ...
+
+
+class InMemorySpanExporter:
+    """Последние `max_spans` спанов в памяти процесса."""
+
+    def __init__(self, max_spans: int = 10_000) -> None:
+        self.spans: Deque[Span] = deque(maxlen=max_spans)
+
+    def export(self, spans: Sequence[Span]) -> None:
+        self.spans.extend(spans)
+
+    def finished(self, name: Optional[str] = None, request_id: Optional[str] = None) -> List[Span]:
+        return [
+            span
+            for span in self.spans
+            if (name is None or span.name == name)
+            and (request_id is None or span.request_id == request_id)
+        ]
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+
+class FileSpanExporter:
+    """Дописывает спаны в файл JSON Lines из фонового потока.
+
+    `export` только кладёт пакет в ограниченную очередь: event loop не ждёт
+    диска. Поток забирает всё накопившееся и пишет одним write в режиме
+    O_APPEND — строки трасс разных воркеров не перемешиваются. При полной
+    очереди пакеты отбрасываются (`dropped`), а не копятся в памяти.
+    """
+
+    def __init__(self, path: str, max_pending: int = 1_000) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Sequence[Span]]]" = queue.Queue(maxsize=max_pending)
+        self._writer = threading.Thread(target=self._run, name="span-file-exporter", daemon=True)
+        self._writer.start()
+
+    def export(self, spans: Sequence[Span]) -> None:
+        if not spans:
+            return
+        try:
+            self._queue.put_nowait(spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        """Дописать очередь и остановить поток."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+    def _run(self) -> None:
+        while True:
+            batches = [self._queue.get()]
+            while True:
+                try:
+                    batches.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batches
+            data = "".join(
+                json.dumps(span.to_dict(), default=str) + "\n"
+                for batch in batches
+                if batch is not None
+                for span in batch
+            )
+            if data:
+                self._write(data.encode())
+            if stop:
+                return
+
+    def _write(self, data: bytes) -> None:
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+
+def exporter_for(name: TraceExporterName, path: str) -> SpanExporter:
+    if name == "memory":
+        return InMemorySpanExporter()
+    if name == "file":
+        return FileSpanExporter(path)
+    raise ValueError(f"Unknown trace exporter: {name}")
+
+
+class _Trace:
+    __slots__ = ("trace_id", "request_id", "spans")
+
+    def __init__(self, request_id: Optional[str]) -> None:
+        self.trace_id = uuid.uuid4().hex
+        self.request_id = request_id
+        self.spans: List[Span] = []
+
+
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "request_id", default=None
+)
+_trace: contextvars.ContextVar[Optional[_Trace]] = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def is_tracing() -> bool:
+    return _trace.get() is not None
+
+
+def _new_span(trace: _Trace, name: str, start: float, attributes: Dict[str, Any]) -> Span:
+    parent = _current_span.get()
+    return Span(
+        name=name,
+        trace_id=trace.trace_id,
+        span_id=uuid.uuid4().hex[:16],
+        parent_id=parent.span_id if parent is not None else None,
+        request_id=trace.request_id,
+        start=start,
+        attributes=attributes,
+    )
+
+
+@contextmanager
+def _recording(trace: _Trace, name: str, attributes: Dict[str, Any]) -> Iterator[Span]:
+    span = _new_span(trace, name, time.time(), attributes)
+    token = _current_span.set(span)
+    started = time.perf_counter()
+    try:
+        yield span
+    except BaseException as exc:
+        span.attributes["error"] = type(exc).__name__
+        raise
+    finally:
+        span.duration_ms = (time.perf_counter() - started) * 1000
+        _current_span.reset(token)
+        trace.spans.append(span)
+
+
+def span(name: str, **attributes: Any) -> ContextManager[Optional[Span]]:
+    """Дочерний спан текущего; вне трассы — no-op, блок получает None."""
+    trace = _trace.get()
+    if trace is None:
+        return _NOOP
+    return _recording(trace, name, attributes)
+
+
+def record_span(name: str, start: float, duration_ms: float, **attributes: Any) -> None:
+    """Добавить уже измеренный спан (например, из событий SQLAlchemy) к текущей трассе."""
+    trace = _trace.get()
+    if trace is None:
+        return
+    span = _new_span(trace, name, start, attributes)
+    span.duration_ms = duration_ms
+    trace.spans.append(span)
+
+
+class Tracer:
+    """Открывает трассы запросов и отдаёт их экспортёру; `sample_rate` — доля трассируемых."""
+
+    def __init__(self, exporter: SpanExporter, sample_rate: float = 1.0) -> None:
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+
+    def close(self) -> None:
+        """Остановить экспортёр (хук on_shutdown), если ему есть что дописывать."""
+        close = getattr(self.exporter, "close", None)
+        if close is not None:
+            close()
+
+    @contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            yield None
+            return
+        trace = _Trace(current_request_id())
+        token = _trace.set(trace)
+        try:
+            with _recording(trace, name, attributes) as root:
+                yield root
+        finally:
+            _trace.reset(token)
+            self.exporter.export(trace.spans)
+
+
+@contextmanager
+def request_context(request_id: Optional[str] = None) -> Iterator[str]:
+    """Привязать request ID к контексту (вне HTTP: CLI, фоновые задачи)."""
+    request_id = request_id or uuid.uuid4().hex
+    token = _request_id.set(request_id)
+    try:
+        yield request_id
+    finally:
+        _request_id.reset(token)
+
+
+def _incoming_request_id(scope: Scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == REQUEST_ID_HEADER.encode():
+            candidate = value.decode("latin-1").strip()
+            return candidate if _REQUEST_ID.fullmatch(candidate) else None
+    return None
+
+
+def request_tracing_middleware_factory(tracer: Optional[Tracer]) -> Any:
+    """Фабрика middleware: request ID в контексте и в ответе; корневой спан при `tracer`."""
+
+    def factory(app: ASGIApp) -> ASGIApp:
+        async def middleware(scope: Scope, receive: Receive, send: Send) -> None:
+            if scope["type"] != "http":
+                await app(scope, receive, send)
+                return
+            status = 500
+
+            async def send_wrapper(message: Message) -> None:
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    MutableScopeHeaders(message)[REQUEST_ID_HEADER] = request_id
+                await send(message)
+
+            with request_context(_incoming_request_id(scope)) as request_id:
+                if tracer is None:
+                    await app(scope, receive, send_wrapper)
+                    return
+                route = scope.get("path_template") or scope["path"]
+                with tracer.trace(f"{scope['method']} {route}", route=route) as root:
+                    try:
+                        await app(scope, receive, send_wrapper)
+                    finally:
+                        if root is not None:
+                            root.attributes["status"] = status
+
+        return middleware
+
+    return factory
@@ -0,0 +1,378 @@
+"""Нагрузочный бенчмарк эндпоинтов OfferWallController на засеянной базе.
+
+Генератор (datagen.py) детерминированно заполняет базу на 1k/10k/100k
+офферволлов; база кэшируется в benchmarks/.data и переиспользуется. Каждый
+сценарий гоняется через ASGI-приложение в процессе (по умолчанию) или через
+настоящий процесс Granian (--target granian). Для каждого сценария выводятся
+пропускная способность, p50/p95/p99 и пиковый RSS.
+
+Результат сравнивается с baselines/<target>-<size>.json: запуск завершается
+с кодом 1, если RPS упал или p95 вырос больше чем на --threshold. Базовые
+значения зависят от машины — перезаписывайте их (--save-baseline) на том же
+хосте, где идёт сравнение.
+
+Запуск:
+    python benchmarks/bench_endpoints.py --size 10k --requests 2000 --concurrency 16
+    python benchmarks/bench_endpoints.py --size 1k --save-baseline
+    python benchmarks/bench_endpoints.py --target granian --workers 2 --env APP_CACHE_ENABLED=false
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+BENCH_DIR = Path(__file__).resolve().parent
+BASELINE_DIR = BENCH_DIR / "baselines"
+DATA_DIR = BENCH_DIR / ".data"
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+DEFAULT_ENV = {"APP_LOG_LEVEL": "WARNING", "APP_QUERY_BUDGET_MODE": "off"}
+
+# (method, path, kwargs для httpx) для очередного запроса сценария
+RequestSpec = Tuple[str, str, Dict[str, Any]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    build: Callable[[random.Random], RequestSpec]
+
+
+def build_scenarios(dataset: Any) -> List[Scenario]:
+    from app.application.pagination import encode_cursor
+    from datagen import WORDS
+
+    tokens, urls = dataset.tokens, dataset.urls
+    pages = max(1, len(tokens) // 20)
+    return [
+        Scenario("offer_names", lambda rng: ("GET", "/api/offerwalls/get_offer_names", {})),
+        Scenario("get_by_token", lambda rng: ("GET", f"/api/offerwalls/{rng.choice(tokens)}", {})),
+        Scenario(
+            "get_by_url", lambda rng: ("GET", f"/api/offerwalls/by_url/{rng.choice(urls)}", {})
+        ),
+        Scenario(
+            "list_first_page", lambda rng: ("GET", "/api/offerwalls", {"params": {"page_size": 20}})
+        ),
+        Scenario(
+            "list_sparse",
+            lambda rng: (
+                "GET",
+                "/api/offerwalls",
+                {"params": {"page_size": 20, "fields": "token,name,url", "include": ""}},
+            ),
+        ),
+        Scenario(
+            "list_deep_page",
+            lambda rng: (
+                "GET",
+                "/api/offerwalls",
+                {"params": {"page": rng.randint(1, pages), "page_size": 20}},
+            ),
+        ),
+        Scenario(
+            "list_cursor",
+            lambda rng: (
+                "GET",
+                "/api/offerwalls",
+                {"params": {"cursor": encode_cursor(rng.choice(tokens)), "page_size": 20}},
+            ),
+        ),
+        Scenario(
+            "search_name",
+            lambda rng: (
+                "GET",
+                "/api/offerwalls",
+                {"params": {"name": rng.choice(WORDS), "page_size": 20}},
+            ),
+        ),
+        Scenario(
+            "batch_20",
+            lambda rng: (
+                "POST",
+                "/api/offerwalls/batch",
+                {"json": {"tokens": rng.sample(tokens, 20)}},
+            ),
+        ),
+    ]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Перцентиль по ближайшему рангу."""
+    if not sorted_values:
+        return float("nan")
+    rank = max(1, math.ceil(q * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def _process_tree(pid: int) -> List[int]:
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        for task in Path(f"/proc/{current}/task").glob("*"):
+            try:
+                pending.extend(int(child) for child in (task / "children").read_text().split())
+            except OSError:
+                pass
+    return pids
+
+
+def reset_peak_rss(pid: int) -> None:
+    """Сбросить VmHWM процесса и его потомков (Linux; иначе — ничего)."""
+    for current in _process_tree(pid):
+        try:
+            Path(f"/proc/{current}/clear_refs").write_text("5")
+        except OSError:
+            pass
+
+
+def peak_rss_mib(pid: int) -> Optional[float]:
+    """Сумма VmHWM процесса и его потомков в MiB (None вне Linux)."""
+    total_kib, seen = 0, False
+    for current in _process_tree(pid):
+        try:
+            status = Path(f"/proc/{current}/status").read_text()
+        except OSError:
+            continue
+        for line in status.splitlines():
+            if line.startswith("VmHWM:"):
+                total_kib += int(line.split()[1])
+                seen = True
+    return round(total_kib / 1024, 1) if seen else None
+
+
+async def run_scenario(
+    client: Any,
+    scenario: Scenario,
+    pid: int,
+    requests: int,
+    concurrency: int,
+    warmup: int,
+    seed: int,
+) -> Dict[str, Any]:
+    rng = random.Random(f"{seed}:{scenario.name}")
+    for _ in range(warmup):
+        method, path, kwargs = scenario.build(rng)
+        await client.request(method, path, **kwargs)
+
+    specs = [scenario.build(rng) for _ in range(requests)]
+    latencies: List[float] = []
+    errors = 0
+    reset_peak_rss(pid)
+
+    async def worker(offset: int) -> None:
+        nonlocal errors
+        for method, path, kwargs in specs[offset::concurrency]:
+            started = time.perf_counter()
+            response = await client.request(method, path, **kwargs)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": round(requests / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "peak_rss_mib": peak_rss_mib(pid),
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    regressions = []
+    for name, current in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if base is None:
+            continue
+        if current["rps"] < base["rps"] * (1 - threshold):
+            regressions.append(f"{name}: rps {current['rps']} < baseline {base['rps']}")
+        if current["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 {current['p95_ms']} ms > baseline {base['p95_ms']} ms")
+    return regressions
+
+
+async def prepare_database(db_url: str, walls: int, seed: int) -> Any:
+    from sqlalchemy import func, select
+
+    from app.db import SessionLocal, migrate_db
+    from app.models import OfferWall
+    from datagen import describe_dataset, seed_offerwalls
+
+    await migrate_db()
+    async with SessionLocal() as session:
+        existing = (await session.execute(select(func.count()).select_from(OfferWall))).scalar_one()
+    if existing == walls:
+        return describe_dataset(walls, seed)
+    if existing:
+        raise SystemExit(f"{db_url} holds {existing} offerwalls, expected {walls}; use --fresh")
+    started = time.perf_counter()
+    dataset = await seed_offerwalls(SessionLocal, walls, seed)
+    print(f"seeded {walls} offerwalls in {time.perf_counter() - started:.1f} s", file=sys.stderr)
+    return dataset
+
+
+@asynccontextmanager
+async def asgi_target() -> AsyncIterator[Tuple[Any, int]]:
+    import httpx
+
+    from app.server import app
+
+    async with app.lifespan():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            yield client, os.getpid()
+
+
+@asynccontextmanager
+async def granian_target(workers: int) -> AsyncIterator[Tuple[Any, int]]:
+    import httpx
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    command = [
+        sys.executable, "-m", "granian", "--interface", "asgi", "--host", "127.0.0.1",
+        "--port", str(port), "--workers", str(workers), "app.server:app",
+    ]  # fmt: skip
+    process = subprocess.Popen(command, cwd=ROOT, env=os.environ.copy())
+    try:
+        limits = httpx.Limits(max_connections=256, max_keepalive_connections=256)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+            deadline = time.monotonic() + 30
+            while True:
+                if process.poll() is not None:
+                    raise SystemExit(f"granian exited with code {process.returncode}")
+                try:
+                    await client.get("/api/offerwalls/get_offer_names")
+                    break
+                except httpx.TransportError:
+                    if time.monotonic() > deadline:
+                        raise SystemExit("granian did not start within 30 s")
+                    await asyncio.sleep(0.2)
+            yield client, process.pid
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def parse_size(value: str) -> int:
+    return SIZES.get(value.lower()) or int(value)
+
+
+def size_label(walls: int) -> str:
+    return next((label for label, count in SIZES.items() if count == walls), str(walls))
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--size", type=parse_size, default=SIZES["1k"], help="1k, 10k, 100k or a number"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--target", choices=("asgi", "granian"), default="asgi")
+    parser.add_argument("--workers", type=int, default=1, help="Granian workers")
+    parser.add_argument("--requests", type=int, default=1000, help="measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scenario", action="append", help="run only these scenarios")
+    parser.add_argument("--db-url", help="default: cached SQLite file in benchmarks/.data")
+    parser.add_argument("--fresh", action="store_true", help="reseed the cached SQLite database")
+    parser.add_argument(
+        "--env", action="append", default=[], metavar="KEY=VALUE", help="app settings"
+    )
+    parser.add_argument("--output", type=Path, help="write results JSON here")
+    parser.add_argument("--baseline", type=Path, help="default: baselines/<target>-<size>.json")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    db_url = args.db_url
+    if db_url is None:
+        DATA_DIR.mkdir(exist_ok=True)
+        db_path = DATA_DIR / f"offerwalls-{args.size}-{args.seed}.sqlite"
+        if args.fresh:
+            db_path.unlink(missing_ok=True)
+        db_url = f"sqlite+aiosqlite:///{db_path}"
+    overrides = dict(item.split("=", 1) for item in args.env)
+    os.environ.update({**DEFAULT_ENV, **overrides, "APP_DB_URL": db_url})
+
+    # Лог каждого запроса клиента искажает замеры
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    dataset = await prepare_database(db_url, args.size, args.seed)
+    scenarios = [
+        s for s in build_scenarios(dataset) if not args.scenario or s.name in args.scenario
+    ]
+    target = asgi_target() if args.target == "asgi" else granian_target(args.workers)
+
+    results: Dict[str, Any] = {
+        "target": args.target,
+        "dataset": dataset.describe(),
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "workers": args.workers if args.target == "granian" else None,
+            "env": overrides,
+        },
+        "python": platform.python_version(),
+        "scenarios": {},
+    }
+    print(
+        f"{'scenario':<17}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'peak MiB':>10}{'errors':>8}"
+    )
+    async with target as (client, pid):
+        for scenario in scenarios:
+            r = await run_scenario(
+                client, scenario, pid, args.requests, args.concurrency, args.warmup, args.seed
+            )
+            results["scenarios"][scenario.name] = r
+            print(
+                f"{scenario.name:<17}{r['rps']:>10.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+                f"{r['p99_ms']:>10.2f}{r['peak_rss_mib'] or 0:>10.1f}{r['errors']:>8}"
+            )
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+    baseline_path = args.baseline or BASELINE_DIR / f"{args.target}-{size_label(args.size)}.json"
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"baseline written to {baseline_path}")
+        return 0
+    failed = [name for name, r in results["scenarios"].items() if r["errors"]]
+    if failed:
+        print(f"requests failed in: {', '.join(failed)}")
+        return 1
+    if baseline_path.exists():
+        regressions = compare(results, json.loads(baseline_path.read_text()), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
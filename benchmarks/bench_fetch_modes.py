@@ -0,0 +1,151 @@
+"""Сравнение режимов выборки SqlAlchemyOfferWallRepository: "orm" и "core".
+
+Для каждого режима измеряются число SQL-запросов (round trips), время и
+выделения памяти (tracemalloc) на одну операцию get_by_token и list (страница
+из 20 офферволлов): пик за операцию и объём, удерживаемый возвращёнными
+доменными сущностями (retained).
+
+Запуск:
+    python benchmarks/bench_fetch_modes.py --walls 200 --offers-per-wall 10 --repeat 200
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("APP_DB_URL", "sqlite+aiosqlite:///./bench.sqlite")
+
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.db import Base  # noqa: E402
+from app.infrastructure.sqlalchemy import offerwall_repository  # noqa: E402
+from app.models import Offer, OfferAssignment, OfferChoices  # noqa: E402
+from app.models import OfferWall, PopupAssignment  # noqa: E402
+
+
+async def seed(session_factory, walls: int, offers_per_wall: int, popups_per_wall: int) -> None:
+    names = [name for name, _ in OfferChoices.choices]
+    async with session_factory() as session:
+        offers = [
+            Offer(
+                uuid=f"offer-{i}",
+                id=i,
+                url=f"https://offer/{i}",
+                is_active=True,
+                name=name,
+                sum_to="10000",
+                term_to=30,
+                percent_rate=1,
+            )
+            for i, name in enumerate(names)
+        ]
+        session.add_all(offers)
+        for w in range(walls):
+            token = f"wall-{w:06d}"
+            session.add(
+                OfferWall(
+                    token=token, name=f"Wall {w}", url=f"https://wall/{w}", description="bench"
+                )
+            )
+            for i in range(offers_per_wall):
+                session.add(
+                    OfferAssignment(
+                        offer_wall_token=token,
+                        offer_uuid=offers[(w + i) % len(offers)].uuid,
+                        order=i,
+                    )
+                )
+            for i in range(popups_per_wall):
+                session.add(
+                    PopupAssignment(
+                        offer_wall_token=token,
+                        offer_uuid=offers[(w + i * 3) % len(offers)].uuid,
+                        order=i,
+                    )
+                )
+        await session.commit()
+
+
+async def measure(
+    session_factory, counter: list, mode: str, op: str, walls: int, repeat: int
+) -> dict:
+    async def run_once(i: int) -> object:
+        async with session_factory() as session:
+            repo = offerwall_repository.SqlAlchemyOfferWallRepository(session, fetch_mode=mode)
+            if op == "get_by_token":
+                return await repo.get_by_token(f"wall-{i % walls:06d}")
+            return await repo.list(name=None, url=None, page=1, page_size=20)
+
+    await run_once(0)  # прогрев
+    counter[0] = 0
+    tracemalloc.start()
+    allocated_before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    result = await run_once(1)
+    allocated_after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    peak -= allocated_before
+    retained = allocated_after - allocated_before
+    queries = counter[0]
+
+    started = time.perf_counter()
+    for i in range(repeat):
+        await run_once(i)
+    elapsed = time.perf_counter() - started
+    return {
+        "queries": queries,
+        "peak_kib": peak / 1024,
+        "retained_kib": retained / 1024,
+        "ms_per_op": elapsed * 1000 / repeat,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--walls", type=int, default=200)
+    parser.add_argument("--offers-per-wall", type=int, default=10)
+    parser.add_argument("--popups-per-wall", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/bench.sqlite")
+        counter = [0]
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def _count(*_args) -> None:
+            counter[0] += 1
+
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(engine, expire_on_commit=False)
+        await seed(session_factory, args.walls, args.offers_per_wall, args.popups_per_wall)
+
+        print(
+            f"{'operation':<14}{'mode':<6}{'queries':>9}{'peak KiB':>11}{'retained KiB':>14}{'ms/op':>9}"
+        )
+        for op in ("get_by_token", "list"):
+            for mode in ("orm", "core"):
+                r = await measure(session_factory, counter, mode, op, args.walls, args.repeat)
+                print(
+                    f"{op:<14}{mode:<6}{r['queries']:>9}{r['peak_kib']:>11.1f}"
+                    f"{r['retained_kib']:>14.1f}{r['ms_per_op']:>9.3f}"
+                )
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+"""Планы и время горячих запросов до и после миграции с индексами.
+
+База SQLite во временном каталоге засевается генератором datagen.py по схеме head
+и откатывается до 0001_initial_schema; для каждого запроса выводятся EXPLAIN
+QUERY PLAN и время. Затем база обновляется до head и замер повторяется.
+
+Запросы:
+    assignments — назначения (оба вида) для страницы из 20 офферволлов
+    by_url      — офферволл по URL (до: сравнение url, после: проба url_hash)
+    list_page   — страница списка по token (keyset)
+
+Запуск:
+    python benchmarks/bench_query_plans.py --walls 20000 --repeat 200
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("APP_DB_URL", "sqlite+aiosqlite:///./bench.sqlite")
+
+from sqlalchemy import select  # noqa: E402
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine  # noqa: E402
+
+from app.db import alembic_config, current_revision, migrate_db  # noqa: E402
+from app.domain.urls import url_hash  # noqa: E402
+from app.infrastructure.sqlalchemy.offerwall_repository import (  # noqa: E402
+    _WALL_COLUMNS,
+    SqlAlchemyOfferWallRepository,
+)
+from app.models import OfferWall  # noqa: E402
+from datagen import seed_offerwalls  # noqa: E402
+
+PAGE_SIZE = 20
+
+
+def statements(dataset: Any, hashed: bool) -> Dict[str, Any]:
+    middle = len(dataset.tokens) // 2
+    url = dataset.urls[middle]
+    return {
+        "assignments": SqlAlchemyOfferWallRepository._assignments_query(
+            dataset.tokens[middle : middle + PAGE_SIZE]
+        ),
+        "by_url": select(*_WALL_COLUMNS).where(
+            OfferWall.url_hash == url_hash(url) if hashed else OfferWall.url == url
+        ),
+        "list_page": select(*_WALL_COLUMNS)
+        .where(OfferWall.token > dataset.tokens[middle])
+        .order_by(OfferWall.token)
+        .limit(PAGE_SIZE),
+    }
+
+
+async def measure(engine: Any, stmt: Any, repeat: int) -> Dict[str, Any]:
+    async with engine.connect() as conn:
+        compiled = stmt.compile(engine.sync_engine, compile_kwargs={"literal_binds": True})
+        plan = await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")
+        details: List[str] = [row[-1] for row in plan]
+        await conn.execute(stmt)  # прогрев
+        started = time.perf_counter()
+        for _ in range(repeat):
+            (await conn.execute(stmt)).all()
+        elapsed = time.perf_counter() - started
+    return {"plan": details, "ms_per_query": elapsed * 1000 / repeat}
+
+
+async def downgrade(engine: Any, revision: str) -> None:
+    from alembic import command
+
+    config = alembic_config()
+
+    def run(sync_conn: Any) -> None:
+        config.attributes["connection"] = sync_conn
+        command.downgrade(config, revision)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(run)
+
+
+async def report(engine: Any, dataset: Any, repeat: int, hashed: bool) -> Dict[str, float]:
+    print(f"\n== revision {await current_revision(engine)}")
+    timings = {}
+    for name, stmt in statements(dataset, hashed).items():
+        result = await measure(engine, stmt, repeat)
+        timings[name] = result["ms_per_query"]
+        print(f"{name}: {result['ms_per_query']:.3f} ms/query")
+        for line in result["plan"]:
+            print(f"    {line}")
+    return timings
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--walls", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp}/plans.sqlite")
+        await migrate_db(bind=engine)
+        dataset = await seed_offerwalls(
+            async_sessionmaker(engine, expire_on_commit=False), args.walls, args.seed
+        )
+        await downgrade(engine, "0001_initial_schema")
+        before = await report(engine, dataset, args.repeat, hashed=False)
+        await migrate_db(bind=engine)
+        after = await report(engine, dataset, args.repeat, hashed=True)
+        await engine.dispose()
+
+    print(f"\n{'query':<14}{'before ms':>11}{'after ms':>10}{'speedup':>9}")
+    for name in before:
+        print(
+            f"{name:<14}{before[name]:>11.3f}{after[name]:>10.3f}{before[name] / after[name]:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""Стоимость кодирования офферволлов: pydantic-схемы против msgspec.Struct.
+
+Офферволлы строятся в памяти генератором datagen.py (без БД) и кодируются
+обоими кодировщиками app.serialization; перед замером проверяется, что тела
+побайтно совпадают. Для каждой операции выводится время на один офферволл.
+
+Запуск:
+    python benchmarks/bench_serialization.py --walls 1000 --repeat 20
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("APP_DB_URL", "sqlite+aiosqlite:///./bench.sqlite")
+
+from datagen import generate_walls, offer_rows  # noqa: E402
+from app.domain.entities import Offer, OfferWall, OfferWallOffer, OfferWallPopupOffer  # noqa: E402
+from app.serialization import encoder_for  # noqa: E402
+
+PAGE_SIZE = 20
+
+
+def build_walls(walls: int, seed: int) -> List[OfferWall]:
+    offers = {row["uuid"]: Offer(**row) for row in offer_rows()}
+    return [
+        OfferWall(
+            **wall,
+            offer_assignments=tuple(OfferWallOffer(offers[a["offer_uuid"]]) for a in assignments),
+            popup_assignments=tuple(OfferWallPopupOffer(offers[p["offer_uuid"]]) for p in popups),
+        )
+        for wall, assignments, popups in generate_walls(walls, seed)
+    ]
+
+
+def per_wall_us(run: Callable[[], object], walls: int, repeat: int) -> float:
+    run()  # прогрев
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best * 1e6 / walls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--walls", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    walls = build_walls(args.walls, args.seed)
+    pages = [walls[i : i + PAGE_SIZE] for i in range(0, len(walls), PAGE_SIZE)]
+    encoders = {name: encoder_for(name) for name in ("pydantic", "msgspec")}
+    for wall in walls[:50]:
+        if encoders["pydantic"].offerwall(wall) != encoders["msgspec"].offerwall(wall):
+            raise SystemExit(f"bodies differ for {wall.token}")
+
+    operations = {
+        "offerwall": lambda enc: lambda: [enc.offerwall(w) for w in walls],
+        f"list/{PAGE_SIZE}": lambda enc: lambda: [enc.offerwalls(page) for page in pages],
+        "batch": lambda enc: lambda: [enc.batch([(w.token, w) for w in page]) for page in pages],
+    }
+    print(f"{len(walls)} walls, best of {args.repeat}")
+    print(f"{'operation':<12}{'pydantic us/wall':>18}{'msgspec us/wall':>17}{'speedup':>9}")
+    for op, make in operations.items():
+        slow = per_wall_us(make(encoders["pydantic"]), len(walls), args.repeat)
+        fast = per_wall_us(make(encoders["msgspec"]), len(walls), args.repeat)
+        print(f"{op:<12}{slow:>18.2f}{fast:>17.2f}{slow / fast:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
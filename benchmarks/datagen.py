@@ -0,0 +1,125 @@
+"""Детерминированный генератор данных для бенчмарков.
+
+Одинаковые `walls` и `seed` дают одинаковую базу: имена, URL и назначения
+выбираются из `random.Random(seed)`. Числа назначений близки к боевым: 5–20
+офферов и 0–4 попапа на офферволл из общего справочника офферов.
+"""
+
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import Offer, OfferAssignment, OfferChoices, OfferWall, PopupAssignment
+
+WORDS = (
+    "summer", "winter", "credit", "loan", "fast", "online", "cash", "bonus", "promo", "zero",
+    "percent", "first", "plus", "mobile", "instant", "smart", "easy", "card", "best", "night",
+)  # fmt: skip
+OFFERS_PER_WALL = (5, 20)
+POPUPS_PER_WALL = (0, 4)
+CHUNK_SIZE = 10_000
+
+Row = Dict[str, Any]
+
+
+@dataclass
+class Dataset:
+    """Что было засеяно — выборки для построения запросов бенчмарка."""
+
+    walls: int
+    seed: int
+    tokens: List[str] = field(default_factory=list)
+    urls: List[str] = field(default_factory=list)
+    assignments: int = 0
+    popups: int = 0
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "walls": self.walls,
+            "seed": self.seed,
+            "assignments": self.assignments,
+            "popups": self.popups,
+        }
+
+
+def offer_rows() -> List[Row]:
+    return [
+        {
+            "uuid": f"offer-{i:04d}",
+            "id": i + 1,
+            "url": f"https://offers.example/{name.lower()}",
+            "is_active": True,
+            "name": name,
+            "sum_to": str(5_000 * (1 + i % 6)),
+            "term_to": 7 * (1 + i % 5),
+            "percent_rate": i % 3,
+        }
+        for i, (name, _) in enumerate(OfferChoices.choices)
+    ]
+
+
+def generate_walls(walls: int, seed: int) -> Iterator[Tuple[Row, List[Row], List[Row]]]:
+    """Строки офферволла, его назначений и попапов — по одному офферволлу."""
+    rng = random.Random(seed)
+    offer_uuids = [row["uuid"] for row in offer_rows()]
+    for n in range(walls):
+        token = f"wall-{n:07d}"
+        name = " ".join(rng.sample(WORDS, 2)).title()
+        # URL без "/": маршрут /by_url/{url} принимает один сегмент пути
+        url = f"{name.replace(' ', '-').lower()}-{n}.walls.example"
+        offers = rng.sample(offer_uuids, rng.randint(*OFFERS_PER_WALL))
+        popups = rng.sample(offer_uuids, rng.randint(*POPUPS_PER_WALL))
+        yield (
+            {"token": token, "name": name, "url": url, "description": f"Wall {n}"},
+            [
+                {"offer_wall_token": token, "offer_uuid": u, "order": i}
+                for i, u in enumerate(offers)
+            ],
+            [
+                {"offer_wall_token": token, "offer_uuid": u, "order": i}
+                for i, u in enumerate(popups)
+            ],
+        )
+
+
+def describe_dataset(walls: int, seed: int = 42) -> Dataset:
+    """Токены и URL базы, засеянной с теми же параметрами, без обращения к БД."""
+    dataset = Dataset(walls=walls, seed=seed)
+    for wall, assignments, popups in generate_walls(walls, seed):
+        dataset.tokens.append(wall["token"])
+        dataset.urls.append(wall["url"])
+        dataset.assignments += len(assignments)
+        dataset.popups += len(popups)
+    return dataset
+
+
+async def seed_offerwalls(
+    session_factory: async_sessionmaker[AsyncSession], walls: int, seed: int = 42
+) -> Dataset:
+    dataset = Dataset(walls=walls, seed=seed)
+    batches: Dict[Any, List[Row]] = {OfferWall: [], OfferAssignment: [], PopupAssignment: []}
+
+    async def flush(session: AsyncSession) -> None:
+        for model, rows in batches.items():
+            if rows:
+                await session.execute(insert(model), rows)
+            rows.clear()
+
+    async with session_factory() as session:
+        await session.execute(insert(Offer), offer_rows())
+        for wall, assignments, popups in generate_walls(walls, seed):
+            dataset.tokens.append(wall["token"])
+            dataset.urls.append(wall["url"])
+            dataset.assignments += len(assignments)
+            dataset.popups += len(popups)
+            batches[OfferWall].append(wall)
+            batches[OfferAssignment].extend(assignments)
+            batches[PopupAssignment].extend(popups)
+            if len(batches[OfferAssignment]) >= CHUNK_SIZE:
+                await flush(session)
+        await flush(session)
+        await session.commit()
+    return dataset
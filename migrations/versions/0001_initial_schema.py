@@ -0,0 +1,106 @@
+"""Исходная схема: справочник офферов, офферволлы, назначения и DDL поиска.
+
+Повторяет то, что раньше создавали create_all и install_search_schema, поэтому
+таблицы создаются с IF NOT EXISTS: базы, созданные до появления миграций,
+принимаются как есть и получают номер ревизии.
+
+Revision ID: 0001_initial_schema
+Revises:
+Create Date: 2026-10-18
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0001_initial_schema"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_SEARCH_VERSION_TABLE = "offerwalls_search_version"
+
+_POSTGRESQL_SEARCH_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_offerwalls_name_trgm ON offerwalls USING gin (name gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_offerwalls_url_trgm ON offerwalls USING gin (url gin_trgm_ops)",
+]
+
+# Счётчик изменений offerwalls для индекса триграмм в памяти (TrigramIndexSearch)
+_SQLITE_SEARCH_DDL = [
+    f"CREATE TABLE IF NOT EXISTS {_SEARCH_VERSION_TABLE} "
+    "(id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)",
+    f"INSERT OR IGNORE INTO {_SEARCH_VERSION_TABLE} (id, version) VALUES (1, 0)",
+] + [
+    f"CREATE TRIGGER IF NOT EXISTS offerwalls_search_{suffix} AFTER {event} ON offerwalls "
+    f"BEGIN UPDATE {_SEARCH_VERSION_TABLE} SET version = version + 1 WHERE id = 1; END"
+    for suffix, event in (("ai", "INSERT"), ("au", "UPDATE OF name, url"), ("ad", "DELETE"))
+]
+
+
+def _assignment_table(name: str) -> None:
+    op.create_table(
+        name,
+        sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column(
+            "offer_wall_token",
+            sa.String(36),
+            sa.ForeignKey("offerwalls.token", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column(
+            "offer_uuid",
+            sa.String(36),
+            sa.ForeignKey("offers.uuid", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("order", sa.Integer(), nullable=False),
+        if_not_exists=True,
+    )
+
+
+def upgrade() -> None:
+    op.create_table(
+        "offers",
+        sa.Column("uuid", sa.String(36), primary_key=True),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("url", sa.String(500), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=False),
+        sa.Column("name", sa.String(255), nullable=False, unique=True),
+        sa.Column("sum_to", sa.String(255), nullable=True),
+        sa.Column("term_to", sa.Integer(), nullable=True),
+        sa.Column("percent_rate", sa.Integer(), nullable=True),
+        if_not_exists=True,
+    )
+    op.create_table(
+        "offerwalls",
+        sa.Column("token", sa.String(36), primary_key=True),
+        sa.Column("name", sa.String(255), nullable=False),
+        sa.Column("url", sa.String(500), nullable=False),
+        sa.Column("description", sa.String(2000), nullable=True),
+        if_not_exists=True,
+    )
+    _assignment_table("offer_wall_offers")
+    _assignment_table("offer_wall_popup_offers")
+
+    dialect = op.get_bind().dialect.name
+    for statement in {"postgresql": _POSTGRESQL_SEARCH_DDL, "sqlite": _SQLITE_SEARCH_DDL}.get(
+        dialect, []
+    ):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        for suffix in ("ai", "au", "ad"):
+            op.execute(f"DROP TRIGGER IF EXISTS offerwalls_search_{suffix}")
+        op.execute(f"DROP TABLE IF EXISTS {_SEARCH_VERSION_TABLE}")
+    elif dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_offerwalls_url_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_offerwalls_name_trgm")
+    op.drop_table("offer_wall_popup_offers")
+    op.drop_table("offer_wall_offers")
+    op.drop_table("offerwalls")
+    op.drop_table("offers")
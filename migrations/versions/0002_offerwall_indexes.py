@@ -0,0 +1,39 @@
+"""Индексы для выборок назначений и поиска по URL.
+
+- (offer_wall_token, order, id, offer_uuid) на обеих таблицах назначений:
+  `WHERE offer_wall_token IN (...) ORDER BY order, id` читается из индекса по
+  диапазону, а offer_uuid для соединения с offers берётся оттуда же.
+- offer_uuid на таблицах назначений: каскадное удаление оффера без полного просмотра.
+- offerwalls.url: поиск офферволла по URL.
+
+Revision ID: 0002_offerwall_indexes
+Revises: 0001_initial_schema
+Create Date: 2026-10-18
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0002_offerwall_indexes"
+down_revision: Union[str, None] = "0001_initial_schema"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_ASSIGNMENT_TABLES = ("offer_wall_offers", "offer_wall_popup_offers")
+
+
+def upgrade() -> None:
+    for table in _ASSIGNMENT_TABLES:
+        op.create_index(
+            f"ix_{table}_wall_order", table, ["offer_wall_token", "order", "id", "offer_uuid"]
+        )
+        op.create_index(f"ix_{table}_offer_uuid", table, ["offer_uuid"])
+    op.create_index("ix_offerwalls_url", "offerwalls", ["url"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_offerwalls_url", table_name="offerwalls")
+    for table in _ASSIGNMENT_TABLES:
+        op.drop_index(f"ix_{table}_offer_uuid", table_name=table)
+        op.drop_index(f"ix_{table}_wall_order", table_name=table)
@@ -0,0 +1,147 @@
+"""offerwalls.url_hash: хэш нормализованного URL под уникальным индексом.
+
+Поиск по URL — проба индекса фиксированной ширины вместо сравнения String(500);
+ix_offerwalls_url больше не нужен. Существующие строки заполняются по правилам
+нормализации на момент этой ревизии: функции скопированы сюда, чтобы будущие
+правки app.domain.urls не меняли то, что вычисляет историческая миграция.
+
+Уникальный индекс — новое ограничение: два варианта записи одного адреса
+(`https://A.example/` и `https://a.example`) теперь считаются одним URL. Такие
+офферволлы миграция не объединяет сама, а останавливается до создания индекса
+со списком конфликтов; их нужно разрешить вручную и повторить миграцию.
+
+На SQLite batch-режим (пересоздание таблицы) не используется: он потерял бы
+триггеры поиска из 0001_initial_schema. Поэтому столбец добавляется сразу
+NOT NULL с временным DEFAULT '', который на SQLite остаётся (значение всегда
+передаёт приложение).
+
+Revision ID: 0003_offerwall_url_hash
+Revises: 0002_offerwall_indexes
+Create Date: 2026-10-18
+"""
+
+from typing import Dict, List, Sequence, Tuple, Union
+
+import hashlib
+import re
+from collections import defaultdict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0003_offerwall_url_hash"
+down_revision: Union[str, None] = "0002_offerwall_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_BACKFILL_BATCH = 5_000
+# Сколько конфликтующих групп показать в сообщении об ошибке
+_REPORTED_CONFLICTS = 20
+
+# Копия app.domain.urls на момент ревизии (не импортировать код приложения)
+URL_HASH_LENGTH = 32
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+_PERCENT_ESCAPE = re.compile(r"%[0-9A-Fa-f]{2}")
+_UNRESERVED = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~")
+
+
+def _normalize_escape(match: "re.Match[str]") -> str:
+    char = chr(int(match.group(0)[1:], 16))
+    return char if char in _UNRESERVED else match.group(0).upper()
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    if not parts.scheme and not parts.netloc:
+        parts = urlsplit(f"//{url.strip()}")
+    scheme = parts.scheme.lower()
+    netloc = (parts.hostname or "").rstrip(".")
+    if ":" in netloc:
+        netloc = f"[{netloc}]"
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port is not None and port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+    if parts.username is not None:
+        userinfo = (
+            parts.username if parts.password is None else f"{parts.username}:{parts.password}"
+        )
+        netloc = f"{userinfo}@{netloc}"
+    path = _PERCENT_ESCAPE.sub(_normalize_escape, parts.path).rstrip("/")
+    params = parse_qsl(parts.query, keep_blank_values=True)
+    query = urlencode(sorted(params, key=lambda item: item[0]))
+    key = urlunsplit((scheme, netloc, path, query, ""))
+    return key[2:] if not scheme else key
+
+
+def url_hash(url: str) -> str:
+    return hashlib.blake2b(
+        normalize_url(url).encode(), digest_size=URL_HASH_LENGTH // 2
+    ).hexdigest()
+
+
+def _check_unique_hashes(rows: Sequence[Tuple[str, str]]) -> None:
+    """Остановить миграцию со списком офферволлов, чьи URL совпали после нормализации."""
+    groups: Dict[str, List[Tuple[str, str]]] = defaultdict(list)
+    for token, url in rows:
+        groups[url_hash(url)].append((token, url))
+    conflicts = [group for group in groups.values() if len(group) > 1]
+    if not conflicts:
+        return
+    lines = [
+        "  " + ", ".join(f"{token} ({url})" for token, url in sorted(group))
+        for group in conflicts[:_REPORTED_CONFLICTS]
+    ]
+    if len(conflicts) > _REPORTED_CONFLICTS:
+        lines.append(f"  ... and {len(conflicts) - _REPORTED_CONFLICTS} more")
+    raise RuntimeError(
+        f"{len(conflicts)} group(s) of offerwalls have URLs that normalize to the same address; "
+        "offerwalls.url_hash must be unique. Change or delete all but one offerwall "
+        "in each group, then rerun the migration:\n" + "\n".join(lines)
+    )
+
+
+def upgrade() -> None:
+    offerwalls = sa.table(
+        "offerwalls",
+        sa.column("token", sa.String),
+        sa.column("url", sa.String),
+        sa.column("url_hash", sa.String),
+    )
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(offerwalls.c.token, offerwalls.c.url)).all()
+    # До DDL: на SQLite он не транзакционный, упавшая позже миграция оставила бы столбец
+    _check_unique_hashes(rows)
+
+    op.add_column(
+        "offerwalls",
+        sa.Column("url_hash", sa.String(URL_HASH_LENGTH), nullable=False, server_default=""),
+    )
+    update = (
+        offerwalls.update()
+        .where(offerwalls.c.token == sa.bindparam("b_token"))
+        .values(url_hash=sa.bindparam("b_url_hash"))
+    )
+    for start in range(0, len(rows), _BACKFILL_BATCH):
+        bind.execute(
+            update,
+            [
+                {"b_token": token, "b_url_hash": url_hash(url)}
+                for token, url in rows[start : start + _BACKFILL_BATCH]
+            ],
+        )
+
+    if bind.dialect.name != "sqlite":
+        op.alter_column("offerwalls", "url_hash", server_default=None)
+    op.drop_index("ix_offerwalls_url", table_name="offerwalls")
+    op.create_index("ix_offerwalls_url_hash", "offerwalls", ["url_hash"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_offerwalls_url_hash", table_name="offerwalls")
+    op.create_index("ix_offerwalls_url", "offerwalls", ["url"])
+    op.drop_column("offerwalls", "url_hash")
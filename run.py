@@ -23,6 +23,7 @@ os.environ["APP_ALLOWED_ORIGINS"] = '["*"]'
 os.environ["APP_GRANIAN_WORKERS"] = "1"
 os.environ["APP_DB_URL"] = "sqlite+aiosqlite:///./test.sqlite"
 os.environ["APP_ECHO_SQL"] = "True"
+os.environ["APP_DB_AUTO_MIGRATE"] = "true"
 
 logger.info("Starting the application...")
 
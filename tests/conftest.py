@@ -13,8 +13,14 @@ os.environ.setdefault("APP_SERVER_PORT", "8000")
 os.environ.setdefault("APP_ALLOWED_ORIGINS", '["*"]')
 os.environ.setdefault("APP_DB_URL", "sqlite+aiosqlite:///./test.sqlite")
 os.environ.setdefault("APP_GRANIAN_WORKERS", "1")
+# Лишние SQL-выражения в обработчиках роняют тесты, а не только пишутся в лог
+os.environ.setdefault("APP_QUERY_BUDGET_MODE", "raise")
+# Спаны запросов остаются в памяти: тесты проверяют трассы через app.server.tracer
+os.environ.setdefault("APP_TRACING_ENABLED", "true")
+os.environ.setdefault("APP_TRACING_EXPORTER", "memory")
 
 import sys
+from contextlib import contextmanager
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parent.parent
@@ -22,13 +28,14 @@ if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
 from app.server import app as litestar_app  # noqa: E402
-from app.db import init_db, SessionLocal  # noqa: E402
+from app.db import migrate_db  # noqa: E402
+from app.infrastructure.sqlalchemy.query_budget import track_queries  # noqa: E402
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_db():
-    # initialize tables once for sqlite
+    # схема создаётся миграциями один раз на сессию
     import asyncio
-    asyncio.run(init_db())
+    asyncio.run(migrate_db())
 
 @pytest.fixture
 def app() -> Litestar:
@@ -39,4 +46,15 @@ def app() -> Litestar:
 async def client(app: Litestar):
     transport = ASGITransport(app=app)
     async with AsyncClient(transport=transport, base_url="http://test") as ac:
-        yield ac
\ No newline at end of file
+        yield ac
+
+# Точное число SQL-выражений внутри блока: with assert_num_queries(2): ...
+@pytest.fixture
+def assert_num_queries():
+    @contextmanager
+    def _assert_num_queries(expected: int):
+        with track_queries() as tracker:
+            yield tracker
+        assert tracker.count == expected, tracker.report()
+
+    return _assert_num_queries
@@ -1,13 +1,17 @@
 import pytest
 import pytest_asyncio
 from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
 from app.db import SessionLocal, engine
-from app.models import OfferWall, Offer, OfferAssignment, PopupAssignment, OfferChoices, Base
+from app.di.providers import offerwall_cache
+from app.domain.urls import url_hash
+from app.models import OfferWall, Offer, OfferAssignment, PopupAssignment, OfferChoices
 
 @pytest_asyncio.fixture(autouse=True)
 async def cleanup_db():
-    """Очистка БД перед и после каждого теста"""
+    """Очистка БД и кэша перед и после каждого теста"""
     # Очистка перед тестом
+    offerwall_cache.clear()
     async with SessionLocal() as session:
         await session.execute(delete(OfferAssignment))
         await session.execute(delete(PopupAssignment))
@@ -16,6 +20,7 @@ async def cleanup_db():
         await session.commit()
     yield
     # Очистка после теста
+    offerwall_cache.clear()
     async with SessionLocal() as session:
         await session.execute(delete(OfferAssignment))
         await session.execute(delete(PopupAssignment))
@@ -31,6 +36,12 @@ async def test_get_offer_names(client):
     # Используем первый элемент кортежа (как в оригинальном DRF)
     expected = [offer_name[0] for offer_name in OfferChoices.choices]
     assert data == {"offer_names": expected}
+    assert resp.headers["cache-control"] == "public, max-age=86400"
+
+    resp = await client.get(
+        "/api/offerwalls/get_offer_names", headers={"If-None-Match": resp.headers["etag"]}
+    )
+    assert resp.status_code == 304
 
 @pytest.mark.asyncio
 async def test_get_offerwall_not_found(client):
@@ -80,4 +91,690 @@ async def test_get_offerwall_ok(client):
 
     offer_data = data["offer_assignments"][0]["offer"]
     assert offer_data["uuid"] == unique_offer_uuid
-    assert offer_data["name"] == unique_offer_name
\ No newline at end of file
+    assert offer_data["name"] == unique_offer_name
+
+@pytest.mark.asyncio
+async def test_core_and_orm_fetch_modes_match():
+    from app.domain.entities import OfferWallProjection
+    from app.infrastructure.sqlalchemy.offerwall_repository import SqlAlchemyOfferWallRepository
+
+    async with SessionLocal() as session:
+        ow = OfferWall(token="t-modes", name="Wall", url="https://modes", description=None)
+        offers = [
+            Offer(uuid=f"u-modes-{i}", id=i, url=f"https://offer/{i}", is_active=True, name=f"ModesOffer{i}")
+            for i in range(3)
+        ]
+        session.add_all([ow, *offers])
+        await session.flush()
+        session.add_all(
+            [
+                OfferAssignment(offer_wall_token=ow.token, offer_uuid=offers[2].uuid, order=1),
+                OfferAssignment(offer_wall_token=ow.token, offer_uuid=offers[0].uuid, order=2),
+                PopupAssignment(offer_wall_token=ow.token, offer_uuid=offers[1].uuid, order=1),
+            ]
+        )
+        await session.commit()
+
+    async with SessionLocal() as session:
+        orm = await SqlAlchemyOfferWallRepository(session, fetch_mode="orm").get_by_token("t-modes")
+    async with SessionLocal() as session:
+        core = await SqlAlchemyOfferWallRepository(session, fetch_mode="core").get_by_token("t-modes")
+
+    assert core == orm
+    assert [a.offer.uuid for a in core.offer_assignments] == ["u-modes-2", "u-modes-0"]
+    assert [p.offer.uuid for p in core.popup_assignments] == ["u-modes-1"]
+
+    projection = OfferWallProjection(fields=("token", "name"), include=("popup_assignments",))
+    results = {}
+    for mode in ("orm", "core"):
+        async with SessionLocal() as session:
+            repo = SqlAlchemyOfferWallRepository(session, fetch_mode=mode)
+            results[mode] = await repo.list(None, None, page=1, page_size=10, projection=projection)
+    assert results["core"] == results["orm"]
+    (wall,) = results["core"]
+    assert (wall.name, wall.url, wall.offer_assignments) == ("Wall", None, ())
+    assert [p.offer.uuid for p in wall.popup_assignments] == ["u-modes-1"]
+
+
+@pytest.mark.asyncio
+async def test_list_offerwalls_cursor_pagination(client):
+    async with SessionLocal() as session:
+        session.add_all(
+            [OfferWall(token=f"t-page-{i}", name=f"Wall {i}", url=f"https://wall/{i}") for i in range(5)]
+        )
+        await session.commit()
+
+    tokens, cursor = [], None
+    for _ in range(3):
+        params = {"page_size": 2, **({"cursor": cursor} if cursor else {})}
+        resp = await client.get("/api/offerwalls", params=params)
+        assert resp.status_code == 200
+        tokens += [item["token"] for item in resp.json()]
+        cursor = resp.headers.get("x-next-cursor")
+    assert tokens == [f"t-page-{i}" for i in range(5)]
+    assert cursor is None
+
+    # Номер страницы по-прежнему работает и даёт тот же порядок
+    resp = await client.get("/api/offerwalls", params={"page": 2, "page_size": 2})
+    assert [item["token"] for item in resp.json()] == ["t-page-2", "t-page-3"]
+
+
+@pytest.mark.asyncio
+async def test_list_offerwalls_rejects_bad_paging(client):
+    resp = await client.get("/api/offerwalls", params={"cursor": "not-a-cursor"})
+    assert resp.status_code == 400
+
+    resp = await client.get("/api/offerwalls", params={"page_size": 10_000})
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_list_offerwalls_search_matches_ilike(client):
+    from app.infrastructure.search.offerwall_search import sqlite_trigram_search
+
+    async with SessionLocal() as session:
+        session.add_all(
+            [
+                OfferWall(token="t-s-1", name="Summer Loans", url="https://loans.example/summer"),
+                OfferWall(token="t-s-2", name="Winter Deals", url="https://deals.example/winter"),
+                OfferWall(token="t-s-3", name="summer_sale", url="https://sale.example"),
+            ]
+        )
+        await session.commit()
+
+    # Фоновое обновление не мешает тесту: индекс обновляется явным refresh()
+    await sqlite_trigram_search.start(SessionLocal, refresh_interval=3600)
+    try:
+        for params in ({"name": "SUMMER"}, {"url": "example/"}, {"name": "er_s"}, {"name": "su"}, {"name": "none"}):
+            field, term = next(iter(params.items()))
+            async with SessionLocal() as session:
+                column = getattr(OfferWall, field)
+                stmt = select(OfferWall.token).where(column.ilike(f"%{term}%")).order_by(OfferWall.token)
+                expected = list((await session.execute(stmt)).scalars())
+            resp = await client.get("/api/offerwalls", params=params)
+            assert [item["token"] for item in resp.json()] == expected, params
+
+        rebuilds = sqlite_trigram_search.rebuilds
+        async with SessionLocal() as session:
+            session.add(OfferWall(token="t-s-4", name="Late Summer", url="https://late.example"))
+            (await session.get(OfferWall, "t-s-1")).name = "Autumn Loans"
+            await session.commit()
+        # До обновления индекса переименованный офферволл отсекает ILIKE в запросе
+        resp = await client.get("/api/offerwalls", params={"name": "summer"})
+        assert [item["token"] for item in resp.json()] == ["t-s-3"]
+
+        assert await sqlite_trigram_search.refresh()
+        assert not await sqlite_trigram_search.refresh()
+        resp = await client.get("/api/offerwalls", params={"name": "summer"})
+        assert [item["token"] for item in resp.json()] == ["t-s-3", "t-s-4"]
+        assert sqlite_trigram_search.rebuilds == rebuilds + 1
+    finally:
+        await sqlite_trigram_search.stop()
+    assert sqlite_trigram_search.index is None
+
+
+@pytest.mark.asyncio
+async def test_batch_returns_walls_in_request_order(client):
+    async with SessionLocal() as session:
+        session.add_all(
+            [OfferWall(token=f"t-batch-{i}", name=f"Wall {i}", url=f"https://batch/{i}") for i in range(3)]
+        )
+        await session.commit()
+
+    tokens = ["t-batch-2", "missing", "t-batch-0", "t-batch-2"]
+    resp = await client.post("/api/offerwalls/batch", json={"tokens": tokens})
+    assert resp.status_code == 200
+    items = resp.json()["items"]
+    assert [item["token"] for item in items] == tokens
+    assert [item["found"] for item in items] == [True, False, True, True]
+    assert items[1]["offerwall"] is None
+    assert items[2]["offerwall"]["url"] == "https://batch/0"
+
+
+@pytest.mark.asyncio
+async def test_batch_rejects_empty_and_oversized_requests(client):
+    resp = await client.post("/api/offerwalls/batch", json={"tokens": []})
+    assert resp.status_code == 400
+
+    resp = await client.post("/api/offerwalls/batch", json={"tokens": ["t"] * 1000})
+    assert resp.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_get_offerwall_etag_and_not_modified(client):
+    async with SessionLocal() as session:
+        session.add(OfferWall(token="t-etag", name="Wall", url="https://etag", description="desc"))
+        await session.commit()
+
+    resp = await client.get("/api/offerwalls/t-etag")
+    assert resp.status_code == 200
+    etag = resp.headers["etag"]
+    assert etag.startswith('"') and resp.headers["cache-control"]
+    assert resp.json()["description"] == "desc"
+
+    resp = await client.get("/api/offerwalls/t-etag", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["etag"] == etag
+
+    resp = await client.get("/api/offerwalls/t-etag", headers={"If-None-Match": '"other"'})
+    assert resp.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_snapshot_store_reloads_on_change():
+    from app.infrastructure.snapshot.offerwall_repository import SnapshotStore
+
+    store = SnapshotStore(SessionLocal, refresh_interval=60, max_age=60)
+    async with SessionLocal() as session:
+        session.add(OfferWall(token="t-snap-1", name="Wall", url="https://snap/1"))
+        await session.commit()
+
+    await store.load()
+    assert list(store.current().by_token) == ["t-snap-1"]
+    assert await store.refresh_if_changed() is False
+
+    async with SessionLocal() as session:
+        session.add(OfferWall(token="t-snap-2", name="Wall", url="https://snap/2"))
+        await session.commit()
+    previous = store.current()
+
+    assert await store.refresh_if_changed() is True
+    assert store.current().tokens == ["t-snap-1", "t-snap-2"]
+    assert previous.tokens == ["t-snap-1"]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_store_builds_indexes_off_the_event_loop(monkeypatch):
+    import threading
+
+    from app.infrastructure.snapshot import offerwall_repository
+    from app.infrastructure.snapshot.offerwall_repository import OfferWallSnapshot, SnapshotStore
+
+    threads = []
+
+    def build(walls, version):
+        threads.append(threading.get_ident())
+        return OfferWallSnapshot(walls, version)
+
+    monkeypatch.setattr(offerwall_repository, "OfferWallSnapshot", build)
+    async with SessionLocal() as session:
+        session.add(OfferWall(token="t-snap-thread", name="Wall", url="https://snap/thread"))
+        await session.commit()
+
+    snapshot = await SnapshotStore(SessionLocal, refresh_interval=60, max_age=60).load()
+
+    assert snapshot.tokens == ["t-snap-thread"]
+    assert threads and threads[0] != threading.get_ident()
+
+
+@pytest.mark.asyncio
+async def test_shared_snapshot_one_builder_many_readers(tmp_path):
+    from app.infrastructure.snapshot.shared_snapshot import SharedSnapshotStore
+
+    async with SessionLocal() as session:
+        session.add(OfferWall(token="t-shared-1", name="Wall", url="https://shared/1"))
+        await session.commit()
+
+    path = tmp_path / "offerwalls.snapshot"
+    builder = SharedSnapshotStore(SessionLocal, path, refresh_interval=60, max_age=60)
+    reader = SharedSnapshotStore(SessionLocal, path, refresh_interval=60, max_age=60)
+    await builder.start()
+    await reader.start()
+    try:
+        assert builder.is_builder and not reader.is_builder
+        assert reader.current().get("t-shared-1").url == "https://shared/1"
+
+        async with SessionLocal() as session:
+            session.add(OfferWall(token="t-shared-2", name="Wall", url="https://shared/2"))
+            await session.commit()
+        assert await builder.build_if_changed() is True
+        assert await builder.build_if_changed() is False
+        assert reader.remap_if_replaced() is True
+        assert reader.current().generation == 2
+        assert reader.current().get("t-shared-2") is not None
+    finally:
+        await reader.stop()
+        await builder.stop()
+
+
+@pytest.mark.asyncio
+async def test_pool_status_tracks_checkouts():
+    from app.db import pool_status
+
+    before = pool_status()
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql("SELECT 1")
+        during = pool_status()
+
+    assert during["checked_out"] == before["checked_out"] + 1
+    assert pool_status()["checkouts"] >= before["checkouts"] + 1
+    assert {"size", "overflow", "wait_seconds_total", "timeouts"} <= set(during)
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_exposes_route_and_db_metrics(client):
+    await client.get("/api/offerwalls/missing-token")
+    await client.get("/api/offerwalls/missing-token-2")
+
+    resp = await client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = resp.text
+    route = 'route="/api/offerwalls/{token}"'
+    assert f'http_requests_total{{method="GET",{route},status="404"}}' in body
+    assert f'http_request_duration_seconds_bucket{{method="GET",{route},status="404",le="+Inf"}}' in body
+    assert f"http_request_db_statements_count{{{route}}}" in body
+    assert 'cache_requests_total{cache="offerwall",result="hit"}' in body
+    assert 'singleflight_calls_total{flight="offerwall",outcome="executed"}' in body
+    assert "db_pool_checkouts_total " in body
+    assert "db_statements_total " in body
+
+
+@pytest.mark.asyncio
+async def test_endpoint_query_counts(client, assert_num_queries):
+    async with SessionLocal() as session:
+        offers = [
+            Offer(uuid=f"u-q-{i}", id=i, url=f"https://offer/{i}", is_active=True, name=f"QueryOffer{i}")
+            for i in range(3)
+        ]
+        walls = [OfferWall(token=f"t-q-{i}", name=f"Wall {i}", url=f"wall-q-{i}") for i in range(4)]
+        session.add_all([*offers, *walls])
+        await session.flush()
+        session.add_all(
+            [
+                OfferAssignment(offer_wall_token=wall.token, offer_uuid=offer.uuid, order=position)
+                for wall in walls
+                for position, offer in enumerate(offers)
+            ]
+        )
+        await session.commit()
+
+    # Офферволлы и все назначения — два выражения при любом числе офферволлов
+    with assert_num_queries(2):
+        await client.get("/api/offerwalls/t-q-1")
+    with assert_num_queries(0):
+        await client.get("/api/offerwalls/t-q-1")
+    with assert_num_queries(2):
+        await client.get("/api/offerwalls/by_url/wall-q-2")
+    with assert_num_queries(2):
+        await client.get("/api/offerwalls", params={"page_size": 4})
+    with assert_num_queries(2):
+        await client.post("/api/offerwalls/batch", json={"tokens": ["t-q-0", "t-q-3", "missing"]})
+    with assert_num_queries(0):
+        await client.get("/api/offerwalls/get_offer_names")
+
+
+@pytest.mark.asyncio
+async def test_get_by_url_matches_normalized_spellings(client):
+    from app.infrastructure.snapshot.offerwall_repository import OfferWallSnapshot
+    from app.infrastructure.sqlalchemy.offerwall_repository import SqlAlchemyOfferWallRepository
+
+    async with SessionLocal() as session:
+        session.add(OfferWall(token="t-url", name="Wall", url="https://Norm.example/promo/?b=2&a=1"))
+        await session.commit()
+        stored = (await session.execute(select(OfferWall.url_hash))).scalar_one()
+
+    assert stored == url_hash("https://norm.example/promo?a=1&b=2")
+    for mode in ("orm", "core"):
+        async with SessionLocal() as session:
+            repo = SqlAlchemyOfferWallRepository(session, fetch_mode=mode)
+            found = await repo.get_by_url("HTTPS://norm.example:443/promo?a=1&b=2#top")
+            assert found.token == "t-url" and found.url == "https://Norm.example/promo/?b=2&a=1"
+            assert await repo.get_by_url("https://norm.example/promo?a=1") is None
+        async with SessionLocal() as session:
+            walls = await SqlAlchemyOfferWallRepository(session).load_all()
+    snapshot = OfferWallSnapshot(walls)
+    assert snapshot.by_url["https://norm.example/promo?a=1&b=2"][0].token == "t-url"
+
+    async with SessionLocal() as session:
+        session.add(OfferWall(token="t-url-2", name="Wall", url="plain.example"))
+        await session.commit()
+    resp = await client.get("/api/offerwalls/by_url/PLAIN.Example")
+    assert resp.status_code == 200 and resp.json()["token"] == "t-url-2"
+
+    async with SessionLocal() as session:
+        session.add(OfferWall(token="t-url-3", name="Copy", url="https://norm.example/promo?a=1&b=2"))
+        with pytest.raises(IntegrityError):
+            await session.commit()
+
+
+@pytest.mark.asyncio
+async def test_admission_sheds_load_but_serves_cached_offerwalls(client):
+    from app.server import admission
+
+    async with SessionLocal() as session:
+        session.add_all([OfferWall(token=f"t-adm-{i}", name="Wall", url=f"https://adm/{i}") for i in range(2)])
+        await session.commit()
+    assert (await client.get("/api/offerwalls/t-adm-0")).status_code == 200
+
+    limiters = [admission.limiter(route) for route in ("/api/offerwalls/{token}", "/api/offerwalls")]
+    saved = [(limiter.active, limiter.max_queue) for limiter in limiters]
+    for limiter in limiters:
+        # Все слоты заняты, очереди нет: каждый новый запрос сразу отклоняется
+        limiter.active, limiter.max_queue = limiter.limit, 0
+    try:
+        cached = await client.get("/api/offerwalls/t-adm-0")
+        uncached = await client.get("/api/offerwalls/t-adm-1")
+        listing = await client.get("/api/offerwalls")
+        names = await client.get("/api/offerwalls/get_offer_names")
+    finally:
+        for limiter, (active, max_queue) in zip(limiters, saved):
+            limiter.active, limiter.max_queue = active, max_queue
+
+    assert cached.status_code == 200 and cached.json()["token"] == "t-adm-0"
+    for resp in (uncached, listing):
+        assert resp.status_code == 503
+        assert resp.headers["retry-after"] == "1"
+        assert resp.json() == {"detail": "Service overloaded, retry later."}
+    assert names.status_code == 200
+    assert limiters[0].stats.shed >= 2
+
+    body = (await client.get("/metrics")).text
+    assert 'admission_requests_total{route="/api/offerwalls/{token}",outcome="rejected_queue_full"}' in body
+    assert 'admission_queue_depth{route="/api/offerwalls"} 0' in body
+
+
+@pytest.mark.asyncio
+async def test_query_budget_catches_repeated_statements():
+    from app.infrastructure.sqlalchemy.offerwall_repository import SqlAlchemyOfferWallRepository
+    from app.infrastructure.sqlalchemy.query_budget import RepeatedQueryDetected, track_queries
+
+    async with SessionLocal() as session:
+        session.add_all([OfferWall(token=f"t-n1-{i}", name="Wall", url=f"https://n1/{i}") for i in range(4)])
+        await session.commit()
+
+    async with SessionLocal() as session:
+        repo = SqlAlchemyOfferWallRepository(session)
+        with pytest.raises(RepeatedQueryDetected):
+            with track_queries(repeat_threshold=3):
+                for i in range(4):
+                    await repo.get_by_token(f"t-n1-{i}")
+        # Пакетная выборка — один и тот же объём работы без повторов
+        with track_queries(repeat_threshold=3) as tracker:
+            await repo.get_many_by_tokens([f"t-n1-{i}" for i in range(4)])
+        assert tracker.count == 2
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_upserts_and_replaces_assignments():
+    from app.infrastructure.sqlalchemy.bulk_import import TARGETS, import_records
+
+    offers = [
+        {"uuid": f"u-imp-{i}", "id": i, "url": f"https://offer/{i}", "name": OfferChoices.choices[i][0]}
+        for i in range(3)
+    ]
+    walls = [{"token": f"t-imp-{i}", "name": f"Wall {i}", "url": f"https://imp/{i}"} for i in range(5)]
+    stats = await import_records(engine, TARGETS["offers"], offers, chunk_size=2)
+    assert (stats.rows, stats.chunks) == (3, 2)
+    await import_records(engine, TARGETS["offerwalls"], walls, chunk_size=2)
+    await import_records(
+        engine,
+        TARGETS["offer_assignments"],
+        [{"offer_wall_token": "t-imp-0", "offer_uuid": f"u-imp-{i}", "order": i} for i in range(3)],
+    )
+
+    # Повторный импорт обновляет строки по ключу и заменяет назначения офферволла
+    walls[0]["name"] = "Renamed"
+    await import_records(engine, TARGETS["offerwalls"], walls[:1])
+    await import_records(
+        engine,
+        TARGETS["offer_assignments"],
+        [{"offer_wall_token": "t-imp-0", "offer_uuid": "u-imp-2", "order": 0}],
+    )
+    await import_records(engine, TARGETS["offerwalls"], [{**walls[1], "name": "Ignored"}], on_conflict="ignore")
+
+    async with SessionLocal() as session:
+        names = dict((await session.execute(select(OfferWall.token, OfferWall.name))).all())
+        assigned = (await session.execute(select(OfferAssignment.offer_uuid))).scalars().all()
+    assert len(names) == 5
+    assert names["t-imp-0"] == "Renamed"
+    assert names["t-imp-1"] == "Wall 1"
+    assert assigned == ["u-imp-2"]
+
+
+@pytest.mark.asyncio
+async def test_export_streams_all_walls_as_ndjson(client, monkeypatch):
+    import json
+
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "export_chunk_size", 2)
+    async with SessionLocal() as session:
+        offer = Offer(uuid="u-exp", id=1, url="https://offer", is_active=True, name="ExportOffer")
+        walls = [OfferWall(token=f"t-exp-{i}", name=f"Wall {i}", url=f"https://exp/{i}") for i in range(5)]
+        session.add_all([offer, *walls])
+        await session.flush()
+        session.add_all(
+            [
+                OfferAssignment(offer_wall_token="t-exp-3", offer_uuid="u-exp", order=1),
+                PopupAssignment(offer_wall_token="t-exp-4", offer_uuid="u-exp", order=1),
+            ]
+        )
+        await session.commit()
+
+    resp = await client.get("/api/offerwalls/export")
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [row["token"] for row in rows] == [f"t-exp-{i}" for i in range(5)]
+    assert rows[3]["offer_assignments"][0]["offer"]["uuid"] == "u-exp"
+    assert rows[4]["popup_assignments"][0]["offer"]["uuid"] == "u-exp"
+
+
+@pytest.mark.asyncio
+async def test_export_is_rejected_before_streaming_when_shedding(client):
+    from app.admission import Overloaded, shedding
+
+    async with SessionLocal() as session:
+        session.add(OfferWall(token="t-exp-shed", name="Wall", url="https://exp/shed"))
+        await session.commit()
+
+    with shedding(Overloaded("queue_full", retry_after=1)):
+        resp = await client.get("/api/offerwalls/export")
+
+    assert resp.status_code == 503
+    assert resp.headers["retry-after"] == "1"
+    assert resp.json() == {"detail": "Service overloaded, retry later."}
+
+
+@pytest.mark.asyncio
+async def test_offerwall_compression_variants(client):
+    from app.di.providers import response_body_cache
+
+    async with SessionLocal() as session:
+        offers = [
+            Offer(uuid=f"u-gz-{i}", id=i, url=f"https://offer/{i}", is_active=True, name=f"GzOffer{i}")
+            for i in range(20)
+        ]
+        session.add_all([OfferWall(token="t-gz", name="Wall", url="https://gz"), *offers])
+        session.add(OfferWall(token="t-gz-small", name="Small", url="https://gz-small"))
+        await session.flush()
+        session.add_all(
+            OfferAssignment(offer_wall_token="t-gz", offer_uuid=o.uuid, order=i) for i, o in enumerate(offers)
+        )
+        await session.commit()
+
+    plain = await client.get("/api/offerwalls/t-gz", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.headers["vary"] == "Accept-Encoding"
+
+    resp = await client.get("/api/offerwalls/t-gz", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.headers["etag"] == plain.headers["etag"][:-1] + '-gzip"'
+    assert int(resp.headers["content-length"]) < len(plain.content)
+    assert resp.content == plain.content
+    # Вариант сжат один раз и лежит рядом с закэшированным телом
+    variants = [encoded.variants for _, (wall, encoded) in response_body_cache.entries.items() if wall.token == "t-gz"]
+    assert variants == [{"gzip": variants[0]["gzip"]}]
+
+    resp = await client.get(
+        "/api/offerwalls/t-gz", headers={"Accept-Encoding": "gzip", "If-None-Match": plain.headers["etag"]}
+    )
+    assert resp.status_code == 304
+
+    small = await client.get("/api/offerwalls/t-gz-small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    # Список сжимает middleware
+    listed = await client.get("/api/offerwalls", headers={"Accept-Encoding": "gzip"})
+    assert listed.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in listed.headers["vary"]
+    assert [w["token"] for w in listed.json()] == ["t-gz", "t-gz-small"]
+
+
+@pytest.mark.asyncio
+async def test_session_is_created_only_when_a_statement_runs(client, monkeypatch):
+    from app.db import LazySession
+
+    created = []
+    original_get = LazySession.get
+
+    def get(self):
+        if not self.created:
+            created.append(self)
+        return original_get(self)
+
+    monkeypatch.setattr(LazySession, "get", get)
+    async with SessionLocal() as session:
+        session.add(OfferWall(token="t-lazy", name="Wall", url="https://lazy"))
+        await session.commit()
+
+    assert (await client.get("/api/offerwalls/get_offer_names")).status_code == 200
+    assert created == []
+
+    assert (await client.get("/api/offerwalls/t-lazy")).status_code == 200
+    assert len(created) == 1
+
+    # Попадание в кэш обходится без сессии
+    assert (await client.get("/api/offerwalls/t-lazy")).status_code == 200
+    assert len(created) == 1
+
+
+@pytest.mark.asyncio
+async def test_list_sparse_fieldsets(client, assert_num_queries):
+    async with SessionLocal() as session:
+        offer = Offer(uuid="u-sparse", id=1, url="https://offer", is_active=True, name="SparseOffer")
+        session.add_all([offer, OfferWall(token="t-sparse", name="Wall", url="https://sparse", description="d")])
+        await session.flush()
+        session.add(OfferAssignment(offer_wall_token="t-sparse", offer_uuid="u-sparse", order=1))
+        await session.commit()
+
+    with assert_num_queries(1):
+        resp = await client.get("/api/offerwalls", params={"fields": "name,url", "include": ""})
+    assert resp.status_code == 200
+    assert resp.json() == [{"token": "t-sparse", "name": "Wall", "url": "https://sparse"}]
+
+    with assert_num_queries(2):
+        resp = await client.get("/api/offerwalls", params={"fields": "token", "include": "offer_assignments"})
+    (item,) = resp.json()
+    assert list(item) == ["token", "offer_assignments"]
+    assert item["offer_assignments"][0]["offer"]["uuid"] == "u-sparse"
+
+    full = (await client.get("/api/offerwalls")).json()
+    assert list(full[0]) == ["token", "name", "url", "description", "offer_assignments", "popup_assignments"]
+
+    resp = await client.get("/api/offerwalls", params={"fields": "token,secret"})
+    assert resp.status_code == 400
+    assert "secret" in resp.text
+
+
+@pytest.mark.asyncio
+async def test_request_trace_and_slow_query_log(client, monkeypatch, caplog):
+    from app.server import slow_query_log, tracer
+
+    async with SessionLocal() as session:
+        session.add(OfferWall(token="t-trace", name="Wall", url="https://trace"))
+        await session.commit()
+    tracer.exporter.clear()
+    monkeypatch.setattr(slow_query_log, "threshold_ms", 1e-6)
+
+    with caplog.at_level("WARNING", logger="app.slow_queries"):
+        resp = await client.get("/api/offerwalls/t-trace", headers={"X-Request-ID": "req-trace-1"})
+    assert resp.status_code == 200
+    assert resp.headers["x-request-id"] == "req-trace-1"
+
+    spans = {span.span_id: span for span in tracer.exporter.finished(request_id="req-trace-1")}
+    by_name = {span.name: span for span in spans.values()}
+    root = by_name["GET /api/offerwalls/{token}"]
+    assert root.parent_id is None and root.attributes["status"] == 200
+    # controller → сервис → репозиторий → SQL, сериализация — под корнем
+    chain = [by_name["repository.hydrate"]]
+    while chain[-1].parent_id is not None:
+        chain.append(spans[chain[-1].parent_id])
+    assert [span.name for span in chain[1:]] == [
+        "repository.coalesce",
+        "service.get_offerwall",
+        "GET /api/offerwalls/{token}",
+    ]
+    sql = [span for span in spans.values() if span.name == "sql"]
+    assert len(sql) == 2 and all(span.parent_id == by_name["repository.coalesce"].span_id for span in sql)
+    assert by_name["serialize.offerwall"].parent_id == root.span_id
+
+    records = [record for record in caplog.records if record.name == "app.slow_queries"]
+    assert len(records) == 2
+    assert all(record.request_id == "req-trace-1" for record in records)
+    assert records[0].parameters_shape == "(str)" and "t-trace" not in records[0].getMessage()
+
+    # Без заголовка request ID генерируется
+    resp = await client.get("/api/offerwalls/t-trace")
+    assert len(resp.headers["x-request-id"]) == 32
+
+
+@pytest.mark.asyncio
+async def test_app_lifespan_runs_startup_hooks(app):
+    # ASGITransport не запускает lifespan: хуки on_startup проверяются отдельно
+    async with app.lifespan():
+        pass
+
+
+@pytest.mark.asyncio
+async def test_coalesced_fetch_survives_cancellation_of_first_caller(monkeypatch):
+    import asyncio
+
+    from sqlalchemy import text
+
+    from app.config import settings
+    from app.db import LazySession, pool_status
+    from app.di.providers import provide_offerwall_repository
+    from app.infrastructure.sqlalchemy.offerwall_repository import SqlAlchemyOfferWallRepository
+
+    async with SessionLocal() as session:
+        session.add(OfferWall(token="t-flight", name="Wall", url="https://flight"))
+        await session.commit()
+    monkeypatch.setattr(settings, "cache_enabled", False)
+
+    started, release = asyncio.Event(), asyncio.Event()
+    get_by_token = SqlAlchemyOfferWallRepository.get_by_token
+
+    async def slow_get_by_token(self, token):
+        # Соединение взято из пула и держится, пока выборку не отпустят
+        await self.session.execute(text("SELECT 1"))
+        started.set()
+        await release.wait()
+        return await get_by_token(self, token)
+
+    monkeypatch.setattr(SqlAlchemyOfferWallRepository, "get_by_token", slow_get_by_token)
+    first, second = LazySession(SessionLocal), LazySession(SessionLocal)
+    first_repo, second_repo = provide_offerwall_repository(first), provide_offerwall_repository(second)
+    before = pool_status()["checked_out"]
+
+    first_call = asyncio.ensure_future(first_repo.get_by_token("t-flight"))
+    await started.wait()
+    second_call = asyncio.ensure_future(second_repo.get_by_token("t-flight"))
+    await asyncio.sleep(0)
+    first_call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first_call
+    # Так DI закрывает сессию отменённого запроса
+    await first.close()
+
+    # Выборка продолжается на своём соединении, оно не вернулось в пул
+    assert pool_status()["checked_out"] == before + 1
+    release.set()
+    wall = await second_call
+    await second.close()
+
+    assert wall is not None and wall.token == "t-flight"
+    assert pool_status()["checked_out"] == before
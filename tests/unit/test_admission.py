@@ -0,0 +1,154 @@
+import asyncio
+
+import pytest
+
+from app.admission import (
+    ConcurrencyLimiter,
+    Overloaded,
+    check_not_shedding,
+    is_shedding,
+    shedding,
+)
+from app.infrastructure.cache.offerwall_repository import OfferWallCache
+from app.infrastructure.cache.ttl_cache import MISSING, TTLCache
+
+
+def test_limiter_queues_beyond_limit_and_hands_slots_over_in_order():
+    limiter = ConcurrencyLimiter(limit=1, max_queue=2, queue_timeout=1.0)
+    order = []
+
+    async def request(name):
+        assert await limiter.acquire() is None
+        order.append(name)
+        await asyncio.sleep(0.01)
+        limiter.release()
+
+    async def scenario():
+        first = asyncio.create_task(request("a"))
+        await asyncio.sleep(0)
+        waiting = [asyncio.create_task(request(name)) for name in "bc"]
+        await asyncio.sleep(0)
+        depth = limiter.queue_depth
+        await asyncio.gather(first, *waiting)
+        return depth
+
+    assert asyncio.run(scenario()) == 2
+    assert order == ["a", "b", "c"]
+    assert (limiter.active, limiter.queue_depth) == (0, 0)
+    assert (limiter.stats.admitted, limiter.stats.queued) == (3, 2)
+
+
+def test_limiter_rejects_when_queue_is_full_or_deadline_passes():
+    limiter = ConcurrencyLimiter(limit=1, max_queue=1, queue_timeout=0.01)
+
+    async def scenario():
+        assert await limiter.acquire() is None
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        full = await limiter.acquire()
+        return full, await waiting
+
+    assert asyncio.run(scenario()) == ("queue_full", "timeout")
+    assert limiter.stats.rejected_queue_full == 1
+    assert limiter.stats.rejected_timeout == 1
+    assert (limiter.active, limiter.queue_depth) == (1, 0)
+
+
+def test_cancelled_waiter_does_not_leak_its_slot():
+    limiter = ConcurrencyLimiter(limit=1, max_queue=5, queue_timeout=1.0)
+
+    async def scenario():
+        await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiting.cancel()  # клиент ушёл из очереди
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        limiter.release()
+
+    asyncio.run(scenario())
+
+    assert (limiter.active, limiter.queue_depth) == (0, 0)
+
+
+def test_shedding_blocks_database_access_only_inside_the_block():
+    rejection = Overloaded("timeout", retry_after=2)
+
+    with shedding(rejection):
+        assert is_shedding()
+        with pytest.raises(Overloaded) as exc:
+            check_not_shedding()
+    check_not_shedding()
+
+    assert exc.value.retry_after == 2 and not is_shedding()
+
+
+def test_ttl_cache_keeps_expired_entries_for_stale_reads():
+    now = [0.0]
+    cache = TTLCache(max_entries=10, ttl=5, clock=lambda: now[0], stale_ttl=10)
+    cache.set("a", 1)
+    now[0] = 6
+
+    assert cache.get("a") is MISSING
+    assert cache.get_stale("a") == 1
+    now[0] = 15
+    assert cache.get_stale("a") is MISSING
+
+
+def test_offerwall_cache_serves_stale_entries_only_while_shedding():
+    cache = OfferWallCache(max_entries=10, ttl=0, negative_ttl=0, stale_ttl=60)
+    cache.store("token", "t-1", "wall")
+
+    assert cache.lookup("token", "t-1") is MISSING
+    with shedding(Overloaded("queue_full", retry_after=1)):
+        assert cache.lookup("token", "t-1") == "wall"
+    assert cache.stats.stale_hits == 1
+
+
+def test_middleware_without_stale_serving_answers_503_itself():
+    from httpx import ASGITransport, AsyncClient
+    from litestar import Litestar, get
+
+    from app.admission import AdmissionController, admission_middleware_factory
+
+    @get("/work")
+    async def work() -> str:
+        return "done"
+
+    controller = AdmissionController(limit=1, max_queue=0, queue_timeout=0.1, retry_after=3)
+    app = Litestar([work], middleware=[admission_middleware_factory(controller, serve_stale=False)])
+
+    async def scenario():
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            admitted = await client.get("/work")
+            controller.limiter("/work").active = 1
+            return admitted, await client.get("/work")
+
+    admitted, rejected = asyncio.run(scenario())
+
+    assert admitted.status_code == 200
+    assert rejected.status_code == 503 and rejected.headers["retry-after"] == "3"
+    assert controller.limiter("/work").stats.rejected_queue_full == 1
+
+
+def test_shedding_repository_stops_database_reads_only_while_shedding():
+    from app.infrastructure.admission.offerwall_repository import SheddingOfferWallRepository
+
+    calls = []
+
+    class Inner:
+        async def get_by_token(self, token):
+            calls.append(token)
+            return None
+
+    repo = SheddingOfferWallRepository(Inner())
+
+    async def scenario():
+        with shedding(Overloaded("timeout", retry_after=1)):
+            with pytest.raises(Overloaded):
+                await repo.get_by_token("t-1")
+        return await repo.get_by_token("t-2")
+
+    asyncio.run(scenario())
+
+    assert calls == ["t-2"]
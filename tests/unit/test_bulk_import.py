@@ -0,0 +1,90 @@
+import io
+
+import pytest
+
+from app.cli import detect_format, read_csv, read_jsonl
+from app.domain.urls import url_hash
+from app.infrastructure.sqlalchemy.bulk_import import (
+    TARGETS,
+    ImportRecordError,
+    chunked,
+    coerce_record,
+)
+
+
+def test_coerce_record_converts_csv_strings():
+    row = coerce_record(
+        TARGETS["offers"],
+        {
+            "uuid": "u-1",
+            "id": "7",
+            "url": "https://o",
+            "is_active": "false",
+            "name": "Monto",
+            "term_to": "",
+        },
+        line=1,
+    )
+
+    assert row == {
+        "uuid": "u-1",
+        "id": 7,
+        "url": "https://o",
+        "is_active": False,
+        "name": "Monto",
+        "sum_to": None,
+        "term_to": None,
+        "percent_rate": None,
+    }
+
+
+def test_coerce_record_applies_column_defaults():
+    row = coerce_record(
+        TARGETS["offer_assignments"], {"offer_wall_token": "t", "offer_uuid": "u"}, line=1
+    )
+
+    assert row["order"] == 0
+
+
+@pytest.mark.parametrize(
+    "record, message",
+    [
+        ({"token": "t", "name": "Wall"}, "url is required"),
+        ({"token": "t", "name": "Wall", "url": "u", "extra": 1}, "unknown columns"),
+        ({"token": "t" * 40, "name": "Wall", "url": "u"}, "longer than 36"),
+    ],
+)
+def test_coerce_record_rejects_bad_records(record, message):
+    with pytest.raises(ImportRecordError, match=message):
+        coerce_record(TARGETS["offerwalls"], record, line=3)
+
+
+def test_coerce_record_derives_offerwall_url_hash():
+    row = coerce_record(
+        TARGETS["offerwalls"], {"token": "t", "name": "Wall", "url": "HTTPS://Wall/"}, line=1
+    )
+
+    assert row["url_hash"] == url_hash("https://wall")
+    assert TARGETS["offerwalls"].write_columns[-1] == "url_hash"
+
+
+def test_coerce_record_rejects_unknown_offer_names():
+    record = {"uuid": "u-1", "id": 1, "url": "https://o", "name": "NotAnOffer"}
+
+    with pytest.raises(ImportRecordError, match="name: unknown value 'NotAnOffer'"):
+        coerce_record(TARGETS["offers"], record, line=2)
+
+
+def test_chunked_streams_fixed_size_chunks():
+    records = ({"token": f"t{i}", "name": "Wall", "url": "u"} for i in range(5))
+
+    sizes = [len(chunk) for chunk in chunked(records, TARGETS["offerwalls"], size=2)]
+
+    assert sizes == [2, 2, 1]
+
+
+def test_readers_and_format_detection():
+    assert list(read_jsonl(io.StringIO('{"a": 1}\n\n{"a": 2}\n'))) == [{"a": 1}, {"a": 2}]
+    assert list(read_csv(io.StringIO("a,b\n1,\n"))) == [{"a": "1", "b": ""}]
+    assert detect_format("walls.CSV", None) == "csv"
+    assert detect_format("-", "jsonl") == "jsonl"
@@ -0,0 +1,45 @@
+import gzip
+
+from app.compression import compress, negotiate, parse_accept_encoding
+from app.infrastructure.cache.response_cache import EncodedResponse, make_etag
+
+
+def test_parse_accept_encoding_reads_q_values():
+    assert parse_accept_encoding("gzip, br;q=0.5, zstd;q=oops, ") == {
+        "gzip": 1.0,
+        "br": 0.5,
+        "zstd": 0.0,
+    }
+
+
+def test_negotiate_prefers_highest_q_then_server_order():
+    available = ("br", "zstd", "gzip")
+
+    assert negotiate(None, available) is None
+    assert negotiate("identity", available) is None
+    assert negotiate("gzip, br", available) == "br"
+    assert negotiate("gzip, br;q=0.5", available) == "gzip"
+    assert negotiate("*", available) == "br"
+    assert negotiate("*, br;q=0", available) == "zstd"
+    assert negotiate("gzip;q=0", ("gzip",)) is None
+
+
+def test_encoded_response_compresses_each_variant_once():
+    body = b'{"offer": "x"}' * 100
+    encoded = EncodedResponse(body=body, etag=make_etag(body))
+
+    first = encoded.variant("gzip")
+
+    assert gzip.decompress(first) == body
+    assert encoded.variant("gzip") is first
+    assert compress(body, "gzip", stored=True) == first
+    assert encoded.variant_etag("gzip") == encoded.etag[:-1] + '-gzip"'
+
+
+def test_per_request_compression_uses_faster_levels_than_stored_variants():
+    body = b'{"offer": "x"}' * 100
+
+    # Байт XFL заголовка gzip: 2 — максимальное сжатие (уровень 9), 0 — промежуточные уровни
+    assert compress(body, "gzip", stored=True)[8] == 2
+    assert compress(body, "gzip")[8] == 0
+    assert gzip.decompress(compress(body, "gzip")) == body
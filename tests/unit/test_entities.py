@@ -0,0 +1,55 @@
+import dataclasses
+
+import pytest
+
+from app.domain.entities import Offer, OfferInternTable, OfferWall, OfferWallOffer
+
+
+def make_offer(**overrides) -> Offer:
+    fields = dict(uuid="u-1", id=1, url="https://offer.example", is_active=True, name="Loan")
+    fields.update(overrides)
+    return Offer(**fields)
+
+
+def test_entities_are_frozen_and_slotted():
+    offer = make_offer()
+    wall = OfferWall(
+        token="t", name="n", url="https://wall.example", offer_assignments=[OfferWallOffer(offer)]
+    )
+
+    assert wall.offer_assignments == (OfferWallOffer(offer),)
+    assert wall.popup_assignments == ()
+    assert not hasattr(offer, "__dict__")
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        offer.name = "Other"
+
+
+def test_intern_table_returns_one_instance_per_uuid():
+    interns = OfferInternTable()
+
+    first = interns.offer_assignment(make_offer())
+    second = interns.offer_assignment(make_offer())
+    popup = interns.popup_assignment(make_offer())
+
+    assert first is second
+    assert popup.offer is first.offer
+    assert len(interns) == 1
+
+
+def test_intern_table_replaces_changed_offer():
+    interns = OfferInternTable()
+    old = interns.offer(make_offer())
+
+    new = interns.offer(make_offer(name="Renamed"))
+
+    assert new is not old
+    assert new.name == "Renamed"
+    assert interns.offer(make_offer(name="Renamed")) is new
+
+
+def test_intern_table_is_bounded():
+    interns = OfferInternTable(max_entries=2)
+    for i in range(5):
+        interns.offer(make_offer(uuid=f"u-{i}"))
+
+    assert len(interns) <= 2
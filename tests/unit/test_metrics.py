@@ -0,0 +1,72 @@
+from app.metrics import MetricsRegistry
+
+
+def test_counter_and_gauge_render_with_labels():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    entries = registry.gauge("entries", "Entries.")
+    requests.inc('/a"b')
+    requests.inc('/a"b', amount=2)
+    entries.set(7)
+
+    body = registry.render()
+
+    assert "# TYPE requests_total counter" in body
+    assert 'requests_total{route="/a\\"b"} 3' in body
+    assert "# TYPE entries gauge\nentries 7\n" in body
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+
+    lines = registry.render().splitlines()
+
+    assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{le="1"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_sum 3.65" in lines
+    assert "latency_seconds_count 4" in lines
+
+
+def test_collectors_run_on_every_render():
+    registry = MetricsRegistry()
+    size = registry.gauge("size", "Size.")
+    values = iter([1, 2])
+    registry.on_collect(lambda: size.set(next(values)))
+
+    assert "size 1" in registry.render()
+    assert "size 2" in registry.render()
+
+
+def test_failed_statement_leaves_no_timing_state_on_the_connection():
+    import asyncio
+
+    import pytest
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.metrics import RequestDbStats, _request_db_stats, install_sql_metrics
+
+    engine = create_async_engine("sqlite+aiosqlite://")
+    install_sql_metrics(engine)
+    stats = RequestDbStats()
+
+    async def scenario():
+        token = _request_db_stats.set(stats)
+        try:
+            async with engine.connect() as conn:
+                with pytest.raises(OperationalError):
+                    await conn.exec_driver_sql("SELECT * FROM missing_table")
+                await conn.exec_driver_sql("SELECT 1")
+                return dict((await conn.get_raw_connection()).info)
+        finally:
+            _request_db_stats.reset(token)
+            await engine.dispose()
+
+    info = asyncio.run(scenario())
+
+    assert not any("started" in key for key in info)
+    assert stats.statements == 1
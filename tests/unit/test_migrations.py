@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.db import SchemaVersionError, check_schema, current_revision, head_revision, migrate_db
+
+
+def sqlite_engine(tmp_path):
+    return create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'schema.sqlite'}")
+
+
+async def index_names(engine, table):
+    async with engine.connect() as conn:
+        return await conn.run_sync(
+            lambda sync_conn: {ix["name"] for ix in inspect(sync_conn).get_indexes(table)}
+        )
+
+
+def test_check_schema_rejects_an_outdated_database(tmp_path):
+    engine = sqlite_engine(tmp_path)
+
+    async def scenario():
+        with pytest.raises(SchemaVersionError, match="<none>"):
+            await check_schema(engine)
+        await migrate_db("0001_initial_schema", bind=engine)
+        with pytest.raises(SchemaVersionError, match="0001_initial_schema"):
+            await check_schema(engine)
+        await migrate_db(bind=engine)
+        await check_schema(engine)
+        return await current_revision(engine)
+
+    try:
+        assert asyncio.run(scenario()) == head_revision()
+    finally:
+        asyncio.run(engine.dispose())
+
+
+def test_head_creates_assignment_and_url_indexes(tmp_path):
+    engine = sqlite_engine(tmp_path)
+
+    async def scenario():
+        await migrate_db(bind=engine)
+        return {
+            table: await index_names(engine, table)
+            for table in ("offerwalls", "offer_wall_offers", "offer_wall_popup_offers")
+        }
+
+    try:
+        indexes = asyncio.run(scenario())
+    finally:
+        asyncio.run(engine.dispose())
+
+    assert "ix_offerwalls_url_hash" in indexes["offerwalls"]
+    for table in ("offer_wall_offers", "offer_wall_popup_offers"):
+        assert {f"ix_{table}_wall_order", f"ix_{table}_offer_uuid"} <= indexes[table]
+
+
+def load_revision(name):
+    import importlib.util
+
+    from app.db import MIGRATIONS_PATH
+
+    spec = importlib.util.spec_from_file_location(name, MIGRATIONS_PATH / "versions" / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_url_hash_migration_reports_urls_that_collide_after_normalization(tmp_path):
+    from sqlalchemy import text
+
+    engine = sqlite_engine(tmp_path)
+
+    async def scenario():
+        await migrate_db("0002_offerwall_indexes", bind=engine)
+        async with engine.begin() as conn:
+            await conn.execute(
+                text("INSERT INTO offerwalls (token, name, url) VALUES (:token, 'Wall', :url)"),
+                [
+                    {"token": "t-1", "url": "https://A.example/"},
+                    {"token": "t-2", "url": "https://a.example"},
+                    {"token": "t-3", "url": "https://b.example"},
+                ],
+            )
+        with pytest.raises(RuntimeError) as exc:
+            await migrate_db(bind=engine)
+        async with engine.connect() as conn:
+            columns = await conn.run_sync(
+                lambda sync_conn: {col["name"] for col in inspect(sync_conn).get_columns("offerwalls")}
+            )
+        return str(exc.value), columns, await current_revision(engine)
+
+    try:
+        message, columns, revision = asyncio.run(scenario())
+    finally:
+        asyncio.run(engine.dispose())
+
+    assert "t-1 (https://A.example/), t-2 (https://a.example)" in message
+    assert "t-3" not in message
+    # Проверка идёт до DDL: схема осталась на предыдущей ревизии
+    assert "url_hash" not in columns and revision == "0002_offerwall_indexes"
+
+
+def test_url_hash_migration_matches_the_current_normalizer():
+    # Расхождение — сигнал: правила нормализации изменились без миграции, пересчитывающей url_hash
+    from app.domain.urls import url_hash
+
+    migration = load_revision("0003_offerwall_url_hash")
+    urls = [
+        "https://A.example:443/path/?b=2&a=1#frag",
+        "http://[::1]:8080/x%7e%2F",
+        "wall-1.example/path",
+        "https://user:pw@host.example/",
+    ]
+
+    assert [migration.url_hash(url) for url in urls] == [url_hash(url) for url in urls]
@@ -0,0 +1,24 @@
+import pytest
+
+from app.domain.offer_names import OfferNameRegistry, UnknownOfferName
+from app.models import OfferChoices, offer_names
+
+
+def test_registry_keeps_choice_order_and_indexes_names():
+    assert offer_names.names == tuple(value for value, _ in OfferChoices.choices)
+    assert offer_names.index["Monto"] == offer_names.names.index("Monto")
+    assert "Monto" in offer_names
+    assert "monto" not in offer_names
+    assert offer_names.validate("Monto") == "Monto"
+    with pytest.raises(UnknownOfferName):
+        offer_names.validate("NotAnOffer")
+
+
+def test_registry_version_follows_content():
+    registry = OfferNameRegistry(["A", "B", "A"])
+
+    assert registry.names == ("A", "B")
+    assert registry.version == OfferNameRegistry(["A", "B"]).version
+    assert registry.version != OfferNameRegistry(["B", "A"]).version
+    with pytest.raises(TypeError):
+        registry.index["C"] = 2
@@ -0,0 +1,138 @@
+import asyncio
+from typing import Optional, Sequence
+
+from app.domain.entities import OfferWall, OfferWallProjection
+from app.domain.ports.offerwall_repository import OfferWallRepository
+from app.infrastructure.cache.offerwall_repository import CachedOfferWallRepository, OfferWallCache
+from app.infrastructure.cache.ttl_cache import MISSING, TTLCache
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingRepo(OfferWallRepository):
+    def __init__(self, items: dict[str, OfferWall]) -> None:
+        self.items = items
+        self.calls = 0
+
+    async def list(
+        self,
+        name: Optional[str],
+        url: Optional[str],
+        page: int,
+        page_size: int,
+        after: Optional[str] = None,
+        projection: Optional[OfferWallProjection] = None,
+    ) -> Sequence[OfferWall]:
+        return list(self.items.values())
+
+    async def get_by_token(self, token: str) -> Optional[OfferWall]:
+        self.calls += 1
+        return self.items.get(token)
+
+    async def get_by_url(self, url: str) -> Optional[OfferWall]:
+        self.calls += 1
+        return next((v for v in self.items.values() if v.url == url), None)
+
+    async def get_many_by_tokens(self, tokens: Sequence[str]) -> Sequence[Optional[OfferWall]]:
+        self.calls += 1
+        self.requested = list(tokens)
+        return [self.items.get(token) for token in tokens]
+
+
+def make_repo() -> CountingRepo:
+    ow = OfferWall(token="token-1", name="Wall One", url="https://wall.one")
+    return CountingRepo({ow.token: ow})
+
+
+def test_ttl_cache_expires_entries():
+    clock = FakeClock()
+    cache: TTLCache[str, int] = TTLCache(max_entries=10, ttl=5, clock=clock)
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    clock.now = 5
+    assert cache.get("a") is MISSING
+    assert cache.stats.expirations == 1
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache: TTLCache[str, int] = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is MISSING
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats.evictions == 1
+
+
+def test_cached_repo_serves_repeat_hits_from_memory():
+    inner = make_repo()
+    repo = CachedOfferWallRepository(inner, OfferWallCache(max_entries=10, ttl=60, negative_ttl=5))
+
+    first = asyncio.run(repo.get_by_token("token-1"))
+    second = asyncio.run(repo.get_by_token("token-1"))
+    by_url = asyncio.run(repo.get_by_url("https://wall.one"))
+    asyncio.run(repo.get_by_url("https://wall.one"))
+
+    assert first is second
+    assert by_url.token == "token-1"
+    assert inner.calls == 2
+
+
+def test_cached_repo_caches_not_found():
+    inner = make_repo()
+    repo = CachedOfferWallRepository(inner, OfferWallCache(max_entries=10, ttl=60, negative_ttl=5))
+
+    assert asyncio.run(repo.get_by_token("missing")) is None
+    assert asyncio.run(repo.get_by_token("missing")) is None
+    assert inner.calls == 1
+
+
+def test_invalidate_drops_token_and_url_entries():
+    inner = make_repo()
+    cache = OfferWallCache(max_entries=10, ttl=60, negative_ttl=5)
+    repo = CachedOfferWallRepository(inner, cache)
+    asyncio.run(repo.get_by_token("token-1"))
+    asyncio.run(repo.get_by_url("https://wall.one"))
+
+    cache.invalidate(token="token-1")
+    asyncio.run(repo.get_by_token("token-1"))
+    asyncio.run(repo.get_by_url("https://wall.one"))
+
+    assert inner.calls == 4
+
+
+def test_cached_repo_batch_fetches_only_misses():
+    inner = make_repo()
+    repo = CachedOfferWallRepository(inner, OfferWallCache(max_entries=10, ttl=60, negative_ttl=5))
+    asyncio.run(repo.get_by_token("token-1"))
+
+    result = asyncio.run(repo.get_many_by_tokens(["missing", "token-1", "missing"]))
+
+    assert [ow.token if ow else None for ow in result] == [None, "token-1", None]
+    assert inner.requested == ["missing"]
+    asyncio.run(repo.get_many_by_tokens(["missing", "token-1"]))
+    assert inner.calls == 2
+
+
+def test_cached_repo_shares_entry_between_url_spellings():
+    inner = make_repo()
+    cache = OfferWallCache(max_entries=10, ttl=60, negative_ttl=5)
+    repo = CachedOfferWallRepository(inner, cache)
+
+    first = asyncio.run(repo.get_by_url("HTTPS://Wall.One/"))
+    second = asyncio.run(repo.get_by_url("https://wall.one:443"))
+    cache.invalidate(url="https://WALL.one")
+    asyncio.run(repo.get_by_url("https://wall.one"))
+
+    assert first is second and first.token == "token-1"
+    assert inner.calls == 2
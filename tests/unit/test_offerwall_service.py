@@ -9,6 +9,7 @@ from app.domain.entities import (
     OfferWall,
     OfferWallOffer,
     OfferWallPopupOffer,
+    OfferWallProjection,
 )
 from app.domain.ports.offerwall_repository import OfferWallRepository
 
@@ -23,13 +24,18 @@ class FakeRepo(OfferWallRepository):
         url: Optional[str],
         page: int,
         page_size: int,
+        after: Optional[str] = None,
+        projection: Optional[OfferWallProjection] = None,
     ) -> Sequence[OfferWall]:
-        values = list(self.items.values())
+        values = sorted(self.items.values(), key=lambda v: v.token)
         # Псевдо-фильтрация как в реальном репозитории
         if name:
             values = [v for v in values if name.lower() in v.name.lower()]
         if url:
             values = [v for v in values if url.lower() in v.url.lower()]
+        if after is not None:
+            values = [v for v in values if v.token > after]
+            page = 1
         start = (page - 1) * page_size
         end = start + page_size
         return values[start:end]
@@ -100,6 +106,24 @@ def test_service_list_filters_by_name():
     assert result[0].name == "Second Wall"
 
 
+def test_service_list_page_follows_cursor():
+    repo = FakeRepo(make_sample_data())
+    service = OfferWallService(repo)
+
+    first = asyncio.run(service.list_offerwalls_page(name=None, url=None, page=1, page_size=1))
+    second = asyncio.run(
+        service.list_offerwalls_page(name=None, url=None, page=1, page_size=1, cursor=first.next_cursor)
+    )
+
+    assert [ow.token for ow in first.items] == ["token-1"]
+    assert [ow.token for ow in second.items] == ["token-2"]
+    assert second.next_cursor is not None
+    last = asyncio.run(
+        service.list_offerwalls_page(name=None, url=None, page=1, page_size=1, cursor=second.next_cursor)
+    )
+    assert last.items == [] and last.next_cursor is None
+
+
 def test_service_get_by_token_success():
     repo = FakeRepo(make_sample_data())
     service = OfferWallService(repo)
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import MultipleResultsFound
+
+from app.domain.entities import OfferWall
+from app.infrastructure.snapshot.offerwall_repository import (
+    OfferWallSnapshot,
+    SnapshotOfferWallRepository,
+)
+
+
+class StaticStore:
+    def __init__(self, snapshot: OfferWallSnapshot) -> None:
+        self.snapshot = snapshot
+
+    def current(self) -> OfferWallSnapshot:
+        return self.snapshot
+
+
+def make_snapshot() -> OfferWallSnapshot:
+    return OfferWallSnapshot(
+        [
+            OfferWall(token="t-3", name="Summer Sale", url="https://sale.example"),
+            OfferWall(token="t-1", name="Summer Loans", url="https://loans.example"),
+            OfferWall(token="t-2", name="Winter Deals", url="https://deals.example"),
+            OfferWall(token="t-4", name="Dup", url="https://dup.example"),
+            OfferWall(token="t-5", name="Dup", url="https://dup.example"),
+        ]
+    )
+
+
+def test_snapshot_list_orders_by_token_and_pages():
+    snapshot = make_snapshot()
+
+    assert [w.token for w in snapshot.list(None, None, page=1, page_size=2)] == ["t-1", "t-2"]
+    assert [w.token for w in snapshot.list(None, None, page=2, page_size=2)] == ["t-3", "t-4"]
+    assert [w.token for w in snapshot.list(None, None, page=1, page_size=2, after="t-2")] == ["t-3", "t-4"]
+
+
+def test_snapshot_list_filters_like_ilike():
+    snapshot = make_snapshot()
+
+    assert [w.token for w in snapshot.list("SUMMER", None, 1, 10)] == ["t-1", "t-3"]
+    assert [w.token for w in snapshot.list("su", "sale", 1, 10)] == ["t-3"]
+    assert [w.token for w in snapshot.list("w_nter", None, 1, 10)] == ["t-2"]
+    assert [w.token for w in snapshot.list("summer", None, 1, 10, after="t-1")] == ["t-3"]
+
+
+def test_snapshot_repository_lookups():
+    repo = SnapshotOfferWallRepository(StaticStore(make_snapshot()))
+
+    assert asyncio.run(repo.get_by_token("t-2")).name == "Winter Deals"
+    assert asyncio.run(repo.get_by_url("https://loans.example")).token == "t-1"
+    assert asyncio.run(repo.get_by_url("https://missing")) is None
+    assert [w and w.token for w in asyncio.run(repo.get_many_by_tokens(["t-5", "x"]))] == ["t-5", None]
+    with pytest.raises(MultipleResultsFound):
+        asyncio.run(repo.get_by_url("https://dup.example"))
+
+
+def test_snapshot_repo_streams_chunks_in_token_order():
+    repo = SnapshotOfferWallRepository(StaticStore(make_snapshot()))
+
+    async def collect():
+        return [[w.token for w in chunk] async for chunk in repo.stream_all(chunk_size=2)]
+
+    assert asyncio.run(collect()) == [["t-1", "t-2"], ["t-3", "t-4"], ["t-5"]]
+
+
+def test_snapshot_rejects_walls_loaded_with_a_projection():
+    with pytest.raises(ValueError, match="t-9"):
+        OfferWallSnapshot([OfferWall(token="t-9", name=None, url="https://projected.example")])
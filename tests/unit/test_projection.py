@@ -0,0 +1,22 @@
+import pytest
+
+from app.application.projection import InvalidProjection, parse_projection
+from app.domain.entities import OfferWallProjection
+
+
+def test_parse_projection_defaults_to_full_walls():
+    assert parse_projection(None, None) is None
+    assert parse_projection("token,name,url,description", None) is None
+
+
+def test_parse_projection_keeps_schema_order_and_token():
+    projection = parse_projection(" url , name", "")
+
+    assert projection == OfferWallProjection(fields=("token", "name", "url"), include=())
+    assert parse_projection(None, "popup_assignments").include == ("popup_assignments",)
+
+
+@pytest.mark.parametrize("fields, include", [("token,secret", None), (None, "offers")])
+def test_parse_projection_rejects_unknown_names(fields, include):
+    with pytest.raises(InvalidProjection, match="Unknown"):
+        parse_projection(fields, include)
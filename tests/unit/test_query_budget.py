@@ -0,0 +1,49 @@
+import logging
+
+import pytest
+
+from app.infrastructure.sqlalchemy.query_budget import (
+    QueryBudgetExceeded,
+    RepeatedQueryDetected,
+    statement_shape,
+    track_queries,
+)
+
+
+def test_statement_shape_ignores_literals_and_in_list_length():
+    assert statement_shape("SELECT * FROM t WHERE id = 5 AND name = 'x'") == (
+        "SELECT * FROM t WHERE id = ? AND name = ?"
+    )
+    assert statement_shape("SELECT a FROM t WHERE a IN ($1, $2,\n $3)") == statement_shape(
+        "SELECT a FROM t WHERE a IN (?)"
+    )
+
+
+def test_budget_raises_on_first_statement_over_limit():
+    with track_queries(max_statements=2) as tracker:
+        tracker.record("SELECT 1")
+        tracker.record("SELECT 2")
+        with pytest.raises(QueryBudgetExceeded):
+            tracker.record("SELECT 3")
+
+
+def test_repeat_threshold_logs_once_per_shape(caplog):
+    with caplog.at_level(logging.WARNING):
+        with track_queries(repeat_threshold=2, mode="log", label="GET /x") as tracker:
+            for i in range(5):
+                tracker.record(f"SELECT * FROM t WHERE id = {i}")
+
+    assert tracker.count == 5
+    assert len(caplog.records) == 1
+    assert "GET /x" in caplog.records[0].getMessage()
+
+
+def test_nested_trackers_both_count():
+    with track_queries() as outer:
+        with track_queries(repeat_threshold=1) as inner:
+            inner.record("SELECT 1")
+            with pytest.raises(RepeatedQueryDetected):
+                inner.record("SELECT 1")
+
+    assert inner.count == 2
+    assert outer.count == 2
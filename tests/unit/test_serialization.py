@@ -0,0 +1,96 @@
+from dataclasses import replace
+
+import pytest
+from litestar.plugins.pydantic import PydanticInitPlugin
+from litestar.serialization import encode_json, get_serializer
+
+from app import schemas
+from app.domain.entities import (
+    Offer,
+    OfferWall,
+    OfferWallOffer,
+    OfferWallPopupOffer,
+    OfferWallProjection,
+)
+from app.serialization import MsgspecResponseEncoder, PydanticResponseEncoder, encoder_for
+
+
+def make_walls() -> list:
+    loan = Offer(
+        uuid="u-1", id=1, url='https://offer.example/?a=1&b="2"', is_active=True, name="Займ"
+    )
+    card = Offer(
+        uuid="u-2", id=2, url="https://card.example", is_active=False, name="Card",
+        sum_to="50000", term_to=30, percent_rate=0,
+    )  # fmt: skip
+    return [
+        OfferWall(
+            token="t-1",
+            name="Летние займы",
+            url="https://wall.example",
+            description="<b>\x1f</b>",
+            offer_assignments=(OfferWallOffer(loan), OfferWallOffer(card)),
+            popup_assignments=(OfferWallPopupOffer(card),),
+        ),
+        OfferWall(token="t-2", name="Empty", url="https://empty.example"),
+    ]
+
+
+def litestar_json(value) -> bytes:
+    return encode_json(value, serializer=get_serializer(PydanticInitPlugin.encoders()))
+
+
+@pytest.mark.parametrize("encoder", [PydanticResponseEncoder(), MsgspecResponseEncoder()])
+def test_encoders_keep_the_schema_wire_format(encoder):
+    walls = make_walls()
+    # Как кодировал Litestar, когда обработчики возвращали pydantic-модели
+    expected = litestar_json([schemas.OfferWall.model_validate(w) for w in walls])
+
+    assert encoder.offerwalls(walls) == expected
+    assert encoder.offerwalls([]) == b"[]"
+    assert encoder.offerwall(walls[0]) == litestar_json(schemas.OfferWall.model_validate(walls[0]))
+
+
+def test_encoders_produce_identical_bodies():
+    walls = make_walls()
+    results = [("t-1", walls[0]), ("missing", None), ("t-2", walls[1])]
+    fast, slow = MsgspecResponseEncoder(), PydanticResponseEncoder()
+
+    for wall in walls:
+        assert fast.offerwall(wall) == slow.offerwall(wall)
+    assert fast.offerwalls(tuple(walls)) == slow.offerwalls(walls)
+    assert fast.batch(results) == slow.batch(results)
+
+
+def test_encoders_apply_projection_identically():
+    walls = make_walls()
+    projection = OfferWallProjection(fields=("token", "url"), include=("popup_assignments",))
+    fast, slow = MsgspecResponseEncoder(), PydanticResponseEncoder()
+
+    body = fast.offerwalls(walls, projection)
+
+    assert body == slow.offerwalls(walls, projection)
+    assert body.startswith(b'[{"token":"t-1","url":"https://wall.example","popup_assignments":[{')
+
+
+def test_encoders_skip_fields_left_out_of_projection():
+    # Репозиторий не читает непрошенные колонки: у спроецированных стен они None
+    walls = [
+        replace(wall, name=None, url=None, description=None, popup_assignments=())
+        for wall in make_walls()
+    ]
+    projection = OfferWallProjection(fields=("token",), include=("offer_assignments",))
+    fast, slow = MsgspecResponseEncoder(), PydanticResponseEncoder()
+
+    body = slow.offerwalls(walls, projection)
+
+    assert body == fast.offerwalls(walls, projection)
+    assert body.startswith(b'[{"token":"t-1","offer_assignments":[{')
+    assert body.endswith(b'{"token":"t-2","offer_assignments":[]}]')
+    tokens_only = OfferWallProjection(fields=("token",), include=())
+    assert slow.offerwalls(walls[1:], tokens_only) == b'[{"token":"t-2"}]'
+
+
+def test_encoder_for_rejects_unknown_names():
+    with pytest.raises(ValueError):
+        encoder_for("orjson")
@@ -0,0 +1,99 @@
+import pytest
+
+from app.domain.entities import Offer, OfferWall, OfferWallOffer, OfferWallPopupOffer
+from app.infrastructure.snapshot.shared_snapshot import MappedSnapshot, write_snapshot_file
+
+
+def make_walls() -> list[OfferWall]:
+    offer1 = Offer(uuid="uuid-1", id=1, url="https://ex.com/1", is_active=True, name="Loanplus")
+    offer2 = Offer(uuid="uuid-2", id=2, url="https://ex.com/2", is_active=False, name="Suncredit", term_to=30)
+    return [
+        OfferWall(
+            token="token-2",
+            name="Второй",
+            url="https://wall.two",
+            offer_assignments=[OfferWallOffer(offer=offer2), OfferWallOffer(offer=offer1)],
+        ),
+        OfferWall(
+            token="token-1",
+            name="Wall One",
+            url="https://wall.one",
+            description="desc",
+            offer_assignments=[OfferWallOffer(offer=offer1)],
+            popup_assignments=[OfferWallPopupOffer(offer=offer2)],
+        ),
+        OfferWall(token="token-3", name="Dup", url="https://wall.one"),
+    ]
+
+
+def test_mapped_snapshot_round_trips_walls(tmp_path):
+    path = tmp_path / "offerwalls.snapshot"
+    walls = make_walls()
+    write_snapshot_file(path, walls, generation=7, version=(3, 2))
+
+    mapped = MappedSnapshot(path)
+
+    assert mapped.generation == 7 and mapped.version == (3, 2) and len(mapped) == 3
+    for wall in walls:
+        assert mapped.get(wall.token) == wall
+    assert mapped.get("token-0") is None and mapped.get("token-9") is None
+    assert [w.token for w in mapped.find_by_url("https://wall.one")] == ["token-1", "token-3"]
+    assert mapped.find_by_url("https://missing") == []
+    # Один и тот же оффер декодируется в один объект
+    assert mapped.get("token-1").offer_assignments[0].offer is mapped.get("token-2").offer_assignments[1].offer
+
+
+def test_mapped_snapshot_list(tmp_path):
+    path = tmp_path / "offerwalls.snapshot"
+    write_snapshot_file(path, make_walls(), generation=1)
+    mapped = MappedSnapshot(path)
+
+    assert [w.token for w in mapped.list(None, None, page=1, page_size=2)] == ["token-1", "token-2"]
+    assert [w.token for w in mapped.list(None, None, page=1, page_size=2, after="token-1")] == ["token-2", "token-3"]
+    assert [w.token for w in mapped.list("wall", "one", page=1, page_size=10)] == ["token-1"]
+    assert [w.token for w in mapped.list("Второй", None, page=1, page_size=10)] == ["token-2"]
+
+
+def test_replaced_file_is_a_new_generation(tmp_path):
+    path = tmp_path / "offerwalls.snapshot"
+    write_snapshot_file(path, make_walls(), generation=1)
+    old = MappedSnapshot(path)
+    write_snapshot_file(path, make_walls()[:1], generation=2)
+    new = MappedSnapshot(path)
+
+    assert new.identity != old.identity
+    assert len(new) == 1 and new.generation == 2
+    # Старое отображение продолжает читаться после замены файла
+    assert old.get("token-3") is not None
+
+
+def test_rejects_foreign_file(tmp_path):
+    path = tmp_path / "not-a-snapshot"
+    path.write_bytes(b"x" * 128)
+
+    with pytest.raises(ValueError):
+        MappedSnapshot(path)
+
+
+def test_lock_file_is_closed_when_flock_fails_unexpectedly(tmp_path, monkeypatch):
+    from app.infrastructure.snapshot import shared_snapshot
+    from app.infrastructure.snapshot.shared_snapshot import SharedSnapshotStore
+
+    opened = []
+
+    def recording_open(*args, **kwargs):
+        opened.append(open(*args, **kwargs))
+        return opened[-1]
+
+    def failing_flock(fd, operation):
+        raise OSError("flock failed")
+
+    monkeypatch.setattr(shared_snapshot, "open", recording_open, raising=False)
+    monkeypatch.setattr(shared_snapshot.fcntl, "flock", failing_flock)
+    store = SharedSnapshotStore(None, tmp_path / "walls.snapshot", refresh_interval=1, max_age=60)
+
+    with pytest.raises(OSError, match="flock failed"):
+        store._try_become_builder()
+
+    assert [f.closed for f in opened] == [True]
+    assert not store.is_builder
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from app.infrastructure.coalescing.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "wall"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("token-1", fetch) for _ in range(10)))
+
+    results = asyncio.run(scenario())
+
+    assert results == ["wall"] * 10
+    assert calls == 1
+    assert flight.stats.executed == 1
+    assert flight.stats.deduplicated == 9
+    assert len(flight) == 0
+
+
+def test_error_propagates_to_all_waiters():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("db down")
+
+    async def scenario():
+        return await asyncio.gather(
+            *(flight.do("token-1", fetch) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(flight) == 0
+
+
+def test_cancelled_waiter_does_not_cancel_others():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return "wall"
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do("token-1", fetch))
+        second = asyncio.ensure_future(flight.do("token-1", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "wall"
+    assert flight.stats.cancelled == 0
+
+
+def test_last_waiter_cancellation_cancels_fetch():
+    flight = SingleFlight()
+    finished = False
+
+    async def fetch():
+        nonlocal finished
+        await asyncio.sleep(0.02)
+        finished = True
+
+    async def scenario():
+        task = asyncio.ensure_future(flight.do("token-1", fetch))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.03)
+
+    asyncio.run(scenario())
+
+    assert finished is False
+    assert flight.stats.cancelled == 1
+    assert len(flight) == 0
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import logging
+
+from app.infrastructure.sqlalchemy.sql_tracing import SlowQueryLog, parameters_shape
+from app.tracing import (
+    FileSpanExporter,
+    InMemorySpanExporter,
+    Tracer,
+    is_tracing,
+    request_context,
+    span,
+)
+
+
+def test_spans_nest_under_the_trace_and_are_exported_together():
+    exporter = InMemorySpanExporter()
+    tracer = Tracer(exporter)
+
+    with span("outside") as outside:
+        assert outside is None and not is_tracing()
+    with request_context("req-1"):
+        with tracer.trace("root") as root:
+            with span("child", kind="db") as child:
+                with span("grandchild"):
+                    pass
+            assert exporter.finished() == []
+
+    names = {s.name: s for s in exporter.finished()}
+    assert set(names) == {"root", "child", "grandchild"}
+    assert names["child"].parent_id == root.span_id
+    assert names["grandchild"].parent_id == child.span_id
+    assert {s.request_id for s in names.values()} == {"req-1"}
+    assert names["child"].attributes == {"kind": "db"}
+
+
+def test_span_records_the_error_and_unsampled_requests_are_not_traced():
+    exporter = InMemorySpanExporter()
+
+    try:
+        with Tracer(exporter).trace("root"):
+            with span("failing"):
+                raise KeyError("x")
+    except KeyError:
+        pass
+    with Tracer(exporter, sample_rate=0.0).trace("skipped") as root:
+        assert root is None and not is_tracing()
+
+    (failing,) = exporter.finished("failing")
+    assert failing.attributes["error"] == "KeyError"
+    assert exporter.finished("skipped") == []
+
+
+def test_file_exporter_appends_json_lines(tmp_path):
+    path = tmp_path / "traces" / "spans.jsonl"
+    tracer = Tracer(FileSpanExporter(str(path)))
+
+    for _ in range(2):
+        with tracer.trace("root"):
+            with span("child"):
+                pass
+    tracer.close()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["name"] for line in lines] == ["child", "root", "child", "root"]
+    assert lines[0]["parent_id"] == lines[1]["span_id"]
+
+
+def test_parameters_shape_hides_values_and_collapses_runs():
+    assert parameters_shape(("t-1", "t-2", "t-3", 5)) == "(str x 3, int)"
+    assert parameters_shape({"token": "t-1", "limit": 10}) == "{token: str, limit: int}"
+    assert parameters_shape([("a", 1), ("b", 2)], executemany=True) == "2 x (str, int)"
+    assert parameters_shape((), executemany=False) == "()"
+
+
+def test_slow_query_log_fires_above_threshold_with_request_id(caplog):
+    log = SlowQueryLog(threshold_ms=100)
+
+    with caplog.at_level(logging.WARNING, logger="app.slow_queries"):
+        log.observe("SELECT 1 FROM t WHERE a = ?", ("x",), False, 50.0)
+        with request_context("req-slow"):
+            log.observe("SELECT  1\nFROM t WHERE a IN (?, ?)", ("x", "y"), False, 150.0)
+
+    (record,) = caplog.records
+    assert record.request_id == "req-slow" and record.duration_ms == 150.0
+    assert record.statement == "SELECT ? FROM t WHERE a IN (?)"
+    assert record.parameters_shape == "(str x 2)"
+    assert log.logged == 1
+
+
+def test_middleware_echoes_a_valid_request_id_and_replaces_an_invalid_one():
+    from httpx import ASGITransport, AsyncClient
+    from litestar import Litestar, get
+
+    from app.tracing import current_request_id, request_tracing_middleware_factory
+
+    @get("/work")
+    async def work() -> str:
+        return current_request_id() or ""
+
+    exporter = InMemorySpanExporter()
+    app = Litestar([work], middleware=[request_tracing_middleware_factory(Tracer(exporter))])
+
+    async def scenario():
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            valid = await client.get("/work", headers={"X-Request-ID": "abc-123"})
+            invalid = await client.get("/work", headers={"X-Request-ID": "bad id\t<script>"})
+            return valid, invalid
+
+    valid, invalid = asyncio.run(scenario())
+
+    assert valid.headers["x-request-id"] == valid.text == "abc-123"
+    assert invalid.headers["x-request-id"] == invalid.text != "bad id\t<script>"
+    (root,) = exporter.finished(request_id="abc-123")
+    assert root.name == "GET /work" and root.attributes["status"] == 200
+
+
+def test_statement_observers_share_one_timing_listener():
+    from sqlalchemy import event
+    from sqlalchemy.exc import OperationalError
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    from app.infrastructure.sqlalchemy.statement_timing import (
+        _after_cursor_execute,
+        observe_statements,
+    )
+
+    engine = create_async_engine("sqlite+aiosqlite://")
+    seen = {"metrics": [], "tracing": []}
+    for timings in seen.values():
+        observe_statements(engine, timings.append)
+
+    async def scenario():
+        try:
+            async with engine.connect() as conn:
+                try:
+                    await conn.exec_driver_sql("SELECT * FROM missing_table")
+                except OperationalError:
+                    pass
+                await conn.exec_driver_sql("SELECT 1")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(scenario())
+
+    assert event.contains(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+    assert [t.statement for t in seen["metrics"]] == [t.statement for t in seen["tracing"]] == ["SELECT 1"]
+    assert seen["metrics"][0].seconds >= 0
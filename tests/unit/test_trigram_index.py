@@ -0,0 +1,33 @@
+from app.infrastructure.search.trigram_index import TrigramIndex
+
+
+def make_index() -> TrigramIndex:
+    index = TrigramIndex(["name", "url"])
+    index.add("t-1", {"name": "Summer Loans", "url": "https://loans.example/summer"})
+    index.add("t-2", {"name": "Winter Deals", "url": "https://deals.example/winter"})
+    index.add("t-3", {"name": "ÄPFEL Summer", "url": "https://apfel.example"})
+    return index
+
+
+def test_search_matches_substring_case_insensitively():
+    index = make_index()
+
+    assert index.search("name", "SUMMER") == {"t-1", "t-3"}
+    assert index.search("url", "example/w") == {"t-2"}
+    assert index.search("name", "autumn") == set()
+
+
+def test_search_rejects_terms_the_index_cannot_serve():
+    index = make_index()
+
+    assert index.search("name", "su") is None
+    assert index.search("name", "sum%er") is None
+    assert index.search("name", "sum_er") is None
+
+
+def test_search_lowers_ascii_only_like_sqlite():
+    index = make_index()
+
+    # SQLite lower() не меняет регистр не-ASCII символов
+    assert index.search("name", "ÄPF") == {"t-3"}
+    assert index.search("name", "äpf") == set()
@@ -0,0 +1,50 @@
+import pytest
+
+from app.domain.urls import URL_HASH_LENGTH, normalize_url, url_hash
+
+
+@pytest.mark.parametrize(
+    "variant",
+    [
+        "https://wall.example/path?a=1&b=2",
+        "HTTPS://Wall.Example/path?a=1&b=2",
+        "https://wall.example:443/path/?a=1&b=2",
+        "https://wall.example/path?b=2&a=1",
+        "https://wall.example/path?a=1&b=2#section",
+        "  https://wall.example/%70ath?a=1&b=2 ",
+    ],
+)
+def test_normalize_url_collapses_spellings_of_one_address(variant):
+    assert normalize_url(variant) == "https://wall.example/path?a=1&b=2"
+    assert url_hash(variant) == url_hash("https://wall.example/path?a=1&b=2")
+
+
+@pytest.mark.parametrize(
+    "url, other",
+    [
+        ("https://wall.example/path", "http://wall.example/path"),
+        ("https://wall.example/Path", "https://wall.example/path"),
+        ("https://wall.example:8443", "https://wall.example"),
+        ("https://wall.example?a=1&a=2", "https://wall.example?a=2&a=1"),
+    ],
+)
+def test_normalize_url_keeps_meaningful_differences(url, other):
+    assert normalize_url(url) != normalize_url(other)
+
+
+@pytest.mark.parametrize(
+    "url",
+    ["Wall-Q-2/", "https://[::1]:443/x/", "http://u:p@Host:8080/%7euser/%2f?q=a%20b", ""],
+)
+def test_normalize_url_is_idempotent(url):
+    key = normalize_url(url)
+
+    assert normalize_url(key) == key
+
+
+def test_schemeless_url_is_read_as_host():
+    assert normalize_url("Wall-1.Example/") == "wall-1.example"
+
+
+def test_url_hash_has_fixed_width():
+    assert {len(url_hash(url)) for url in ("a", "https://x" * 50)} == {URL_HASH_LENGTH}